@@ -0,0 +1,348 @@
+# benchmarks/run.py
+# Microbenchmarks for every hot-path component
+#
+#   python -m benchmarks.run                  # compare against baseline.json
+#   python -m benchmarks.run --save-baseline  # record a new baseline
+#
+# Everything runs on synthetic signals, headless: no audio device, no corpus.
+
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+import numpy as np
+import torch
+
+from benchmarks import signals
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SAMPLE_RATE = 44100
+CHUNK_SIZE = 1024
+BENCHMARKS = {}
+
+def benchmark(name, iterations=200):
+    """Registers a setup function that returns the callable to time."""
+    def register(setup):
+        BENCHMARKS[name] = (setup, iterations)
+        return setup
+    return register
+
+@contextlib.contextmanager
+def quiet():
+    # Several components announce what they are doing on stdout.
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def feature_stream(analyzer):
+    """Features of the band signal, one chunk at a time, from a warmed-up analyzer."""
+    stream = signals.chunks(signals.band(8.0), CHUNK_SIZE)
+    for _ in range(50):
+        analyzer.analyze(next(stream))
+    return stream
+
+@benchmark('analyzer.analyze')
+def bench_analyze():
+    from cortex.analyzer import Analyzer
+    from cortex.features import FeatureVector
+    analyzer, out = Analyzer(sample_rate=SAMPLE_RATE), FeatureVector()
+    stream = feature_stream(analyzer)
+    return lambda: analyzer.analyze(next(stream), out=out)
+
+@benchmark('streaming_analyzer.analyze')
+def bench_streaming_analyze():
+    from cortex.streaming import StreamingAnalyzer
+    from cortex.features import FeatureVector
+    analyzer, out = StreamingAnalyzer(sample_rate=SAMPLE_RATE), FeatureVector()
+    stream = feature_stream(analyzer)
+    return lambda: analyzer.analyze(next(stream), out=out)
+
+@benchmark('analyzer.analyze_batch[4]', iterations=100)
+def bench_analyze_batch():
+    from cortex.analyzer import Analyzer
+    analyzer = Analyzer(sample_rate=SAMPLE_RATE)
+    audio = np.stack([signals.chord(0.5, seed=c)[:CHUNK_SIZE] for c in range(4)])
+    return lambda: analyzer.analyze_batch(audio)
+
+def sample_features():
+    from cortex.analyzer import Analyzer
+    return Analyzer(sample_rate=SAMPLE_RATE).analyze(signals.band(0.5))
+
+@benchmark('flatten_features', iterations=2000)
+def bench_flatten():
+    from psyche.memory import flatten_features
+    features = sample_features()
+    return lambda: flatten_features(features)
+
+@benchmark('flatten_features[dict]', iterations=2000)
+def bench_flatten_dict():
+    from psyche.memory import flatten_features
+    features = dict(sample_features().items())
+    return lambda: flatten_features(features)
+
+@benchmark('memory.remember', iterations=500)
+def bench_remember():
+    from psyche.memory import ShortTermMemory
+    memory = ShortTermMemory(input_size=19, hidden_size=64)
+    step = torch.randn(1, 1, 19)
+    return lambda: memory.remember(step)
+
+@benchmark('memory.remember[incremental]', iterations=2000)
+def bench_remember_incremental():
+    from psyche.memory import ShortTermMemory
+    memory = ShortTermMemory(input_size=19, hidden_size=64, incremental=True)
+    step = torch.randn(1, 1, 19)
+    return lambda: memory.remember(step)
+
+@benchmark('memory_bank.step[16]', iterations=2000)
+def bench_memory_bank():
+    from psyche.memory import MemoryBank
+    bank = MemoryBank(input_size=19, hidden_size=64)
+    slots = [bank.add() for _ in range(16)]
+    step = torch.randn(1, 1, 19)
+
+    def run():
+        for slot in slots:
+            slot.remember(step)
+        bank.step()
+    return run
+
+@benchmark('vibe_check.get_vibe', iterations=5000)
+def bench_vibe():
+    from cortex.vibe_check import VibeCheck
+    vibe_check, features = VibeCheck(), sample_features()
+    return lambda: vibe_check.get_vibe(features)
+
+@benchmark('decision.decide', iterations=5000)
+def bench_decide():
+    from psyche.decision import DecisionMaker
+    from psyche.memory import ShortTermMemory
+    decision_maker = DecisionMaker()
+    context = ShortTermMemory(input_size=19, hidden_size=64).remember(torch.randn(1, 1, 19))[1]
+    state = {'mood': 'inspired', 'cooperativeness': 0.5}
+    return lambda: decision_maker.decide(state, context)
+
+@benchmark('neural_synth.synthesize', iterations=200)
+def bench_synthesize():
+    from voice.ddsp import SimpleDDSP
+    from voice.neural_synth import NeuralSynth
+    with quiet():
+        synth = NeuralSynth()
+    # Stands in for a loaded model, so the synthesis branches actually run.
+    synth.model = SimpleDDSP()
+    context = torch.from_numpy(signals.chord(1.0))
+    features = sample_features()
+
+    def run():
+        with quiet():
+            synth.synthesize('harmonize', context, features)
+    return run
+
+@benchmark('hallucinator.stream[block]', iterations=2000)
+def bench_stream_block():
+    """One chunk of a streamed harmony: the synthesis cost of a tick."""
+    from voice.ddsp import SimpleDDSP
+    from voice.hallucinator import Hallucinator
+    with quiet():
+        hallucinator = Hallucinator()
+    hallucinator.synth.model = SimpleDDSP()
+    context, features = torch.from_numpy(signals.chord(1.0)), sample_features()
+
+    def run():
+        with quiet():
+            next(hallucinator.stream('harmonize', context, features, CHUNK_SIZE))
+    return run
+
+@benchmark('space.render[echo]', iterations=1000)
+def bench_echo():
+    """One chunk of echo: multi-tap delay plus a 2 s convolution reverb."""
+    from voice.space import Space
+    space = Space(sample_rate=SAMPLE_RATE, block_size=CHUNK_SIZE)
+    stream = signals.chunks(signals.band(8.0), CHUNK_SIZE)
+    space.start()
+
+    def run():
+        space.listen(next(stream))
+        space.render(CHUNK_SIZE)
+    return run
+
+@benchmark('response_cache.hit', iterations=5000)
+def bench_cache_hit():
+    """Fingerprinting the context and replaying a cached phrase."""
+    from voice.cache import ResponseCache
+    cache, features = ResponseCache(), sample_features()
+    cache.put(cache.key('harmonize', features), torch.zeros(44100))
+    return lambda: cache.get(cache.key('harmonize', features))
+
+def corpus_directory():
+    """A temporary corpus of three 3-second takes."""
+    from voice.file_sink import FileSink
+    directory = tempfile.mkdtemp(prefix='pneuma-bench-')
+    atexit.register(shutil.rmtree, directory, ignore_errors=True)
+    for i in range(3):
+        sink = FileSink(os.path.join(directory, f'take{i}.wav'), sample_rate=SAMPLE_RATE)
+        sink.play(signals.band(3.0))
+        sink.stop()
+    return directory
+
+@benchmark('audio_corpus.__getitem__', iterations=30)
+def bench_corpus():
+    from train_voice import AudioCorpus
+    dataset = AudioCorpus(corpus_directory(), sr=SAMPLE_RATE)
+    index = iter(range(10**9))
+    return lambda: dataset[next(index) % len(dataset)]
+
+@benchmark('audio_corpus.__getitem__[cached]', iterations=2000)
+def bench_corpus_cached():
+    """Later epochs: every item is a slice of a memory-mapped shard."""
+    from train_voice import AudioCorpus, SpectrogramCache
+    directory = corpus_directory()
+    dataset = AudioCorpus(directory, sr=SAMPLE_RATE,
+                          cache=SpectrogramCache(os.path.join(directory, 'processed'), sr=SAMPLE_RATE))
+    index = iter(range(10**9))
+    return lambda: dataset[next(index) % len(dataset)]
+
+@benchmark('tick[end_to_end]', iterations=200)
+def bench_tick():
+    """One serial main-loop tick as configured by default, minus UI and audio I/O."""
+    from cortex.features import FeatureVector
+    from cortex.streaming import StreamingAnalyzer
+    from cortex.vibe_check import VibeCheck
+    from psyche.decision import DecisionMaker
+    from psyche.memory import ShortTermMemory, flatten_features
+    from psyche.personality import Personality
+    from voice.hallucinator import Hallucinator
+    import yaml
+
+    with open('config/persona.yaml') as f:
+        persona = yaml.safe_load(f)['neutral']
+    analyzer = StreamingAnalyzer(sample_rate=SAMPLE_RATE)
+    vibe_check, personality, decision_maker = VibeCheck(), Personality(persona), DecisionMaker()
+    memory = ShortTermMemory(input_size=19, hidden_size=64, incremental=True)
+    with quiet():
+        hallucinator = Hallucinator()
+    features = FeatureVector()
+    stream = feature_stream(analyzer)
+
+    def tick():
+        audio_chunk = next(stream)
+        analyzer.analyze(audio_chunk, out=features)
+        vibe = vibe_check.get_vibe(features)
+        personality.update(vibe)
+        _, context = memory.remember(flatten_features(features))
+        intent = decision_maker.decide(personality.get_state(), context)
+        hallucinator.listen(audio_chunk)
+        if intent != 'silence':
+            with quiet():
+                next(hallucinator.stream(intent, audio_chunk, features, CHUNK_SIZE)).detach().numpy()
+    return tick
+
+@benchmark('session_host.tick[4]', iterations=100)
+def bench_session_host():
+    """One tick of four sessions hosted together, each on its own input."""
+    from spine.session import SessionHost
+    import yaml
+
+    class Source:
+        def __init__(self):
+            self.stream = signals.chunks(signals.band(8.0), CHUNK_SIZE)
+
+        def listen(self):
+            return next(self.stream)
+
+    class Sink:
+        def play(self, audio, append=True, continues=False):
+            pass
+
+    with open('config/persona.yaml') as f:
+        personas = yaml.safe_load(f)
+    host = SessionHost(sample_rate=SAMPLE_RATE, chunk_size=CHUNK_SIZE)
+    with quiet():
+        for name in ('neutral', 'heckler', 'shadow', 'melancholic_shadow'):
+            host.add(name, Source(), Sink(), personas[name])
+
+    def tick():
+        with quiet():
+            host.tick()
+    return tick
+
+def measure(setup, iterations, warmup=10):
+    """Returns (median, p95) seconds per call."""
+    run = setup()
+    for _ in range(warmup):
+        run()
+    timings = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        run()
+        timings[i] = time.perf_counter() - start
+    return float(np.median(timings)), float(np.percentile(timings, 95))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pneuma hot-path microbenchmarks.")
+    parser.add_argument('--only', nargs='*', default=None, help='Run only these benchmarks.')
+    parser.add_argument('--threshold', type=float, default=0.3,
+                        help='Fail when a median is this fraction slower than its baseline.')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='Baseline JSON file.')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='Record the results as the new baseline instead of comparing '
+                             '(with --only, just those entries are replaced).')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiply the iteration counts (e.g. 0.1 for a quick smoke run).')
+    args = parser.parse_args(argv)
+
+    random.seed(0)
+    torch.manual_seed(0)
+    torch.set_num_threads(1)
+    # Chunks are shorter than n_fft by design; librosa says so on every call.
+    warnings.filterwarnings('ignore', message='n_fft=.*is too large')
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+
+    results, regressions = {}, []
+    print(f"{'benchmark':<32}{'median us':>11}{'p95 us':>11}{'baseline':>11}{'change':>9}")
+    for name, (setup, iterations) in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        median, p95 = measure(setup, max(1, int(iterations * args.scale)))
+        results[name] = {'median_us': median * 1e6, 'p95_us': p95 * 1e6}
+
+        line = f"{name:<32}{median * 1e6:>11.1f}{p95 * 1e6:>11.1f}"
+        reference = None if args.save_baseline else baseline.get(name)
+        if reference:
+            change = median * 1e6 / reference['median_us'] - 1.0
+            line += f"{reference['median_us']:>11.1f}{change:>+9.0%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save_baseline:
+        if args.only:
+            # Re-recording a few entries keeps the rest of the baseline.
+            results = {name: results.get(name, baseline.get(name)) for name in BENCHMARKS
+                       if name in results or name in baseline}
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': f"{platform.machine()} {platform.processor() or platform.system()}",
+                       'python': platform.python_version(), 'torch': torch.__version__,
+                       'results': results}, f, indent=2)
+            f.write('\n')
+        print(f"Saved baseline to {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: "
+              + ", ".join(regressions))
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
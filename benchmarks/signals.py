@@ -0,0 +1,31 @@
+# benchmarks/signals.py
+# Deterministic synthetic test signals (no audio device or corpus needed)
+
+import numpy as np
+
+def chord(duration, sample_rate=44100, freqs=(220.0, 277.2, 329.6), seed=0):
+    """A sustained triad with a little noise, like a held guitar chord."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sample_rate)) / sample_rate
+    audio = sum(np.sin(2. * np.pi * f * t) for f in freqs) / len(freqs)
+    return (0.4 * audio + 0.01 * rng.standard_normal(len(t))).astype(np.float32)
+
+def clicks(duration, bpm=120.0, sample_rate=44100):
+    """Decaying noise bursts on every beat, like a kick drum."""
+    rng = np.random.default_rng(1)
+    audio = np.zeros(int(duration * sample_rate), dtype=np.float32)
+    burst = int(0.05 * sample_rate)
+    envelope = np.exp(-np.linspace(0., 8., burst)).astype(np.float32)
+    for start in range(0, len(audio) - burst, int(60.0 / bpm * sample_rate)):
+        audio[start:start + burst] += 0.8 * envelope * rng.standard_normal(burst).astype(np.float32)
+    return audio
+
+def band(duration, sample_rate=44100):
+    """Chord plus drums: the signal the end-to-end tick runs on."""
+    return chord(duration, sample_rate) + clicks(duration, sample_rate=sample_rate)
+
+def chunks(audio, chunk_size):
+    """Cycles through `audio` one chunk at a time, forever."""
+    while True:
+        for start in range(0, len(audio) - chunk_size + 1, chunk_size):
+            yield audio[start:start + chunk_size]
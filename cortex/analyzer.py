@@ -4,45 +4,214 @@
 import librosa
 import numpy as np
 
+from cortex.features import FeatureVector, FEATURE_DTYPE
+from cortex.streaming import StreamingAnalyzer
+from cortex.tempo import TempoTracker
+
+
 class Analyzer:
-    def __init__(self, sample_rate=44100):
+    def __init__(self, sample_rate=44100, n_fft=2048, hop_length=512):
         self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+        # Filter banks are far more expensive to build than to apply, so they
+        # are built once here instead of inside every librosa call.
+        self.mel_basis = librosa.filters.mel(sr=self.sample_rate, n_fft=self.n_fft)
+        self._window = librosa.filters.get_window('hann', self.n_fft, fftbins=True).astype(np.float32)
+        self._chroma_bases = {}
+        self.tempo_tracker = TempoTracker(sample_rate=self.sample_rate, hop_length=self.hop_length)
+        self.channel_tempo_tracker = None
+
+        # Cleared by the scheduler when a tick runs out of time: the last
+        # tempo estimate / chroma is reported again instead of being refreshed.
+        # Without tempo refresh no onsets are computed at all, so the last
+        # onset density is repeated too.
+        self.refresh_tempo = True
+        self.refresh_chroma = True
+        self._last_onset_density = 0.0
+        self._last_chroma = np.zeros(12, dtype=np.float32)
+        self._last_channel_onset_density = None
+        self._last_channel_chroma = None
+        # Audio not yet framed and the last mel frame, per input shape, for
+        # the onset stream the tempo trackers follow (see `tempo_onsets`).
+        self._onset_state = {}
+
+    def spectra(self, audio_chunk):
+        """
+        Computes the shared arrays every feature is derived from:
+        the magnitude spectrogram and its log-power mel spectrogram.
+        """
+        S = np.abs(librosa.stft(audio_chunk, n_fft=self.n_fft, hop_length=self.hop_length))
+        mel_db = librosa.power_to_db(self.mel_basis @ S**2)
+        return S, mel_db
+
+    def onset_envelope(self, mel_db, aggregate=np.mean):
+        """Onset strength envelope derived from a precomputed mel spectrogram."""
+        return librosa.onset.onset_strength(S=mel_db, sr=self.sample_rate,
+                                            hop_length=self.hop_length, aggregate=aggregate)
+
+    def tempo_onsets(self, audio):
+        """
+        Onset strength (mel spectral flux) of the frames completed by `audio`,
+        continuing from the previous call with the same input shape: (...,
+        frames) for (..., samples). A chunk's own centered STFT cannot be
+        used for this: its onset envelope is all centering pad for chunks
+        shorter than n_fft. Here every frame is a full, uncentered n_fft
+        window over the stream, so a 1024-sample chunk yields two frames.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        shape = audio.shape[:-1]
+        pending, previous = self._onset_state.get(
+            shape, (np.zeros(shape + (self.n_fft - self.hop_length,), dtype=np.float32), None))
+        stream = np.concatenate((pending, audio), axis=-1)
+        n = max(0, (stream.shape[-1] - self.n_fft) // self.hop_length + 1)
+        if n == 0:
+            self._onset_state[shape] = (stream, previous)
+            return np.zeros(shape + (0,))
+
+        frames = np.lib.stride_tricks.sliding_window_view(stream, self.n_fft, axis=-1)
+        spectrum = np.fft.rfft(frames[..., :n * self.hop_length:self.hop_length, :] * self._window, axis=-1)
+        power = (spectrum.real**2 + spectrum.imag**2).astype(np.float32)
+        log_mel = 10.0 * np.log10(np.maximum(self.mel_basis @ np.swapaxes(power, -1, -2), 1e-10))
+        mel_db = np.maximum(log_mel, log_mel.max(axis=-2, keepdims=True) - 80.0)
+        previous = mel_db[..., :1] if previous is None else previous
+        flux = np.maximum(0.0, np.diff(np.concatenate((previous, mel_db), axis=-1), axis=-1)).mean(axis=-2)
+        self._onset_state[shape] = (stream[..., n * self.hop_length:], mel_db[..., -1:])
+        return flux
+
+    def skip_tempo_onsets(self, audio):
+        """
+        Advances the onset stream past `audio` without analyzing it. Only the
+        audio the next frame overlaps is kept, and the last mel frame is
+        forgotten, so the flux does not jump across the skipped stretch.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        shape = audio.shape[:-1]
+        pending, _ = self._onset_state.get(
+            shape, (np.zeros(shape + (self.n_fft - self.hop_length,), dtype=np.float32), None))
+        stream = np.concatenate((pending, audio), axis=-1)
+        self._onset_state[shape] = (stream[..., -(self.n_fft - self.hop_length):], None)
+
+    def chroma_basis(self, tuning):
+        """Returns the (cached) chroma filter bank for a tuning deviation."""
+        basis = self._chroma_bases.get(tuning)
+        if basis is None:
+            basis = librosa.filters.chroma(sr=self.sample_rate, n_fft=self.n_fft, tuning=tuning)
+            self._chroma_bases[tuning] = basis
+        return basis
 
-    def analyze(self, audio_chunk):
+    def analyze(self, audio_chunk, out=None):
         """
         Analyzes an audio chunk to extract musical features.
-        Returns a dictionary of features.
+        Returns a FeatureVector; pass `out` to have it filled in place.
         """
-        
+        features = out if out is not None else FeatureVector()
+
+        # One STFT and one mel spectrogram per chunk; every spectral and
+        # rhythmic feature below is derived from them.
+        S, mel_db = self.spectra(audio_chunk)
+        power = S**2
+
         # Basic features
-        features = {
-            'rmse': np.mean(librosa.feature.rms(y=audio_chunk)),
-            'spectral_centroid': np.mean(librosa.feature.spectral_centroid(y=audio_chunk, sr=self.sample_rate)),
-            'spectral_bandwidth': np.mean(librosa.feature.spectral_bandwidth(y=audio_chunk, sr=self.sample_rate)),
-            'spectral_rolloff': np.mean(librosa.feature.spectral_rolloff(y=audio_chunk, sr=self.sample_rate)),
-            'zero_crossing_rate': np.mean(librosa.feature.zero_crossing_rate(y=audio_chunk)),
-        }
+        features.rmse = np.mean(librosa.feature.rms(y=audio_chunk))
+        features.spectral_centroid = np.mean(librosa.feature.spectral_centroid(S=S, sr=self.sample_rate))
+        features.spectral_bandwidth = np.mean(librosa.feature.spectral_bandwidth(S=S, sr=self.sample_rate))
+        features.spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(S=S, sr=self.sample_rate))
+        features.zero_crossing_rate = np.mean(librosa.feature.zero_crossing_rate(y=audio_chunk))
         
         # Advanced features
-        # Onset detection for rhythmic density
-        onsets = librosa.onset.onset_detect(y=audio_chunk, sr=self.sample_rate)
-        features['onset_density'] = len(onsets) / (len(audio_chunk) / self.sample_rate)
-
-        # Tempo (BPM)
-        # This is computationally more expensive and may not be accurate on short chunks.
-        # A larger buffer might be needed for reliable BPM detection.
-        try:
-            tempo, _ = librosa.beat.beat_track(y=audio_chunk, sr=self.sample_rate)
-            features['tempo'] = tempo if tempo > 0 else 0
-        except librosa.util.exceptions.ParameterError:
-            features['tempo'] = 0 # Not enough data to compute tempo
+        # Onset detection for rhythmic density and tempo (BPM)
+        # A single chunk is far too short to hold a beat, so tempo is tracked
+        # across calls, on the onset strength of the stream of chunks.
+        if self.refresh_tempo:
+            onset_env = self.onset_envelope(mel_db)
+            onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=self.sample_rate,
+                                                hop_length=self.hop_length)
+            self._last_onset_density = len(onsets) / (len(audio_chunk) / self.sample_rate)
+            self.tempo_tracker.update(self.tempo_onsets(audio_chunk))
+        else:
+            self.skip_tempo_onsets(audio_chunk)
+        features.onset_density = self._last_onset_density
+        features.tempo = self.tempo_tracker.bpm
 
         # Chroma features for harmonic content
-        chroma = librosa.feature.chroma_stft(y=audio_chunk, sr=self.sample_rate)
-        features['chroma'] = np.mean(chroma, axis=1)
+        if self.refresh_chroma:
+            tuning = librosa.estimate_tuning(S=power, sr=self.sample_rate, bins_per_octave=12)
+            chroma = librosa.util.normalize(self.chroma_basis(tuning) @ power, norm=np.inf, axis=-2)
+            self._last_chroma[:] = np.mean(chroma, axis=1)
+        features.chroma = self._last_chroma
 
         return features
 
+    def analyze_batch(self, audio):
+        """
+        Analyzes a (channels, samples) block, e.g. one chunk from every input
+        of a multi-channel interface, in one vectorized pass.
+        Returns a structured array with one FEATURE_DTYPE record per channel;
+        `FeatureVector.rows` wraps the records without copying.
+        """
+        audio = np.asarray(audio, dtype=np.float32)
+        channels = audio.shape[0]
+        features = np.zeros(channels, dtype=FEATURE_DTYPE)
+
+        # librosa broadcasts over leading axes: one batched FFT for all channels.
+        S = np.abs(librosa.stft(audio, n_fft=self.n_fft, hop_length=self.hop_length))
+        power = S**2
+        # Fold channels and frames together so each filter bank is one matrix product.
+        frames = power.transpose(0, 2, 1).reshape(-1, power.shape[1])
+        mel = (frames @ self.mel_basis.T).reshape(channels, -1, len(self.mel_basis)).transpose(0, 2, 1)
+        # Per-channel dB scaling keeps one loud channel from masking the rest:
+        # power_to_db's top_db floor is taken per channel, as if analyzed alone.
+        log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+        mel_db = np.maximum(log_mel, log_mel.max(axis=(-2, -1), keepdims=True) - 80.0)
+
+        features['rmse'] = librosa.feature.rms(y=audio).mean(axis=(-2, -1))
+        features['spectral_centroid'] = librosa.feature.spectral_centroid(S=S, sr=self.sample_rate).mean(axis=(-2, -1))
+        features['spectral_bandwidth'] = librosa.feature.spectral_bandwidth(S=S, sr=self.sample_rate).mean(axis=(-2, -1))
+        features['spectral_rolloff'] = librosa.feature.spectral_rolloff(S=S, sr=self.sample_rate).mean(axis=(-2, -1))
+        features['zero_crossing_rate'] = librosa.feature.zero_crossing_rate(y=audio).mean(axis=(-2, -1))
+
+        if self.channel_tempo_tracker is None or self.channel_tempo_tracker.channels != channels:
+            self.channel_tempo_tracker = TempoTracker(sample_rate=self.sample_rate,
+                                                      hop_length=self.hop_length, channels=channels)
+        if self._last_channel_onset_density is None or len(self._last_channel_onset_density) != channels:
+            self._last_channel_onset_density = np.zeros(channels)
+        if self.refresh_tempo:
+            onset_env = self.onset_envelope(mel_db)
+            onsets = librosa.onset.onset_detect(onset_envelope=onset_env, sr=self.sample_rate,
+                                                hop_length=self.hop_length, sparse=False)
+            self._last_channel_onset_density[:] = onsets.sum(axis=-1) / (audio.shape[-1] / self.sample_rate)
+            self.channel_tempo_tracker.update(self.tempo_onsets(audio))
+        else:
+            self.skip_tempo_onsets(audio)
+        features['onset_density'] = self._last_channel_onset_density
+        features['tempo'] = self.channel_tempo_tracker.bpm
+
+        if self._last_channel_chroma is None or len(self._last_channel_chroma) != channels:
+            self._last_channel_chroma = np.zeros((channels, 12), dtype=np.float32)
+        if self.refresh_chroma:
+            # Each instrument gets its own tuning estimate, as if analyzed alone.
+            bases = np.stack([self.chroma_basis(librosa.estimate_tuning(S=power[c], sr=self.sample_rate,
+                                                                        bins_per_octave=12))
+                              for c in range(channels)])
+            chroma = librosa.util.normalize(bases @ power, norm=np.inf, axis=-2)
+            self._last_channel_chroma[:] = chroma.mean(axis=-1)
+        features['chroma'] = self._last_channel_chroma
+
+        return features
+
+def make_analyzer(sample_rate=44100, analysis_mode='chunk', window_seconds=4.0, channels=1):
+    """
+    The analyzer bio_metrics.yaml's `analysis_mode` asks for: a
+    StreamingAnalyzer over `window_seconds` of context in "streaming" mode,
+    the chunk Analyzer otherwise. Several inputs are always analyzed by the
+    chunk Analyzer, together in one batched pass per chunk.
+    """
+    if channels == 1 and analysis_mode == 'streaming':
+        return StreamingAnalyzer(sample_rate=sample_rate, window_seconds=window_seconds)
+    return Analyzer(sample_rate=sample_rate)
+
 if __name__ == '__main__':
     # Example usage with a dummy audio chunk
     sample_rate = 44100
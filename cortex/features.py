@@ -0,0 +1,110 @@
+# cortex/features.py
+# Fixed-layout feature record shared by the cortex and the psyche
+
+import numpy as np
+
+# (name, width) in the order the memory sees them. This is the sorted key
+# order `flatten_features` has always used for feature dictionaries.
+FEATURE_FIELDS = [
+    ('chroma', 12),
+    ('onset_density', 1),
+    ('rmse', 1),
+    ('spectral_bandwidth', 1),
+    ('spectral_centroid', 1),
+    ('spectral_rolloff', 1),
+    ('tempo', 1),
+    ('zero_crossing_rate', 1),
+]
+FEATURE_SIZE = sum(width for _, width in FEATURE_FIELDS)
+
+# The same layout as a structured dtype, for per-channel feature matrices.
+FEATURE_DTYPE = np.dtype([(name, np.float32, (width,)) if width > 1 else (name, np.float32)
+                          for name, width in FEATURE_FIELDS])
+
+def _field_index():
+    # name -> position in the flat vector (a slice for array fields)
+    index, offset = {}, 0
+    for name, width in FEATURE_FIELDS:
+        index[name] = slice(offset, offset + width) if width > 1 else offset
+        offset += width
+    return index
+
+FIELD_INDEX = _field_index()
+
+def _field(name):
+    index = FIELD_INDEX[name]
+
+    def get(self):
+        return self.data[index]
+
+    def set(self, value):
+        self.data[index] = value
+
+    return property(get, set, doc=f"The '{name}' feature.")
+
+class FeatureVector:
+    """
+    One tick's features in a preallocated float32 array with a fixed layout.
+    Fields are reachable by attribute (`features.rmse`) or by key
+    (`features['rmse']`), so code written against the old feature dictionary
+    keeps working. Array fields such as `chroma` are views into `data`.
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data=None):
+        if data is None:
+            data = np.zeros(FEATURE_SIZE, dtype=np.float32)
+        elif data.dtype != np.float32 or data.shape != (FEATURE_SIZE,):
+            raise ValueError(f"Feature data must be float32 of shape ({FEATURE_SIZE},)")
+        self.data = data
+
+    chroma = _field('chroma')
+    onset_density = _field('onset_density')
+    rmse = _field('rmse')
+    spectral_bandwidth = _field('spectral_bandwidth')
+    spectral_centroid = _field('spectral_centroid')
+    spectral_rolloff = _field('spectral_rolloff')
+    tempo = _field('tempo')
+    zero_crossing_rate = _field('zero_crossing_rate')
+
+    @classmethod
+    def rows(cls, records):
+        """Wraps each record of a FEATURE_DTYPE array without copying."""
+        matrix = records.view(np.float32).reshape(len(records), FEATURE_SIZE)
+        return [cls(row) for row in matrix]
+
+    def __getitem__(self, key):
+        return self.data[FIELD_INDEX[key]]
+
+    def __setitem__(self, key, value):
+        self.data[FIELD_INDEX[key]] = value
+
+    def __contains__(self, key):
+        return key in FIELD_INDEX
+
+    def __iter__(self):
+        return iter(FIELD_INDEX)
+
+    def __len__(self):
+        return len(FIELD_INDEX)
+
+    def keys(self):
+        return FIELD_INDEX.keys()
+
+    def items(self):
+        return [(key, self[key]) for key in FIELD_INDEX]
+
+    def copy(self):
+        return FeatureVector(self.data.copy())
+
+    def __repr__(self):
+        fields = ", ".join(f"{key}={self[key]:.4g}" for key in FIELD_INDEX if key != 'chroma')
+        return f"FeatureVector({fields})"
+
+if __name__ == '__main__':
+    features = FeatureVector()
+    features.rmse = 0.1
+    features['spectral_centroid'] = 1800.0
+    features.chroma[9] = 1.0 # A
+    print(features)
+    print(f"Layout: {FEATURE_SIZE} float32 values, chroma at {FIELD_INDEX['chroma']}")
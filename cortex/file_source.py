@@ -0,0 +1,131 @@
+# cortex/file_source.py
+# WAV file input (Offline, faster-than-real-time sessions)
+
+import struct
+import numpy as np
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+def read_wav_header(path):
+    """
+    Walks the RIFF chunks of a WAV file.
+    Returns (format_tag, channels, sample_rate, bits_per_sample, data_offset, data_size).
+    """
+    with open(path, 'rb') as f:
+        riff, _, wave = struct.unpack('<4sI4s', f.read(12))
+        if riff != b'RIFF' or wave != b'WAVE':
+            raise ValueError(f"{path} is not a RIFF/WAVE file")
+
+        fmt = None
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack('<4sI', header)
+            if chunk_id == b'fmt ':
+                body = f.read(chunk_size)
+                format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', body[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE:
+                    # The real format is the first two bytes of the sub-format GUID.
+                    format_tag = struct.unpack('<H', body[24:26])[0]
+                fmt = (format_tag, channels, sample_rate, bits)
+            elif chunk_id == b'data':
+                if fmt is None:
+                    raise ValueError(f"{path} has a data chunk before its fmt chunk")
+                return fmt + (f.tell(), chunk_size)
+            else:
+                f.seek(chunk_size, 1)
+            if chunk_size % 2:
+                f.seek(1, 1) # Chunks are word aligned
+
+class FileSource:
+    def __init__(self, path, sample_rate=44100, chunk_size=1024, channels=1):
+        """
+        A drop-in replacement for `Listener` that plays back a WAV file.
+        The file is memory-mapped, so only the chunks being analyzed are ever
+        paged in, and `listen` returns as fast as the caller asks.
+        With `channels=1` the file is mixed down to mono; otherwise the first
+        `channels` channels are returned as (channels, chunk_size) arrays.
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.channels = channels
+
+        format_tag, self.file_channels, file_rate, bits, offset, size = read_wav_header(path)
+        if file_rate != sample_rate:
+            raise ValueError(f"{path} is sampled at {file_rate} Hz, expected {sample_rate} Hz")
+        if channels > 1 and channels > self.file_channels:
+            raise ValueError(f"{path} has {self.file_channels} channel(s), {channels} requested")
+
+        if format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+            dtype, self._scale = np.dtype(f'<f{bits // 8}'), 1.0
+        elif format_tag == WAVE_FORMAT_PCM and bits == 8:
+            dtype, self._scale = np.dtype('u1'), 1.0 / 128
+        elif format_tag == WAVE_FORMAT_PCM and bits in (16, 32):
+            dtype, self._scale = np.dtype(f'<i{bits // 8}'), 1.0 / 2**(bits - 1)
+        elif format_tag == WAVE_FORMAT_PCM and bits == 24:
+            dtype, self._scale = np.dtype('u1'), 1.0 / 2**23
+        else:
+            raise ValueError(f"Unsupported WAV encoding in {path}: format {format_tag}, {bits} bits")
+        self.bits = bits
+
+        frame_bytes = self.file_channels * bits // 8
+        self.n_frames = size // frame_bytes
+        if bits == 24:
+            shape = (self.n_frames, self.file_channels, 3)
+        else:
+            shape = (self.n_frames, self.file_channels)
+        self._data = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        self.position = 0 # Frames consumed so far
+
+    @property
+    def exhausted(self):
+        return self.position >= self.n_frames
+
+    @property
+    def seconds_read(self):
+        return min(self.position, self.n_frames) / self.sample_rate
+
+    def _to_float(self, raw):
+        if self.bits == 24:
+            raw = raw.astype(np.int32)
+            raw = raw[..., 0] | (raw[..., 1] << 8) | (raw[..., 2] << 16)
+            raw = np.where(raw >= 2**23, raw - 2**24, raw)
+        elif self.bits == 8:
+            raw = raw.astype(np.int16) - 128
+        return raw.astype(np.float32) * np.float32(self._scale)
+
+    def listen(self):
+        """
+        Returns the next chunk of the file.
+        The final chunk is zero-padded; reading past the end raises EOFError.
+        """
+        if self.exhausted:
+            raise EOFError(f"Reached the end of {self.path}")
+        end = min(self.position + self.chunk_size, self.n_frames)
+        if self.channels == 1:
+            samples = self._to_float(self._data[self.position:end]).mean(axis=1)
+        else:
+            samples = self._to_float(self._data[self.position:end, :self.channels]).T
+        self.position += self.chunk_size
+        missing = self.chunk_size - samples.shape[-1]
+        if missing:
+            samples = np.pad(samples, [(0, 0)] * (samples.ndim - 1) + [(0, missing)])
+        return np.ascontiguousarray(samples)
+
+    def stop(self):
+        self._data = None
+
+if __name__ == '__main__':
+    import sys
+    source = FileSource(sys.argv[1])
+    print(f"{source.path}: {source.n_frames / source.sample_rate:.1f}s, "
+          f"{source.file_channels} channel(s), {source.bits}-bit")
+    chunks = 0
+    while not source.exhausted:
+        chunk = source.listen()
+        chunks += 1
+    print(f"Read {chunks} chunks of {source.chunk_size} samples.")
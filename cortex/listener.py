@@ -4,21 +4,75 @@
 import pyaudio
 import numpy as np
 
+from cortex.ring import SampleRing
+
 class Listener:
-    def __init__(self, sample_rate=44100, chunk_size=1024):
+    def __init__(self, sample_rate=44100, chunk_size=1024, mode="blocking", buffer_seconds=2.0,
+                 channels=1):
+        """
+        Captures the live input.
+        In "blocking" mode `listen` reads straight from the PortAudio stream.
+        In "callback" mode the audio thread copies every buffer into a
+        preallocated ring, so capture never waits on the rest of the pipeline.
+        With more than one channel, chunks are (channels, chunk_size) arrays.
+        """
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
+        self.channels = channels
+        self.mode = mode
+        self.ring = None
+        self.input_overflows = 0 # Buffers PortAudio itself reported as overflowed
+        if mode == "callback":
+            self.ring = SampleRing(max(int(buffer_seconds * sample_rate), 4 * chunk_size),
+                                   channels=channels if channels > 1 else None)
+        elif mode != "blocking":
+            raise ValueError(f"Unknown listener mode '{mode}'")
+
         self.p = pyaudio.PyAudio()
         self.stream = self.p.open(format=pyaudio.paFloat32,
-                                  channels=1,
+                                  channels=self.channels,
                                   rate=self.sample_rate,
                                   input=True,
-                                  frames_per_buffer=self.chunk_size)
+                                  frames_per_buffer=self.chunk_size,
+                                  stream_callback=self._capture if self.ring else None)
+
+    def _capture(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread: copy and return, nothing else.
+        if status & pyaudio.paInputOverflow:
+            self.input_overflows += 1
+        samples = np.frombuffer(in_data, dtype=np.float32)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels)
+        self.ring.write(samples)
+        return (None, pyaudio.paContinue)
 
-    def listen(self):
+    def listen(self, timeout=None):
         """Returns a chunk of audio data from the stream."""
-        data = np.frombuffer(self.stream.read(self.chunk_size), dtype=np.float32)
-        return data
+        if self.ring is not None:
+            data = self.ring.read(self.chunk_size, timeout=timeout)
+        else:
+            data = np.frombuffer(self.stream.read(self.chunk_size), dtype=np.float32)
+        if data is None or self.channels == 1:
+            return data
+        # Interleaved frames -> one row per channel
+        return np.ascontiguousarray(data.reshape(-1, self.channels).T)
+
+    def latest(self, n):
+        """Returns the most recent `n` captured samples without consuming them."""
+        if self.ring is None:
+            raise RuntimeError("latest() requires the listener to run in callback mode")
+        data = self.ring.latest(n)
+        return data if self.channels == 1 else np.ascontiguousarray(data.T)
+
+    @property
+    def overflows(self):
+        """Samples dropped because capture outran the consumer."""
+        return self.ring.overflows if self.ring is not None else 0
+
+    @property
+    def underruns(self):
+        """Reads that had to wait for new audio to arrive."""
+        return self.ring.underruns if self.ring is not None else 0
 
     def stop(self):
         self.stream.stop_stream()
@@ -26,12 +80,13 @@ class Listener:
         self.p.terminate()
 
 if __name__ == '__main__':
-    listener = Listener()
+    listener = Listener(mode="callback")
     print("Listening...")
     try:
         while True:
             data = listener.listen()
-            print(f"RMS: {np.sqrt(np.mean(data**2)):.4f}")
+            print(f"RMS: {np.sqrt(np.mean(data**2)):.4f}  "
+                  f"(overflows: {listener.overflows}, underruns: {listener.underruns})")
     except KeyboardInterrupt:
         print("Stopping.")
         listener.stop()
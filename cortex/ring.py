@@ -0,0 +1,121 @@
+# cortex/ring.py
+# Lock-free single-producer / single-consumer sample ring
+
+import time
+import numpy as np
+
+class SampleRing:
+    def __init__(self, capacity, channels=None, dtype=np.float32, poll_interval=0.001):
+        """
+        A preallocated ring of samples shared by one producer (the audio thread)
+        and one consumer (the analysis loop).
+        The producer never waits: when the consumer falls behind, the oldest
+        unread samples are overwritten and counted as an overflow. Each side only
+        ever advances its own counter, so no lock is needed.
+        With `channels` set, each sample is a frame of that many channels and
+        reads return (n, channels) arrays.
+        """
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        self._frame_shape = () if channels is None else (channels,)
+        self._buffer = np.zeros((capacity,) + self._frame_shape, dtype=dtype)
+        self._written = 0 # Total samples written, only advanced by the producer
+        self._read = 0    # Total samples consumed, only advanced by the consumer
+        self._largest_write = 0
+        self.overflows = 0 # Samples lost because the consumer fell behind
+        self.underruns = 0 # Reads that had to wait for the producer
+
+    def write(self, samples):
+        """Producer side: copies samples in, overwriting the oldest if full."""
+        n = len(samples)
+        if n > self.capacity:
+            samples = samples[-self.capacity:]
+            self._written += n - self.capacity
+            n = self.capacity
+
+        if n > self._largest_write:
+            self._largest_write = n
+
+        start = self._written % self.capacity
+        end = start + n
+        if end <= self.capacity:
+            self._buffer[start:end] = samples
+        else:
+            split = self.capacity - start
+            self._buffer[start:] = samples[:split]
+            self._buffer[:end - self.capacity] = samples[split:]
+        # Publish only once the samples are in place.
+        self._written += n
+
+    def available(self):
+        """Number of unread samples (at most `capacity`)."""
+        return min(self._written - self._read, self.capacity)
+
+    def _copy(self, start, n, out):
+        begin = start % self.capacity
+        end = begin + n
+        if end <= self.capacity:
+            out[:] = self._buffer[begin:end]
+        else:
+            split = self.capacity - begin
+            out[:split] = self._buffer[begin:]
+            out[split:] = self._buffer[:end - self.capacity]
+        # If the producer lapped us while copying (or is about to publish a
+        # write that did), part of `out` is newer audio.
+        return self._written + self._largest_write - start <= self.capacity
+
+    def read(self, n, timeout=None, out=None):
+        """
+        Consumer side: returns the next `n` unread samples, waiting for the
+        producer if they have not arrived yet. Returns None on timeout.
+        `n` plus the largest producer write must fit in the ring.
+        """
+        if self._written - self._read < n:
+            self.underruns += 1
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._written - self._read < n:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+                time.sleep(self.poll_interval)
+
+        if out is None:
+            out = np.empty((n,) + self._frame_shape, dtype=self._buffer.dtype)
+        while True:
+            # Leave room for a write in flight; anything older is (about to be)
+            # overwritten, so skip to what is left.
+            limit = self.capacity - self._largest_write
+            lag = self._written - self._read
+            if lag > limit:
+                self.overflows += lag - limit
+                self._read = self._written - limit
+            if self._copy(self._read, n, out):
+                break
+        self._read += n
+        return out
+
+    def latest(self, n, out=None):
+        """Returns the most recent `n` samples without consuming anything."""
+        n = min(n, self.capacity - self._largest_write)
+        if out is None:
+            out = np.empty((n,) + self._frame_shape, dtype=self._buffer.dtype)
+        while not self._copy(self._written - n, n, out):
+            pass
+        return out
+
+if __name__ == '__main__':
+    import threading
+
+    ring = SampleRing(capacity=4096)
+
+    def produce():
+        for i in range(100):
+            ring.write(np.full(256, i, dtype=np.float32))
+            time.sleep(0.001)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    chunks = [ring.read(1024) for _ in range(25)]
+    producer.join()
+
+    print(f"Read {len(chunks)} chunks, last value {chunks[-1][-1]:.0f}")
+    print(f"Overflows: {ring.overflows}, underruns: {ring.underruns}")
@@ -0,0 +1,214 @@
+# cortex/streaming.py
+# Stateful feature extraction over a rolling window of context
+
+import librosa
+import numpy as np
+
+from cortex.features import FeatureVector
+from cortex.tempo import TempoTracker
+
+# Per-frame columns kept in the rolling history. The window features are the
+# running means of these columns.
+FRAME_COLUMNS = ['rmse', 'spectral_centroid', 'spectral_bandwidth',
+                 'spectral_rolloff', 'zero_crossing_rate', 'onset']
+N_CHROMA = 12
+
+class StreamingAnalyzer:
+    def __init__(self, sample_rate=44100, n_fft=2048, hop_length=512, window_seconds=4.0,
+                 onset_delta=0.07, onset_wait=0.03):
+        """
+        A streaming counterpart of `Analyzer`.
+        Audio chunks are appended to a sample ring; every time `hop_length` new
+        samples have arrived, one STFT frame is analyzed and folded into running
+        aggregates over the last `window_seconds` of audio. The work per call only
+        depends on how many samples arrived, not on the window length.
+        """
+        self.sample_rate = sample_rate
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.window_frames = max(1, int(round(window_seconds * sample_rate / hop_length)))
+        self.onset_delta = onset_delta
+        self.onset_wait = max(1, int(onset_wait * sample_rate / hop_length))
+
+        self.fft_window = librosa.filters.get_window('hann', n_fft, fftbins=True)
+        self.freqs = librosa.fft_frequencies(sr=sample_rate, n_fft=n_fft)
+        self.mel_basis = librosa.filters.mel(sr=sample_rate, n_fft=n_fft)
+        # A live stream has no fixed tuning to estimate, so chroma assumes A440.
+        self.chroma_basis = librosa.filters.chroma(sr=sample_rate, n_fft=n_fft, n_chroma=N_CHROMA)
+
+        # Each sample is written twice, n_fft apart, so the latest n_fft samples
+        # are always the contiguous slice ring[pos:pos + n_fft].
+        self._ring = np.zeros(2 * n_fft, dtype=np.float64)
+        self._frames = np.zeros((4, n_fft), dtype=np.float64)
+
+        n_columns = len(FRAME_COLUMNS) + N_CHROMA
+        self._history = np.zeros((self.window_frames, n_columns))
+        self._sums = np.zeros(n_columns)
+        self.tempo_tracker = TempoTracker(sample_rate=sample_rate, hop_length=hop_length)
+        # Cleared by the scheduler when a tick runs out of time: new frames
+        # then skip the tempo update and repeat the last chroma.
+        self.refresh_tempo = True
+        self.refresh_chroma = True
+        self.reset()
+
+    def reset(self):
+        """Forgets all buffered audio and context."""
+        self._ring[:] = 0
+        self._pos = 0
+        self._since_frame = 0
+        self._history[:] = 0
+        self._sums[:] = 0
+        self._head = 0
+        self.frame_count = 0
+        self._prev_mel_db = None
+        self._recent_onsets = np.zeros(2)
+        self._onset_peak = 0.0
+        self._flux_mean = 0.0
+        self._frames_since_onset = self.onset_wait
+        self.tempo_tracker.reset()
+
+    def _write(self, samples):
+        start = self._pos
+        end = start + len(samples)
+        if end <= self.n_fft:
+            self._ring[start:end] = samples
+            self._ring[start + self.n_fft:end + self.n_fft] = samples
+        else:
+            split = self.n_fft - start
+            self._ring[start:self.n_fft] = samples[:split]
+            self._ring[start + self.n_fft:] = samples[:split]
+            self._ring[:end - self.n_fft] = samples[split:]
+            self._ring[self.n_fft:end] = samples[split:]
+        self._pos = end % self.n_fft
+
+    def push(self, audio_chunk):
+        """
+        Appends samples to the ring and returns the (k, n_fft) block of frames
+        completed by them, oldest first.
+        """
+        max_frames = (self._since_frame + len(audio_chunk)) // self.hop_length
+        if max_frames > len(self._frames):
+            self._frames = np.zeros((max_frames, self.n_fft), dtype=np.float64)
+
+        k = 0
+        start = 0
+        while start < len(audio_chunk):
+            take = min(self.hop_length - self._since_frame, len(audio_chunk) - start)
+            self._write(audio_chunk[start:start + take])
+            self._since_frame += take
+            start += take
+            if self._since_frame == self.hop_length:
+                self._since_frame = 0
+                self._frames[k] = self._ring[self._pos:self._pos + self.n_fft]
+                k += 1
+        return self._frames[:k]
+
+    def _frame_features(self, frames):
+        """Computes the per-frame feature rows for a block of frames."""
+        rows = np.empty((len(frames), len(FRAME_COLUMNS) + N_CHROMA))
+
+        rows[:, 0] = np.sqrt(np.mean(frames**2, axis=1))
+        signs = np.signbit(frames)
+        rows[:, 4] = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.n_fft
+
+        S = np.abs(np.fft.rfft(frames * self.fft_window, axis=1))
+        power = S**2
+        total = np.maximum(S.sum(axis=1), 1e-10)
+        centroid = (S @ self.freqs) / total
+        rows[:, 1] = centroid
+        rows[:, 2] = np.sqrt(np.sum(S * (self.freqs - centroid[:, None])**2, axis=1) / total)
+        cumulative = np.cumsum(S, axis=1)
+        rolloff_bin = np.argmax(cumulative >= 0.85 * cumulative[:, -1:], axis=1)
+        rows[:, 3] = self.freqs[rolloff_bin]
+
+        if self.refresh_chroma or self.frame_count == 0:
+            chroma = power @ self.chroma_basis.T
+            rows[:, len(FRAME_COLUMNS):] = chroma / np.maximum(chroma.max(axis=1, keepdims=True), 1e-10)
+        else:
+            rows[:, len(FRAME_COLUMNS):] = self._history[self._head - 1, len(FRAME_COLUMNS):]
+
+        mel_db = 10.0 * np.log10(np.maximum(power @ self.mel_basis.T, 1e-10))
+        mel_db = np.maximum(mel_db, mel_db.max(axis=1, keepdims=True) - 80.0)
+        rows[:, 5] = self._onsets(mel_db)
+        return rows
+
+    def _onsets(self, mel_db):
+        """
+        Spectral flux onset strength with causal peak picking.
+        Returns a 0/1 onset flag per frame.
+        """
+        previous = mel_db[0] if self._prev_mel_db is None else self._prev_mel_db
+        flux = np.empty(len(mel_db))
+        flux[0] = np.mean(np.maximum(0.0, mel_db[0] - previous))
+        flux[1:] = np.mean(np.maximum(0.0, mel_db[1:] - mel_db[:-1]), axis=1)
+        self._prev_mel_db = mel_db[-1].copy()
+        if self.refresh_tempo:
+            self.tempo_tracker.update(flux)
+
+        flags = np.zeros(len(mel_db))
+        for i, strength in enumerate(flux):
+            # A frame is an onset once the following frame shows it was a local
+            # peak that stands clear of the recent average.
+            before, candidate = self._recent_onsets
+            self._onset_peak = max(strength, 0.999 * self._onset_peak)
+            threshold = self._flux_mean + self.onset_delta * self._onset_peak
+            self._frames_since_onset += 1
+            if candidate > before and candidate >= strength and candidate > threshold \
+               and self._frames_since_onset > self.onset_wait:
+                flags[i] = 1.0
+                self._frames_since_onset = 0
+            self._recent_onsets[0] = candidate
+            self._recent_onsets[1] = strength
+            self._flux_mean += (strength - self._flux_mean) / self.window_frames
+        return flags
+
+    def _fold(self, rows):
+        """Folds new frame rows into the rolling history and running sums."""
+        for row in rows:
+            self._sums += row - self._history[self._head]
+            self._history[self._head] = row
+            self._head = (self._head + 1) % self.window_frames
+            self.frame_count += 1
+            if self._head == 0:
+                # Re-sum once per window so floating-point drift cannot build up.
+                self._sums[:] = self._history.sum(axis=0)
+
+    def analyze(self, audio_chunk, out=None):
+        """
+        Appends an audio chunk to the stream and returns the features of the
+        rolling window as a FeatureVector; pass `out` to have it filled in place.
+        """
+        frames = self.push(np.asarray(audio_chunk, dtype=np.float64))
+        if len(frames):
+            self._fold(self._frame_features(frames))
+
+        features = out if out is not None else FeatureVector()
+        count = max(min(self.frame_count, self.window_frames), 1)
+        window_seconds = count * self.hop_length / self.sample_rate
+        for i, name in enumerate(FRAME_COLUMNS[:5]):
+            features[name] = self._sums[i] / count
+        features.onset_density = self._sums[5] / window_seconds
+        features.tempo = self.tempo_tracker.bpm
+        features.chroma = self._sums[len(FRAME_COLUMNS):] / count
+        return features
+
+if __name__ == '__main__':
+    sample_rate = 44100
+    chunk_size = 1024
+    t = np.arange(sample_rate * 4) / sample_rate
+    audio = np.zeros_like(t)
+    for i in range(8): # A note every half second
+        start = int(i * sample_rate / 2)
+        end = start + int(sample_rate / 10)
+        audio[start:end] = 0.5 * np.sin(2. * np.pi * 440 * (1.059463 ** i) * t[start:end])
+
+    analyzer = StreamingAnalyzer(sample_rate, window_seconds=2.0)
+    for start in range(0, len(audio), chunk_size):
+        features = analyzer.analyze(audio[start:start + chunk_size])
+
+    print("--- Streaming Features (last 2 seconds) ---")
+    for key, value in features.items():
+        if key == 'chroma':
+            print(f"  {key}: {np.round(value, 3)}")
+        else:
+            print(f"  {key}: {value:.4f}")
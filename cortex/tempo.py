@@ -0,0 +1,117 @@
+# cortex/tempo.py
+# Incremental tempo estimation from an onset strength stream
+
+import numpy as np
+
+class TempoTracker:
+    def __init__(self, sample_rate=44100, hop_length=512, min_bpm=40.0, max_bpm=240.0,
+                 start_bpm=120.0, std_bpm=1.0, half_life=6.0, channels=None):
+        """
+        Estimates tempo from onset strength values as they arrive.
+        A leaky autocorrelation over the candidate beat periods is updated with
+        every new onset frame, so each update costs the same however long the
+        tracker has been listening. Only the last `max period` onset values are
+        kept. `half_life` (seconds) sets how quickly old evidence fades.
+        With `channels` set, that many independent streams are tracked at once
+        and `bpm` / `confidence` are per-channel arrays.
+        """
+        self.frame_rate = sample_rate / hop_length
+        self.channels = channels
+        min_lag = max(1, int(np.floor(60.0 * self.frame_rate / max_bpm)))
+        max_lag = int(np.ceil(60.0 * self.frame_rate / min_bpm))
+        self.lags = np.arange(min_lag, max_lag + 1)
+        self.decay = 0.5 ** (1.0 / (half_life * self.frame_rate))
+
+        # Log-normal prior around `start_bpm`, as in librosa's tempo estimator.
+        bpms = 60.0 * self.frame_rate / self.lags
+        self.prior = np.exp(-0.5 * ((np.log2(bpms) - np.log2(start_bpm)) / std_bpm)**2)
+
+        n = 1 if channels is None else channels
+        self._history = np.zeros((n, max_lag + 1))
+        self._acf = np.zeros((n, len(self.lags)))
+        self._mean = np.zeros(n)
+        self._energy = np.zeros(n)
+        self.reset()
+
+    def reset(self):
+        """Forgets all onset history."""
+        self._history[:] = 0
+        self._acf[:] = 0
+        self._mean[:] = 0
+        self._energy[:] = 0
+        self._pos = 0
+        self._estimate = None
+
+    def update(self, onset_values):
+        """
+        Appends new onset strength values (one per analysis frame).
+        Multi-channel trackers take a (channels, frames) array.
+        """
+        onset_values = np.asarray(onset_values, dtype=np.float64)
+        if self.channels is None:
+            onset_values = np.atleast_1d(onset_values)[None, :]
+
+        size = self._history.shape[1]
+        for value in onset_values.T:
+            self._mean += (1.0 - self.decay) * (value - self._mean)
+            centered = value - self._mean
+            past = self._history[:, (self._pos - self.lags) % size]
+            self._acf *= self.decay
+            self._acf += centered[:, None] * past
+            self._energy *= self.decay
+            self._energy += centered * centered
+            self._history[:, self._pos] = centered
+            self._pos = (self._pos + 1) % size
+        self._estimate = None
+
+    def _estimate_tempo(self):
+        bpm = np.zeros(len(self._acf))
+        confidence = np.zeros(len(self._acf))
+        weighted = np.maximum(self._acf, 0.0) * self.prior
+        for c in range(len(self._acf)):
+            i = int(np.argmax(weighted[c]))
+            if self._energy[c] <= 1e-10 or weighted[c, i] <= 0:
+                continue
+
+            # Parabolic interpolation between neighbouring lags for a sub-frame period.
+            lag = float(self.lags[i])
+            if 0 < i < len(self.lags) - 1:
+                left, centre, right = weighted[c, i - 1:i + 2]
+                curvature = left - 2 * centre + right
+                if curvature < 0:
+                    lag += 0.5 * (left - right) / curvature
+
+            # How far the chosen period stands out from the average period.
+            contrast = self._acf[c, i] - np.mean(self._acf[c])
+            bpm[c] = 60.0 * self.frame_rate / lag
+            confidence[c] = np.clip(contrast / self._energy[c], 0.0, 1.0)
+
+        if self.channels is None:
+            return float(bpm[0]), float(confidence[0])
+        return bpm, confidence
+
+    @property
+    def bpm(self):
+        """The current tempo estimate in beats per minute (0 if unknown)."""
+        if self._estimate is None:
+            self._estimate = self._estimate_tempo()
+        return self._estimate[0]
+
+    @property
+    def confidence(self):
+        """How periodic the recent onsets are at the estimated tempo (0..1)."""
+        if self._estimate is None:
+            self._estimate = self._estimate_tempo()
+        return self._estimate[1]
+
+if __name__ == '__main__':
+    # A click track at 128 BPM, as seen through an onset envelope.
+    tracker = TempoTracker()
+    period = 60.0 * tracker.frame_rate / 128.0
+    onsets = np.zeros(int(tracker.frame_rate * 10))
+    onsets[np.round(np.arange(0, len(onsets), period)).astype(int)[:-1]] = 1.0
+
+    for start in range(0, len(onsets), 2): # Two frames per 1024-sample chunk
+        tracker.update(onsets[start:start + 2])
+
+    print(f"Estimated tempo: {tracker.bpm:.1f} BPM (confidence {tracker.confidence:.2f})")
@@ -4,23 +4,31 @@
 import argparse
 import time
 import yaml
+import numpy as np
 import torch
 from rich.live import Live
 from rich.panel import Panel
 from rich.layout import Layout
 from rich.console import Console
 
-from cortex.listener import Listener
-from cortex.analyzer import Analyzer
+from cortex.file_source import FileSource
+from cortex.analyzer import make_analyzer
+from cortex.features import FeatureVector, FEATURE_SIZE
 from cortex.vibe_check import VibeCheck
 from psyche.personality import Personality
 from psyche.memory import ShortTermMemory, flatten_features
 from psyche.decision import DecisionMaker
+from spine.inference import set_inference_threads
+from spine.pipeline import Pipeline
+from spine.scheduler import DeadlineScheduler
+from spine.session import SessionHost
+from spine.telemetry import Telemetry
+from voice.cache import ResponseCache
 from voice.hallucinator import Hallucinator
-from voice.streamer import Streamer
+from voice.file_sink import FileSink
 
 # The number of features extracted by the analyzer.
-INPUT_FEATURE_SIZE = 19
+INPUT_FEATURE_SIZE = FEATURE_SIZE
 
 def load_config(persona_name):
     """Loads persona and biometric configurations."""
@@ -42,9 +50,99 @@ def create_layout() -> Layout:
         Layout(name="header", size=3),
         Layout(ratio=1, name="main"),
     )
-    layout["main"].split_row(Layout(name="state"), Layout(name="log", ratio=2))
+    layout["main"].split_row(Layout(name="state"), Layout(name="side", ratio=2))
+    layout["side"].split_column(Layout(name="log"), Layout(name="telemetry"))
     return layout
 
+def lead_channel(channel_features):
+    """
+    Picks the loudest channel of a multi-channel analysis; its features drive
+    the psyche. Returns (index, FeatureVector view of that channel's record).
+    """
+    lead = int(np.argmax(channel_features['rmse']))
+    return lead, FeatureVector.rows(channel_features)[lead]
+
+def open_audio(args, bio_metrics):
+    """
+    Opens the input and output: WAV files for offline renders, PortAudio
+    streams otherwise. Audio devices are only touched for live sessions, so
+    offline renders run on machines without PortAudio.
+    Returns (listener, streamer).
+    """
+    channels = bio_metrics.get('channels', 1)
+    if args.input:
+        listener = FileSource(args.input, sample_rate=bio_metrics['sample_rate'],
+                              chunk_size=bio_metrics['chunk_size'], channels=channels)
+    else:
+        from cortex.listener import Listener
+        listener = Listener(sample_rate=bio_metrics['sample_rate'], chunk_size=bio_metrics['chunk_size'],
+                            mode=bio_metrics.get('listener_mode', 'blocking'),
+                            buffer_seconds=bio_metrics.get('listener_buffer', 2.0),
+                            channels=channels)
+    try:
+        if args.output:
+            streamer = FileSink(args.output, sample_rate=bio_metrics['sample_rate'],
+                                chunk_size=bio_metrics['chunk_size'],
+                                buffer_seconds=bio_metrics.get('streamer_buffer', 4.0),
+                                crossfade=bio_metrics.get('crossfade', 0.02),
+                                length=getattr(listener, 'n_frames', None))
+        else:
+            from voice.streamer import Streamer
+            streamer = Streamer(sample_rate=bio_metrics['sample_rate'],
+                                mode=bio_metrics.get('streamer_mode', 'blocking'),
+                                buffer_seconds=bio_metrics.get('streamer_buffer', 4.0),
+                                crossfade=bio_metrics.get('crossfade', 0.02))
+    except Exception:
+        listener.stop() # Don't leave the input stream open
+        raise
+    return listener, streamer
+
+def host_sessions(args, bio_metrics, console):
+    """
+    Renders every `--session PERSONA INPUT OUTPUT` in one SessionHost, their
+    memories stepped together in one batched call per tick.
+    """
+    with open('config/persona.yaml', 'r') as f:
+        personas = yaml.safe_load(f)
+    inference = bio_metrics.get('inference', {})
+    set_inference_threads(inference.get('threads', 1), inference.get('interop_threads'))
+    cache_mb = bio_metrics.get('response_cache_mb', 32)
+    host = SessionHost(sample_rate=bio_metrics['sample_rate'], chunk_size=bio_metrics['chunk_size'],
+                       hidden_size=bio_metrics['memory_hidden_size'], variant=inference.get('variant'),
+                       capacity=len(args.session),
+                       analysis_mode=bio_metrics.get('analysis_mode', 'chunk'),
+                       analysis_window=bio_metrics.get('analysis_window', 4.0))
+    seconds = 0.0
+    for persona, input_path, output_path in args.session:
+        if persona not in personas:
+            console.print(f"[bold red]Persona '{persona}' not found in persona.yaml[/bold red]")
+            return
+        listener = FileSource(input_path, sample_rate=bio_metrics['sample_rate'],
+                              chunk_size=bio_metrics['chunk_size'])
+        streamer = FileSink(output_path, sample_rate=bio_metrics['sample_rate'],
+                            chunk_size=bio_metrics['chunk_size'],
+                            buffer_seconds=bio_metrics.get('streamer_buffer', 4.0),
+                            crossfade=bio_metrics.get('crossfade', 0.02),
+                            length=listener.n_frames)
+        hallucinator = Hallucinator(model_path=args.model, variant=inference.get('variant', 'eager'),
+                                    cache=ResponseCache(max_bytes=int(cache_mb * 2**20)) if cache_mb else None)
+        # Every tick writes to the output, so it stays on its input's timeline.
+        host.add(f"{persona}:{input_path}", listener, streamer, personas[persona],
+                 hallucinator=hallucinator, every_tick=True)
+        seconds += listener.n_frames / bio_metrics['sample_rate']
+        console.print(f"Session: [bold yellow]{persona}[/bold yellow] {input_path} -> {output_path}")
+
+    started = time.perf_counter()
+    try:
+        host.run()
+    except KeyboardInterrupt:
+        console.print("\n[bold cyan]--- PNEUMA IS RETURNING TO SLUMBER ---[/bold cyan]")
+    finally:
+        host.stop()
+    elapsed = time.perf_counter() - started
+    console.print(f"Rendered {seconds:.1f}s of audio over {len(args.session)} sessions in {elapsed:.1f}s "
+                  f"([bold]{seconds / max(elapsed, 1e-9):.1f}x realtime[/bold])")
+
 def main(args):
     """The main loop of Pneuma."""
     console = Console()
@@ -57,66 +155,219 @@ def main(args):
     except (FileNotFoundError, ValueError) as e:
         console.print(f"[bold red]Error loading configuration: {e}[/bold red]")
         return
+    if getattr(args, 'session', None):
+        host_sessions(args, bio_metrics, console)
+        return
 
     # --- Initialize Components ---
-    listener = Listener(sample_rate=bio_metrics['sample_rate'], chunk_size=bio_metrics['chunk_size'])
-    analyzer = Analyzer(sample_rate=bio_metrics['sample_rate'])
+    channels = bio_metrics.get('channels', 1)
+    listener, streamer = open_audio(args, bio_metrics)
+    # Several inputs are analyzed together in one batched pass per chunk.
+    analyzer = make_analyzer(bio_metrics['sample_rate'], bio_metrics.get('analysis_mode', 'chunk'),
+                             bio_metrics.get('analysis_window', 4.0), channels)
     vibe_check = VibeCheck()
     personality = Personality(persona_config)
-    memory = ShortTermMemory(input_size=INPUT_FEATURE_SIZE, hidden_size=bio_metrics['memory_hidden_size'])
+    inference = bio_metrics.get('inference', {})
+    set_inference_threads(inference.get('threads', 1), inference.get('interop_threads'))
+    memory = ShortTermMemory(input_size=INPUT_FEATURE_SIZE, hidden_size=bio_metrics['memory_hidden_size'],
+                             incremental=bio_metrics.get('memory_incremental', False),
+                             variant=inference.get('variant', 'eager'))
     decision_maker = DecisionMaker()
-    hallucinator = Hallucinator(model_path=args.model)
-    streamer = Streamer(sample_rate=bio_metrics['sample_rate'])
+    # The voice model loads in the background while capture starts.
+    # Phrases already rendered for the same intent and context are replayed.
+    cache_mb = bio_metrics.get('response_cache_mb', 32)
+    hallucinator = Hallucinator(model_path=args.model, variant=inference.get('variant', 'eager'),
+                                cache=ResponseCache(max_bytes=int(cache_mb * 2**20)) if cache_mb else None)
+    # Offline renders run as fast as the CPU allows.
+    realtime = not args.input
+
+    # Serial mode runs every stage in turn on this thread; threaded mode gives
+    # capture, analysis, psyche, synthesis and playback a worker each.
+    threaded = bio_metrics.get('pipeline', 'serial') == 'threaded'
+
+    telemetry = Telemetry(profile_ticks=args.profile or 0)
+    # Refreshing the panel about twice a second keeps its cost off the ticks.
+    period = bio_metrics['chunk_size'] / bio_metrics['sample_rate']
+    panel_every = max(1, int(0.5 / period))
+
+    # One tick per chunk. Under load, detail is shed cheapest-first.
+    def set_refresh(name, value):
+        return lambda: setattr(analyzer, name, value)
+
+    def set_decimation(value):
+        return lambda: setattr(hallucinator.synth, 'decimation', value)
+
+    scheduler = DeadlineScheduler(
+        period=period,
+        steps=[('tempo', set_refresh('refresh_tempo', False), set_refresh('refresh_tempo', True)),
+               ('chroma', set_refresh('refresh_chroma', False), set_refresh('refresh_chroma', True)),
+               ('synthesis', set_decimation(4), set_decimation(1))],
+        realtime=realtime, overlapped=threaded,
+        budget=bio_metrics.get('deadline_budget', 0.8),
+        restore_below=bio_metrics.get('deadline_restore', 0.5),
+        telemetry=telemetry)
+
+    # Refilled in place every tick; the memory wraps it without copying.
+    features = FeatureVector()
 
     layout = create_layout()
     layout["header"].update(Panel("[bold green]PNEUMA is Listening...[/bold green]", subtitle="Press Ctrl+C to exit"))
-    
+
+    # --- Stages ---
+    def capture():
+        return listener.listen()
+
+    def analyze(audio_chunk):
+        lead, channel_features = None, None
+        if channels > 1:
+            channel_features = analyzer.analyze_batch(audio_chunk)
+            lead, tick_features = lead_channel(channel_features)
+            audio_chunk = audio_chunk[lead]
+            tempo_confidence = analyzer.channel_tempo_tracker.confidence[lead]
+        else:
+            # Threaded, the psyche may still be reading the previous record.
+            tick_features = FeatureVector() if threaded else features
+            analyzer.analyze(audio_chunk, out=tick_features)
+            tempo_confidence = analyzer.tempo_tracker.confidence
+        return audio_chunk, tick_features, tempo_confidence, lead, channel_features
+
+    def think(tick):
+        audio_chunk, features, tempo_confidence, lead, channel_features = tick
+        vibe = vibe_check.get_vibe(features)
+
+        # Psychologize
+        personality.update(vibe)
+        feature_tensor = flatten_features(features)
+        _, memory_context = memory.remember(feature_tensor)
+
+        # Decide
+        personality_state = personality.get_state()
+        intent = decision_maker.decide(personality_state, memory_context)
+
+        # Update UI
+        state_panel = Panel(
+            f"[bold]Vibe:[/bold] {vibe}\n"
+            f"[bold]Mood:[/bold] {personality_state['mood']}\n"
+            f"[bold]Co-op:[/bold] {personality_state['cooperativeness']:.2f}\n"
+            f"[bold]Tempo:[/bold] {features.tempo:.0f} BPM "
+            f"({tempo_confidence:.0%} sure)\n"
+            f"[bold]Intent:[/bold] [yellow]{intent}[/yellow]\n"
+            f"[bold]Quality:[/bold] {'-' + ', -'.join(scheduler.degraded) if scheduler.level else 'full'} "
+            f"({scheduler.missed} late)"
+            + (f"\n[bold]Band:[/bold] " + " ".join(
+                f"[{'yellow' if c == lead else 'white'}]{rms:.2f}[/]"
+                for c, rms in enumerate(channel_features['rmse'])) if channels > 1 else ""),
+            title="[cyan]Psyche State[/cyan]",
+            border_style="cyan"
+        )
+        layout["state"].update(state_panel)
+        if telemetry.ticks % panel_every == 0:
+            telemetry.set_counter('input_overflows', getattr(listener, 'overflows', 0))
+            telemetry.set_counter('input_underruns', getattr(listener, 'underruns', 0))
+            telemetry.set_counter('output_underruns', getattr(streamer, 'underruns', 0))
+            telemetry.set_counter('output_queue_ms', round(getattr(streamer, 'queue_depth', 0.0) * 1e3))
+            if hallucinator.cache is not None:
+                telemetry.set_counter('cache_hits', hallucinator.cache.hits)
+                telemetry.set_counter('cache_misses', hallucinator.cache.misses)
+            layout["telemetry"].update(telemetry.panel())
+        return intent, audio_chunk, features
+
+    # Phrases are streamed one block per tick, so a new intent is heard a
+    # block later instead of after a whole phrase has been rendered.
+    chunk_size = bio_metrics['chunk_size']
+    # A file is written one chunk per tick, on the input's timeline, so a
+    # silent tick still goes to playback (the sink writes silence for it).
+    idle = (np.zeros(0, dtype=np.float32), True, False) if args.output else None
+
+    def synthesize(decision):
+        """Returns the playback arguments (audio, append, continues), or None."""
+        intent, audio_chunk, features = decision
+        # A queued buffer needs its own copy of the synth's reused buffers.
+        play = hallucinator.respond(intent, audio_chunk, features, chunk_size, copy=threaded)
+        if intent == "silence":
+            layout["log"].update(Panel("Silence...", border_style="grey50"))
+        else:
+            layout["log"].update(Panel(f"Generated [bold magenta]{intent}[/bold magenta] audio.", border_style="magenta"))
+        return play if play is not None else idle
+
+    def synthesize_and_adapt(decision):
+        with scheduler.stage("synthesis"):
+            play = synthesize(decision)
+        scheduler.adapt()
+        return play
+
+    pipeline = None
+    if threaded:
+        # Live, stale audio and decisions are dropped rather than queued so
+        # Pneuma reacts to what is happening now; playback pushes back on
+        # synthesis. Offline, every chunk is rendered.
+        queue_size = bio_metrics.get('pipeline_queue', 2)
+        policy = 'drop_oldest' if realtime else 'block'
+        pipeline = (Pipeline()
+                    .add_stage("capture", capture)
+                    .add_stage("analysis", scheduler.timed("analysis", analyze), queue_size, policy)
+                    .add_stage("psyche", scheduler.timed("psyche", think), queue_size, policy)
+                    .add_stage("synthesis", synthesize_and_adapt, queue_size, policy)
+                    .add_stage("playback", scheduler.timed("playback", lambda play: streamer.play(*play)),
+                               queue_size, 'block'))
+
+    started = time.perf_counter()
     try:
         with Live(layout, console=console, screen=True, redirect_stderr=False, vertical_overflow="visible") as live:
+            if pipeline is not None:
+                pipeline.start().wait()
+                # The stages only all finish once the source has run dry.
+                raise EOFError
+
             while True:
-                # 1. Listen & Analyze
-                audio_chunk = listener.listen()
-                features = analyzer.analyze(audio_chunk)
-                vibe = vibe_check.get_vibe(features)
-
-                # 2. Psychologize
-                personality.update(vibe)
-                feature_tensor = flatten_features(features)
-                _, memory_context = memory.remember(feature_tensor)
-
-                # 3. Decide & Act
-                personality_state = personality.get_state()
-                intent = decision_maker.decide(personality_state, memory_context)
-
-                # Update UI
-                state_panel = Panel(
-                    f"[bold]Vibe:[/bold] {vibe}\n"
-                    f"[bold]Mood:[/bold] {personality_state['mood']}\n"
-                    f"[bold]Co-op:[/bold] {personality_state['cooperativeness']:.2f}\n"
-                    f"[bold]Intent:[/bold] [yellow]{intent}[/yellow]",
-                    title="[cyan]Psyche State[/cyan]",
-                    border_style="cyan"
-                )
-                layout["state"].update(state_panel)
-
-                # 4. Generate audio
-                if intent != "silence":
-                    generated_audio = hallucinator.generate(intent, audio_chunk)
-                    streamer.play(generated_audio.detach().numpy())
-                    layout["log"].update(Panel(f"Generated [bold magenta]{intent}[/bold magenta] audio.", border_style="magenta"))
-                else:
-                    layout["log"].update(Panel("Silence...", border_style="grey50"))
-
-
-                time.sleep(bio_metrics.get('reaction_time', 0.1))
+                audio_chunk = capture()
+                with scheduler.stage("analysis"):
+                    tick = analyze(audio_chunk)
+                with scheduler.stage("psyche"):
+                    decision = think(tick)
+                with scheduler.stage("synthesis"):
+                    play = synthesize(decision)
+                if play is not None:
+                    with scheduler.stage("playback"):
+                        streamer.play(*play)
+                scheduler.end_tick()
 
+    except EOFError:
+        console.print(f"\n[bold cyan]--- {args.input} has ended ---[/bold cyan]")
     except KeyboardInterrupt:
         console.print("\n[bold cyan]--- PNEUMA IS RETURNING TO SLUMBER ---[/bold cyan]")
     except Exception as e:
         console.print(f"\n[bold red]An unexpected error occurred: {e}[/bold red]")
     finally:
+        if pipeline is not None:
+            pipeline.stop()
+        telemetry.stop_profile()
+        telemetry.set_counter('input_overflows', getattr(listener, 'overflows', 0))
+        telemetry.set_counter('input_underruns', getattr(listener, 'underruns', 0))
+        telemetry.set_counter('output_underruns', getattr(streamer, 'underruns', 0))
+        if hallucinator.cache is not None:
+            telemetry.set_counter('cache_hits', hallucinator.cache.hits)
+            telemetry.set_counter('cache_misses', hallucinator.cache.misses)
+        if hallucinator.synth.cold_start is not None:
+            telemetry.set_counter('cold_start_ms', round(hallucinator.synth.cold_start * 1e3))
         listener.stop()
         streamer.stop()
+        if args.telemetry:
+            telemetry.dump(args.telemetry)
+
+    if args.input:
+        elapsed = time.perf_counter() - started
+        console.print(f"Rendered {listener.seconds_read:.1f}s of audio in {elapsed:.1f}s "
+                      f"([bold]{listener.seconds_read / max(elapsed, 1e-9):.1f}x realtime[/bold])")
+    if hallucinator.synth.cold_start is not None:
+        console.print(f"First voiced phrase {hallucinator.synth.cold_start * 1e3:.0f} ms after start-up")
+    stats = scheduler.stats()
+    console.print(f"{stats['missed']} of {stats['ticks']} ticks missed their "
+                  f"{scheduler.period * 1e3:.1f} ms deadline; {stats['degraded_ticks']} ran degraded")
+    if pipeline is not None:
+        for name, stats in pipeline.stats().items():
+            console.print(f"  {name:<10} {stats['processed']:>6} chunks, {stats['busy_seconds']:6.2f}s busy, "
+                          f"{stats['dropped']} dropped")
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description="PNEUMA: A Synthetic Bandmate")
@@ -124,5 +375,16 @@ if __name__ == '__main__':
                         help='The personality to load (e.g., "heckler", "shadow").')
     parser.add_argument('--model', type=str, default=None,
                         help='Path to the trained voice model checkpoint (.pth).')
+    parser.add_argument('--input', type=str, default=None,
+                        help='Listen to a WAV file instead of the microphone, as fast as possible.')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Write the generated audio to a WAV file instead of the speakers.')
+    parser.add_argument('--telemetry', type=str, default=None,
+                        help='Write per-stage latency percentiles and counters to this JSON file on exit.')
+    parser.add_argument('--profile', type=int, default=None, metavar='TICKS',
+                        help='Sample-profile the first TICKS ticks into pneuma.profile (collapsed stacks).')
+    parser.add_argument('--session', nargs=3, action='append', default=None,
+                        metavar=('PERSONA', 'INPUT', 'OUTPUT'),
+                        help='Render INPUT to OUTPUT as PERSONA; repeat to host several sessions in one process.')
     args = parser.parse_args()
     main(args)
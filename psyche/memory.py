@@ -5,10 +5,17 @@ import torch
 import torch.nn as nn
 import numpy as np
 
+from cortex.features import FeatureVector
+from spine.inference import InferenceRuntime
+
 def flatten_features(features_dict):
     """
     Flattens a dictionary of features (including numpy arrays) into a single tensor.
+    A FeatureVector is already flat: its array is wrapped without a copy.
     """
+    if isinstance(features_dict, FeatureVector):
+        return torch.from_numpy(features_dict.data).view(1, 1, -1)
+
     feature_vector = []
     # The order of features must be consistent
     for key in sorted(features_dict.keys()):
@@ -20,21 +27,62 @@ def flatten_features(features_dict):
     return torch.tensor(feature_vector, dtype=torch.float32).unsqueeze(0).unsqueeze(0)
 
 
+def lstm_step(lstm, inputs, h, c, gates, n):
+    """
+    Advances the first `n` rows of an `nn.LSTM`'s state by one step, in place.
+    `inputs` is (rows, input_size), `h` and `c` are (num_layers, rows,
+    hidden_size) and `gates` is a (num_layers, rows, 4 * hidden_size)
+    scratch buffer. Same weights (gate order i, f, g, o) and equations as
+    the LSTM itself, but no new tensors are allocated.
+    """
+    layer_input = inputs[:n]
+    for layer in range(lstm.num_layers):
+        layer_gates = gates[layer, :n]
+        torch.mm(layer_input, getattr(lstm, f'weight_ih_l{layer}').t(), out=layer_gates)
+        layer_gates.addmm_(h[layer, :n], getattr(lstm, f'weight_hh_l{layer}').t())
+        layer_gates.add_(getattr(lstm, f'bias_ih_l{layer}'))
+        layer_gates.add_(getattr(lstm, f'bias_hh_l{layer}'))
+
+        i, f, g, o = layer_gates.chunk(4, dim=1)
+        i.sigmoid_()
+        f.sigmoid_()
+        g.tanh_()
+        o.sigmoid_()
+        c[layer, :n].mul_(f).addcmul_(i, g)
+        torch.tanh(c[layer, :n], out=h[layer, :n])
+        h[layer, :n].mul_(o)
+        layer_input = h[layer, :n]
+
+
 class ShortTermMemory:
-    def __init__(self, input_size, hidden_size, num_layers=1, sequence_length=10):
+    def __init__(self, input_size, hidden_size, num_layers=1, sequence_length=10, incremental=False,
+                 variant=None):
         """
         A simple LSTM-based short-term memory.
         `input_size` should match the flattened number of features from the analyzer.
         `sequence_length` is the number of past feature sets to consider.
+        With `incremental`, each new feature set advances the LSTM by exactly one
+        step in preallocated buffers instead of re-running the whole window.
+        `variant` ("eager", "script" or "quantized") runs the LSTM through an
+        InferenceRuntime, without autograd; None keeps plain autograd calls.
         """
         self.input_size = input_size
         self.hidden_size = hidden_size
         self.num_layers = num_layers
         self.sequence_length = sequence_length
+        self.incremental = incremental
         self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+        self.runtime = None if variant is None else InferenceRuntime(self.lstm, variant)
         self.hidden = self.init_hidden()
         self.memory_sequence = []
 
+        if incremental:
+            # The last `sequence_length` feature sets, oldest overwritten first.
+            self.window = torch.zeros(sequence_length, input_size)
+            self._head = 0
+            self._count = 0
+            self._gates = torch.zeros(num_layers, 1, 4 * hidden_size)
+
     def init_hidden(self, batch_size=1):
         # The hidden state is a tuple of the hidden state and cell state
         return (torch.zeros(self.num_layers, batch_size, self.hidden_size),
@@ -45,7 +93,12 @@ class ShortTermMemory:
         Adds a new set of features to the memory and updates the LSTM state.
         `features_tensor` should be a tensor of shape (1, 1, input_size).
         """
-        self.memory_sequence.append(features_tensor)
+        if self.incremental:
+            return self._remember_step(features_tensor)
+
+        # The tensor may be a view of a feature record the analyzer refills
+        # every tick, so the memory keeps its own copy.
+        self.memory_sequence.append(features_tensor.clone())
         # Keep memory to a fixed size
         if len(self.memory_sequence) > self.sequence_length:
             self.memory_sequence.pop(0)
@@ -53,18 +106,152 @@ class ShortTermMemory:
         # The input to the LSTM should be a sequence
         sequence = torch.cat(self.memory_sequence, dim=1)
         
+        if self.runtime is not None:
+            lstm_out, self.hidden = self.runtime(sequence, self.hidden)
+            return lstm_out, self.hidden
+
         # Detach the hidden state to prevent backpropagating through the entire history
         detached_hidden = (self.hidden[0].detach(), self.hidden[1].detach())
         
         lstm_out, self.hidden = self.lstm(sequence, detached_hidden)
         return lstm_out, self.hidden
 
+    @torch.no_grad()
+    def _remember_step(self, features_tensor):
+        """
+        One LSTM step, computed in place on the hidden and cell state
+        (see `lstm_step`), allocating no new tensors per tick.
+        """
+        self.window[self._head].copy_(features_tensor.view(-1))
+        self._head = (self._head + 1) % self.sequence_length
+        self._count = min(self._count + 1, self.sequence_length)
+
+        h, c = self.hidden
+        if self.runtime is not None and self.runtime.variant != 'eager':
+            # Let the scripted/quantized LSTM take the step, then keep the
+            # result in our own (autograd-compatible) state buffers.
+            _, (new_h, new_c) = self.runtime(features_tensor.view(1, 1, -1), self.hidden)
+            h.copy_(new_h)
+            c.copy_(new_c)
+            return h[-1:].view(1, 1, self.hidden_size), self.hidden
+
+        lstm_step(self.lstm, features_tensor.view(1, -1), h, c, self._gates, 1)
+        # The output of a single step is the top layer's hidden state.
+        return h[-1:].view(1, 1, self.hidden_size), self.hidden
+
+    def get_window(self):
+        """
+        Returns the remembered feature sets, oldest first, as a tensor of shape
+        (1, n, input_size). Only available in incremental mode.
+        """
+        if self._count < self.sequence_length:
+            return self.window[:self._count].unsqueeze(0)
+        return torch.cat((self.window[self._head:], self.window[:self._head])).unsqueeze(0)
+
     def get_context(self):
         """
         Returns the current hidden state of the LSTM as the context.
         """
         return self.hidden
 
+class MemorySlot:
+    def __init__(self, bank, index):
+        """One session's row of a MemoryBank's batched state."""
+        self.bank = bank
+        self.index = index
+
+    def remember(self, features_tensor):
+        """Stages `features_tensor` (1, 1, input_size) for the bank's next step."""
+        self.bank.inputs[self.index].copy_(features_tensor.view(1, -1))
+
+    def get_context(self):
+        """This session's (hidden, cell) state, each (num_layers, 1, hidden_size), as views."""
+        h, c = self.bank.hidden
+        return h[:, self.index:self.index + 1], c[:, self.index:self.index + 1]
+
+class MemoryBank:
+    def __init__(self, input_size, hidden_size, num_layers=1, capacity=4, variant=None):
+        """
+        The short-term memories of several sessions in one process. Every
+        session has its own hidden and cell state, a row of one batched
+        LSTM state (see `ShortTermMemory.init_hidden`), and they all share
+        the LSTM's weights, so `step` advances every session with a single
+        LSTM call instead of one call per session.
+        Sessions come and go with `add` and `remove`; the rows in use are
+        kept packed at the front, and `capacity` doubles when they run out.
+        Each step is one incremental LSTM step per session, like
+        `ShortTermMemory(incremental=True)`, always without autograd;
+        `variant` picks the InferenceRuntime ("eager" by default).
+        """
+        self.input_size = input_size
+        self.hidden_size = hidden_size
+        self.num_layers = num_layers
+        self.lstm = nn.LSTM(input_size, hidden_size, num_layers, batch_first=True)
+        self.runtime = InferenceRuntime(self.lstm, 'eager' if variant is None else variant)
+        self.slots = []
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        n = len(self.slots)
+        inputs = torch.zeros(capacity, 1, self.input_size)
+        hidden = (torch.zeros(self.num_layers, capacity, self.hidden_size),
+                  torch.zeros(self.num_layers, capacity, self.hidden_size))
+        if n:
+            inputs[:n] = self.inputs[:n]
+            hidden[0][:, :n] = self.hidden[0][:, :n]
+            hidden[1][:, :n] = self.hidden[1][:, :n]
+        self.inputs, self.hidden = inputs, hidden
+        self._gates = torch.zeros(self.num_layers, capacity, 4 * self.hidden_size)
+        self.capacity = capacity
+
+    def __len__(self):
+        return len(self.slots)
+
+    def add(self):
+        """A MemorySlot for a new session, starting from an empty memory."""
+        if len(self.slots) == self.capacity:
+            self._allocate(2 * self.capacity)
+        slot = MemorySlot(self, len(self.slots))
+        self.slots.append(slot)
+        return slot
+
+    def remove(self, slot):
+        """Frees `slot`; the last session's row moves into its place."""
+        if slot.bank is not self:
+            raise ValueError("The slot is not in this bank (removed already, or from another bank)")
+        last = self.slots.pop()
+        if last is not slot:
+            i, j = slot.index, last.index
+            self.inputs[i] = self.inputs[j]
+            self.hidden[0][:, i] = self.hidden[0][:, j]
+            self.hidden[1][:, i] = self.hidden[1][:, j]
+            last.index = i
+            self.slots[i] = last
+        j = len(self.slots)
+        self.inputs[j] = 0.0
+        self.hidden[0][:, j] = 0.0
+        self.hidden[1][:, j] = 0.0
+        slot.bank = None
+
+    @torch.no_grad()
+    def step(self):
+        """
+        Advances every session by one step on the features it staged.
+        Returns the top layer's hidden state for each, (sessions, 1, hidden_size).
+        """
+        n = len(self.slots)
+        h, c = self.hidden
+        if self.runtime.variant != 'eager':
+            _, (new_h, new_c) = self.runtime(self.inputs[:n], (h[:, :n].contiguous(), c[:, :n].contiguous()))
+            # In place, so contexts handed out by the slots stay current.
+            h[:, :n] = new_h
+            c[:, :n] = new_c
+            return h[-1, :n].unsqueeze(1)
+
+        # The same step as ShortTermMemory._remember_step, one row per session.
+        lstm_step(self.lstm, self.inputs[:, 0], h, c, self._gates, n)
+        return h[-1, :n].unsqueeze(1)
+
 if __name__ == '__main__':
     # This corresponds to the features from the enhanced analyzer
     # 12 (chroma) + 1 (onset_density) + 1 (rmse) + 1 (spec_band) + 1 (spec_cent) + 1 (spec_roll) + 1 (tempo) + 1 (zcr) = 19
@@ -15,7 +15,7 @@ setup(
     long_description=open('README.md').read(),
     long_description_content_type="text/markdown",
     url="https://github.com/frangedev/pneuma",
-    packages=find_packages(exclude=["tests"]),
+    packages=find_packages(exclude=["tests", "benchmarks"]),
     install_requires=read_requirements(),
     classifiers=[
         "Programming Language :: Python :: 3",
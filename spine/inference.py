@@ -0,0 +1,149 @@
+# spine/inference.py
+# Low-latency torch inference for the psyche and voice models
+
+import copy
+import time
+import warnings
+import weakref
+import numpy as np
+import torch
+import torch.nn as nn
+
+VARIANTS = ('eager', 'script', 'quantized')
+
+def set_inference_threads(threads=1, interop_threads=None):
+    """
+    Sets torch's (process-wide) thread pools. The models here are tiny and
+    called at audio rate, so one or two intra-op threads beat the default of
+    one per core, which mostly buys synchronization overhead.
+    """
+    torch.set_num_threads(threads)
+    if interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only settable before any inter-op work has started.
+            pass
+
+class _Holder(nn.Module):
+    # quantize_dynamic swaps child modules, never the root, so a bare
+    # nn.LSTM or nn.Linear needs a parent to be replaced in.
+    def __init__(self, module):
+        super().__init__()
+        self.module = module
+
+    def forward(self, *args):
+        return self.module(*args)
+
+class InferenceRuntime:
+    def __init__(self, module, variant='eager'):
+        """
+        Runs a torch module without autograd.
+        `variant` picks how it is executed:
+          - "eager": the module as is, under torch.inference_mode
+          - "script": a TorchScript graph traced on the first call
+          - "quantized": a copy with dynamically int8-quantized Linear/LSTM layers
+        The caller's module is never modified; it runs in whatever train/eval
+        mode the caller left it in. The traced graph and the quantized copy are
+        rebuilt when `load_state_dict` loads new weights into the module; call
+        `rebuild` after changing them any other way.
+        A module that already is TorchScript runs as is under "eager" and
+        "script"; it cannot be quantized.
+        """
+        if variant not in VARIANTS:
+            raise ValueError(f"Unknown inference variant '{variant}', expected one of {VARIANTS}")
+        scripted = isinstance(module, torch.jit.ScriptModule)
+        if scripted and variant == 'quantized':
+            raise ValueError("A TorchScript module cannot be quantized; pass the Python module")
+        self.module = module
+        self.variant = variant
+        self.compiled = self.module if variant == 'eager' or scripted else None
+        if self.compiled is None:
+            self.rebuild()
+            # A weak reference, so the hook does not keep the runtime alive.
+            runtime = weakref.ref(self)
+            def on_load(module, incompatible_keys):
+                target = runtime()
+                if target is not None:
+                    target.rebuild()
+            self._hook = module.register_load_state_dict_post_hook(on_load)
+
+    def rebuild(self):
+        """Re-quantizes the module's current weights, or drops the trace to be redone on the next call."""
+        if self.variant == 'quantized':
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                self.compiled = torch.ao.quantization.quantize_dynamic(
+                    _Holder(copy.deepcopy(self.module)).eval(), {nn.LSTM, nn.Linear}, dtype=torch.qint8)
+        elif self.variant == 'script':
+            self.compiled = None
+
+    def __del__(self):
+        hook = getattr(self, '_hook', None)
+        if hook is not None:
+            hook.remove()
+
+    def _compile(self, args):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return torch.jit.trace(self.module, args, check_trace=False)
+
+    def __call__(self, *args):
+        with torch.inference_mode():
+            compiled = self.compiled
+            if compiled is None:
+                compiled = self.compiled = self._compile(args)
+            return compiled(*args)
+
+def _flatten(output):
+    if isinstance(output, torch.Tensor):
+        return [output]
+    return [t for item in output for t in _flatten(item)]
+
+def compare_variants(module, example_args, variants=VARIANTS, iterations=500, warmup=20):
+    """
+    Times every variant on the same inputs and measures how far its outputs
+    drift from plain eager fp32 autograd execution.
+    Returns one dict per variant: mean/p95 latency in microseconds and the
+    largest absolute output difference.
+    """
+    reference = [t.detach() for t in _flatten(module(*example_args))]
+    results = []
+    for variant in variants:
+        runtime = InferenceRuntime(module, variant)
+        for _ in range(warmup):
+            output = runtime(*example_args)
+
+        timings = np.empty(iterations)
+        for i in range(iterations):
+            start = time.perf_counter()
+            output = runtime(*example_args)
+            timings[i] = time.perf_counter() - start
+
+        drift = max(float((got.float() - expected).abs().max())
+                    for got, expected in zip(_flatten(output), reference))
+        results.append({
+            'variant': variant,
+            'mean_us': float(timings.mean() * 1e6),
+            'p95_us': float(np.percentile(timings, 95) * 1e6),
+            'drift': drift,
+        })
+    return results
+
+if __name__ == '__main__':
+    from psyche.memory import ShortTermMemory
+    from voice.ddsp import SimpleDDSP
+
+    set_inference_threads(1)
+    memory = ShortTermMemory(input_size=19, hidden_size=64)
+    cases = {
+        'ShortTermMemory.lstm (1 step)': (memory.lstm, (torch.randn(1, 1, 19), memory.init_hidden())),
+        'ShortTermMemory.lstm (10 steps)': (memory.lstm, (torch.randn(1, 10, 19), memory.init_hidden())),
+        'SimpleDDSP (1 frame)': (SimpleDDSP(), (torch.randn(1, 1025),)),
+    }
+
+    print(f"{'model':<34}{'variant':<11}{'mean us':>9}{'p95 us':>9}{'drift':>11}")
+    for name, (module, args) in cases.items():
+        for result in compare_variants(module, args):
+            print(f"{name:<34}{result['variant']:<11}{result['mean_us']:>9.1f}"
+                  f"{result['p95_us']:>9.1f}{result['drift']:>11.2e}")
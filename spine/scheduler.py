@@ -0,0 +1,175 @@
+# spine/scheduler.py
+# Deadline-aware tick pacing with adaptive quality
+
+import contextlib
+import time
+
+class DeadlineScheduler:
+    def __init__(self, period, steps=(), realtime=True, overlapped=False,
+                 budget=0.8, restore_below=0.5, restore_after=40, cooldown=5, smoothing=0.2,
+                 telemetry=None):
+        """
+        Paces the main loop to one tick every `period` seconds (one chunk of
+        audio) and keeps the tick cost inside it.
+        Each stage's cost is tracked as an exponential moving average. When the
+        expected tick cost passes `budget` of the period, or a tick misses its
+        deadline, the next of the `steps` is applied: (name, degrade, restore)
+        tuples, cheapest sacrifice first. A step is only restored once the cost
+        has stayed under `restore_below` of the period for `restore_after`
+        ticks, so quality does not flap around the threshold.
+        `overlapped` stages run concurrently (the threaded pipeline), so the
+        tick costs as much as its slowest stage rather than the sum of all.
+        Offline (`realtime=False`) nothing sleeps or degrades; missed deadlines
+        are still counted, as the ticks that would have been late live.
+        Stage timings and misses are also passed on to `telemetry`, if given.
+        """
+        self.period = period
+        self.steps = list(steps)
+        self.realtime = realtime
+        self.overlapped = overlapped
+        self.budget = budget
+        self.restore_below = restore_below
+        self.restore_after = restore_after
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.telemetry = telemetry
+
+        self.costs = {}     # stage -> smoothed cost in seconds
+        self.last = {}      # stage -> cost in the current tick
+        self.level = 0      # Number of degrade steps applied
+        self.ticks = 0
+        self.missed = 0     # Ticks that overran their deadline
+        self.degraded_ticks = 0
+        self._calm = 0
+        self._since_change = cooldown
+        self._deadline = None
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the enclosed block as one stage of the current tick."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timed(self, name, work):
+        """Wraps a pipeline stage function so every call is timed as `name`."""
+        def run(*args):
+            with self.stage(name):
+                return work(*args)
+        return run
+
+    def record(self, name, seconds):
+        if self.telemetry is not None:
+            self.telemetry.record(name, seconds)
+        self.last[name] = seconds
+        previous = self.costs.get(name)
+        self.costs[name] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+
+    def _combine(self, costs):
+        if not costs:
+            return 0.0
+        return max(costs) if self.overlapped else sum(costs)
+
+    @property
+    def expected_cost(self):
+        """The smoothed cost of a tick at the current quality level."""
+        return self._combine(self.costs.values())
+
+    @property
+    def headroom(self):
+        """Fraction of the period left over by the expected tick cost."""
+        return 1.0 - self.expected_cost / self.period
+
+    @property
+    def degraded(self):
+        return [name for name, _, _ in self.steps[:self.level]]
+
+    def adapt(self):
+        """
+        Closes the current tick: counts a miss if it overran the period and
+        steps quality down or up. Returns True if the tick was late.
+        """
+        self.ticks += 1
+        late = self._combine(self.last.values()) > self.period
+        self.last = {}
+        if late:
+            self.missed += 1
+        if self.level:
+            self.degraded_ticks += 1
+        if self.telemetry is not None:
+            self.telemetry.set_counter('deadline_misses', self.missed)
+            self.telemetry.tick()
+        if not self.realtime:
+            return late
+
+        self._since_change += 1
+        cost = self.expected_cost
+        if (late or cost > self.budget * self.period) and self.level < len(self.steps):
+            # Give the last step a few ticks to show up in the averages.
+            if self._since_change >= self.cooldown:
+                _, degrade, _ = self.steps[self.level]
+                degrade()
+                self.level += 1
+                self._since_change = 0
+            self._calm = 0
+        elif cost < self.restore_below * self.period and self.level:
+            self._calm += 1
+            if self._calm >= self.restore_after:
+                self.level -= 1
+                _, _, restore = self.steps[self.level]
+                restore()
+                self._since_change = 0
+                self._calm = 0
+        else:
+            self._calm = 0
+        return late
+
+    def wait(self):
+        """
+        Sleeps until the next tick is due. A tick that overran starts the next
+        one immediately and the schedule is re-anchored, rather than bursting
+        to catch up on the ticks it lost.
+        """
+        now = time.perf_counter()
+        if self._deadline is None or now - self._deadline > self.period:
+            self._deadline = now + self.period
+            return
+        if self._deadline > now:
+            time.sleep(self._deadline - now)
+        self._deadline += self.period
+
+    def end_tick(self):
+        """adapt(), then (live) wait for the next deadline. Returns True if the tick was late."""
+        late = self.adapt()
+        if self.realtime:
+            self.wait()
+        return late
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'missed': self.missed,
+            'degraded_ticks': self.degraded_ticks,
+            'level': self.level,
+            'degraded': self.degraded,
+            'costs_ms': {name: cost * 1e3 for name, cost in self.costs.items()},
+        }
+
+if __name__ == '__main__':
+    # A stage that gets slower than the period after 20 ticks: the scheduler
+    # sheds the "detail" step, then restores it once the load goes away.
+    detail = {'on': True}
+    scheduler = DeadlineScheduler(period=0.01, steps=[
+        ('detail', lambda: detail.update(on=False), lambda: detail.update(on=True)),
+    ], restore_after=10)
+
+    for tick in range(80):
+        with scheduler.stage('work'):
+            load = 0.012 if 20 <= tick < 40 else 0.002
+            time.sleep(load / 2 if not detail['on'] else load)
+        scheduler.end_tick()
+        if tick % 10 == 9:
+            print(f"tick {tick + 1:>3}: level {scheduler.level}, "
+                  f"cost {scheduler.expected_cost * 1e3:5.1f} ms, missed {scheduler.missed}")
@@ -0,0 +1,166 @@
+# spine/session.py
+# Several independent Pneumas in one process, sharing one batched memory
+
+from cortex.analyzer import make_analyzer
+from cortex.features import FeatureVector, FEATURE_SIZE
+from cortex.vibe_check import VibeCheck
+from psyche.decision import DecisionMaker
+from psyche.memory import MemoryBank, flatten_features
+from psyche.personality import Personality
+from voice.hallucinator import END_OF_PHRASE, Hallucinator
+
+class Session:
+    def __init__(self, name, listener, streamer, persona_config, memory, analyzer, hallucinator,
+                 every_tick=False):
+        """
+        One bandmate: its own audio pair, analyzer, personality and voice,
+        and a MemorySlot in the host's shared MemoryBank.
+        With `every_tick` the streamer is played on silent ticks too (an
+        empty, ended phrase), which a timeline-mode FileSink needs to stay
+        on the input's timeline.
+        """
+        self.name = name
+        self.listener = listener
+        self.streamer = streamer
+        self.analyzer = analyzer
+        self.vibe_check = VibeCheck()
+        self.personality = Personality(persona_config)
+        self.decision_maker = DecisionMaker()
+        self.memory = memory
+        self.hallucinator = hallucinator
+        self.idle = END_OF_PHRASE if every_tick else None
+        self.features = FeatureVector() # Refilled in place every tick
+        self.audio_chunk = None
+        self.intent = None
+        self.ticks = 0
+
+    def feel(self):
+        """Listens, analyzes and stages the features for the memory step."""
+        self.audio_chunk = self.listener.listen()
+        self.analyzer.analyze(self.audio_chunk, out=self.features)
+        self.personality.update(self.vibe_check.get_vibe(self.features))
+        self.memory.remember(flatten_features(self.features))
+
+    def respond(self, chunk_size):
+        """Decides on the stepped memory and plays the next block."""
+        self.intent = self.decision_maker.decide(self.personality.get_state(), self.memory.get_context())
+        play = self.hallucinator.respond(self.intent, self.audio_chunk, self.features, chunk_size)
+        play = play if play is not None else self.idle
+        if play is not None:
+            self.streamer.play(*play)
+        self.ticks += 1
+
+class SessionHost:
+    def __init__(self, sample_rate=44100, chunk_size=1024, hidden_size=64, variant=None, capacity=4,
+                 analysis_mode='streaming', analysis_window=4.0):
+        """
+        Hosts any number of Sessions in one process. Every tick each session
+        listens and analyzes its own input, then a single batched LSTM call
+        (see MemoryBank) steps all their memories at once, then each one
+        decides and plays. Sessions can be added and removed between ticks;
+        one whose input has ended is removed by the tick that finds out.
+        Sessions get the analyzer `analysis_mode` configures (see
+        `make_analyzer`), as a single Pneuma does.
+        """
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.analysis_mode = analysis_mode
+        self.analysis_window = analysis_window
+        self.memory = MemoryBank(FEATURE_SIZE, hidden_size, capacity=capacity, variant=variant)
+        self.sessions = []
+        self.ticks = 0
+
+    def add(self, name, listener, streamer, persona_config, analyzer=None, hallucinator=None,
+            every_tick=False):
+        """Starts a session on `listener`/`streamer` with the given persona. Returns it."""
+        if analyzer is None:
+            analyzer = make_analyzer(self.sample_rate, self.analysis_mode, self.analysis_window)
+        hallucinator = Hallucinator() if hallucinator is None else hallucinator
+        session = Session(name, listener, streamer, persona_config, self.memory.add(), analyzer,
+                          hallucinator, every_tick)
+        self.sessions.append(session)
+        return session
+
+    def remove(self, session):
+        """Ends `session`, stopping its audio pair."""
+        self.sessions.remove(session)
+        self.memory.remove(session.memory)
+        session.hallucinator.cancel()
+        session.listener.stop()
+        session.streamer.stop()
+
+    def tick(self):
+        """One chunk for every session. Returns the number of sessions still running."""
+        ended = []
+        for session in self.sessions:
+            try:
+                session.feel()
+            except EOFError:
+                ended.append(session)
+        for session in ended:
+            self.remove(session)
+
+        self.memory.step()
+        for session in self.sessions:
+            session.respond(self.chunk_size)
+        self.ticks += 1
+        return len(self.sessions)
+
+    def run(self):
+        """Ticks until every session's input has ended."""
+        while self.sessions and self.tick():
+            pass
+
+    def stop(self):
+        for session in list(self.sessions):
+            self.remove(session)
+
+if __name__ == '__main__':
+    import contextlib
+    import io
+    import time
+    import numpy as np
+    import torch
+    import yaml
+
+    class Tone:
+        # An endless test input: a sine with a little noise.
+        def __init__(self, freq, chunk_size=1024, sample_rate=44100):
+            self.phase = 0
+            self.freq, self.chunk_size, self.sample_rate = freq, chunk_size, sample_rate
+
+        def listen(self):
+            t = (self.phase + np.arange(self.chunk_size)) / self.sample_rate
+            self.phase += self.chunk_size
+            return (0.3 * np.sin(2 * np.pi * self.freq * t)
+                    + 0.01 * np.random.randn(self.chunk_size)).astype(np.float32)
+
+        def stop(self):
+            pass
+
+    class Discard:
+        def play(self, audio, append=True, continues=False):
+            pass
+
+        def stop(self):
+            pass
+
+    with open('config/persona.yaml') as f:
+        personas = yaml.safe_load(f)
+    names = [name for name in personas if isinstance(personas[name], dict)]
+    torch.set_num_threads(1)
+
+    ticks = 100
+    for n in (1, 4, 16):
+        host = SessionHost()
+        with contextlib.redirect_stdout(io.StringIO()): # Every voice announces itself
+            for i in range(n):
+                host.add(f"room-{i}", Tone(110.0 * (i + 1)), Discard(), personas[names[i % len(names)]])
+            for _ in range(10):
+                host.tick()
+            start = time.perf_counter()
+            for _ in range(ticks):
+                host.tick()
+        elapsed = time.perf_counter() - start
+        print(f"{n:>2} sessions: {n * ticks / elapsed:7.1f} session-ticks/s "
+              f"({elapsed / ticks * 1e3:6.2f} ms per host tick)")
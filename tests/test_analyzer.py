@@ -3,6 +3,7 @@
 import numpy as np
 import pytest
 from cortex.analyzer import Analyzer
+from cortex.features import FeatureVector
 
 @pytest.fixture
 def analyzer():
@@ -42,3 +43,83 @@ def test_analyzer_feature_types(analyzer, dummy_audio):
         else:
             assert isinstance(value, (float, int, np.number))
 
+
+def test_analyzer_matches_per_feature_librosa(analyzer):
+    """The shared-spectrum features match librosa's standalone feature calls."""
+    import librosa
+    sr = 44100
+    audio = np.random.default_rng(0).standard_normal(1024).astype(np.float32) * 0.1
+    features = analyzer.analyze(audio)
+
+    assert np.isclose(features['spectral_centroid'],
+                      np.mean(librosa.feature.spectral_centroid(y=audio, sr=sr)), rtol=1e-5)
+    assert np.isclose(features['spectral_bandwidth'],
+                      np.mean(librosa.feature.spectral_bandwidth(y=audio, sr=sr)), rtol=1e-5)
+    assert np.isclose(features['spectral_rolloff'],
+                      np.mean(librosa.feature.spectral_rolloff(y=audio, sr=sr)), rtol=1e-5)
+    assert np.isclose(features['onset_density'],
+                      len(librosa.onset.onset_detect(y=audio, sr=sr)) / (1024 / sr))
+    assert np.allclose(features['chroma'],
+                       np.mean(librosa.feature.chroma_stft(y=audio, sr=sr), axis=1), atol=1e-5)
+
+def test_analyze_batch_matches_single_channel():
+    """Each channel of a batch gets the features it would get on its own."""
+    rng = np.random.default_rng(1)
+    audio = (rng.standard_normal((3, 1024)) * np.array([[0.05], [0.2], [0.5]])).astype(np.float32)
+    batch = Analyzer(sample_rate=44100).analyze_batch(audio)
+    assert batch.shape == (3,)
+    for c in range(3):
+        features = Analyzer(sample_rate=44100).analyze(audio[c])
+        for key, value in features.items():
+            assert np.allclose(batch[c][key], value, rtol=1e-4, atol=1e-6), key
+
+def test_analyzer_fills_record_in_place(analyzer, dummy_audio):
+    """With `out`, the analyzer writes into the caller's record."""
+    record = FeatureVector()
+    buffer = record.data
+    returned = analyzer.analyze(dummy_audio, out=record)
+    assert returned is record
+    assert record.data is buffer
+    assert record.rmse == pytest.approx(0.5 / np.sqrt(2), rel=0.01)
+    assert np.argmax(record.chroma) == 9 # A
+
+def test_skipped_refresh_repeats_last_values(analyzer):
+    """With tempo and chroma refresh off, their last values are reported again."""
+    t = np.arange(2048 * 4) / 44100
+    first = analyzer.analyze(0.5 * np.sin(2 * np.pi * 440 * t)).copy()
+    analyzer.refresh_tempo = analyzer.refresh_chroma = False
+    second = analyzer.analyze(0.5 * np.sin(2 * np.pi * 262 * t))
+    assert np.array_equal(second.chroma, first.chroma)
+    assert second.tempo == first.tempo
+    assert second.onset_density == first.onset_density
+    assert second.spectral_centroid < first.spectral_centroid
+
+def test_skipped_tempo_resumes_without_a_jump(analyzer):
+    """After a skipped stretch the onset stream restarts flat instead of diffing across the gap."""
+    analyzer.tempo_onsets(np.zeros(4096, dtype=np.float32))
+    analyzer.refresh_tempo = False
+    analyzer.analyze(0.5 * np.ones(4096, dtype=np.float32))
+    flux = analyzer.tempo_onsets(0.5 * np.ones(1024, dtype=np.float32))
+    assert len(flux) == 2
+    assert np.allclose(flux, 0)
+
+def click_track(bpm, seconds=12, sr=44100):
+    """Short 1 kHz blips on every beat over a faint noise floor."""
+    audio = np.random.default_rng(0).standard_normal(int(seconds * sr)).astype(np.float32) * 0.001
+    blip = np.sin(2 * np.pi * 1000 * np.arange(400) / sr) * np.exp(-np.arange(400) / 80)
+    for start in np.arange(0, len(audio) - len(blip), 60.0 / bpm * sr).astype(int):
+        audio[start:start + len(blip)] += blip
+    return audio
+
+@pytest.mark.parametrize("bpm", [90, 120, 140])
+def test_chunked_click_track_has_tempo(analyzer, bpm):
+    """Chunk by chunk, a click track is tracked to its tempo, alone and in a batch."""
+    audio = click_track(bpm)
+    band = np.stack([audio, click_track(100)])
+    batch_analyzer = Analyzer(sample_rate=44100)
+    for start in range(0, len(audio) - 1023, 1024):
+        features = analyzer.analyze(audio[start:start + 1024])
+        channels = batch_analyzer.analyze_batch(band[:, start:start + 1024])
+    assert features.tempo == pytest.approx(bpm, abs=2)
+    assert analyzer.tempo_tracker.confidence > 0.4
+    assert channels['tempo'] == pytest.approx([bpm, 100], abs=2)
@@ -0,0 +1,78 @@
+# tests/test_cache.py
+
+import numpy as np
+import pytest
+import torch
+from voice.cache import ResponseCache
+from voice.hallucinator import Hallucinator
+
+def features(chroma_bins=(0, 4, 7), rms=0.1):
+    chroma = np.zeros(12, dtype=np.float32)
+    chroma[list(chroma_bins)] = 1.0
+    return {'chroma': chroma, 'rmse': rms}
+
+def test_key_ignores_small_changes():
+    cache = ResponseCache()
+    base = features()
+    nudged = features()
+    nudged['chroma'][4] = 0.97
+    assert cache.key('harmonize', base) == cache.key('harmonize', nudged)
+    assert cache.key('harmonize', base) != cache.key('disrupt', base)
+    assert cache.key('harmonize', base) != cache.key('harmonize', features((2, 6, 9)))
+    assert cache.key('harmonize', base) != cache.key('harmonize', features(rms=0.5))
+
+def test_hit_returns_stored_buffer():
+    cache = ResponseCache()
+    audio = torch.randn(100)
+    cache.put('a', audio)
+    assert cache.get('a') is audio
+    assert cache.get('b') is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+def test_evicts_least_recently_used():
+    cache = ResponseCache(max_bytes=3 * 400)
+    for key in 'abc':
+        cache.put(key, torch.zeros(100))
+    cache.get('a')
+    cache.put('d', torch.zeros(100))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('d') is not None
+    assert cache.bytes == 3 * 400 and cache.evictions == 1
+
+def test_too_large_is_not_stored():
+    cache = ResponseCache(max_bytes=100)
+    cache.put('a', torch.zeros(100))
+    assert len(cache) == 0
+
+@pytest.fixture
+def hallucinator():
+    hallucinator = Hallucinator(cache=ResponseCache())
+    hallucinator.synth.model = True # Stands in for a loaded model.
+    return hallucinator
+
+def test_generate_replays_from_cache(hallucinator):
+    first = hallucinator.generate('harmonize', None, features()).clone()
+    again = hallucinator.generate('harmonize', None, features())
+    assert torch.equal(first, again)
+    assert hallucinator.cache.hits == 1
+
+def test_completed_phrase_is_replayed(hallucinator):
+    played = torch.cat([block.clone() for block in hallucinator.stream('harmonize', None, features(), 4096)])
+    hallucinator.cancel()
+    assert len(hallucinator.cache) == 1
+
+    replay = hallucinator.stream('harmonize', None, features(), 4096)
+    assert replay.cached
+    assert torch.equal(torch.cat(list(replay)), played)
+
+def test_cancelled_phrase_is_not_cached(hallucinator):
+    stream = hallucinator.stream('harmonize', None, features(), 1024)
+    next(stream)
+    hallucinator.stream('disrupt', None, features(), 1024)
+    assert len(hallucinator.cache) == 0
+
+def test_echo_is_never_cached(hallucinator):
+    stream = hallucinator.stream('echo', None, features(), 1024)
+    next(stream)
+    hallucinator.cancel()
+    assert len(hallucinator.cache) == 0 and hallucinator.cache.misses == 0
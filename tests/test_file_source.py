@@ -0,0 +1,57 @@
+# tests/test_file_source.py
+
+import numpy as np
+import pytest
+from cortex.file_source import FileSource
+from voice.file_sink import FileSink
+
+@pytest.fixture
+def wav_path(tmp_path):
+    """A 1-second 440 Hz sine written through the FileSink."""
+    path = str(tmp_path / "sine.wav")
+    sink = FileSink(path, sample_rate=44100)
+    t = np.arange(44100) / 44100
+    sink.play(0.5 * np.sin(2. * np.pi * 440 * t))
+    sink.stop()
+    return path
+
+def test_file_source_round_trip(wav_path):
+    """What the sink writes, the source reads back in chunks."""
+    source = FileSource(wav_path, sample_rate=44100, chunk_size=1024)
+    chunk = source.listen()
+    t = np.arange(1024) / 44100
+    assert chunk.dtype == np.float32
+    assert chunk.shape == (1024,)
+    assert np.allclose(chunk, 0.5 * np.sin(2. * np.pi * 440 * t), atol=1e-4)
+
+def test_file_source_end_of_file(wav_path):
+    """The last chunk is zero-padded, then the source signals EOF."""
+    source = FileSource(wav_path, sample_rate=44100, chunk_size=1024)
+    chunks = []
+    while not source.exhausted:
+        chunks.append(source.listen())
+    assert len(chunks) == int(np.ceil(44100 / 1024))
+    assert source.seconds_read == pytest.approx(1.0)
+    with pytest.raises(EOFError):
+        source.listen()
+
+def test_file_source_rejects_other_rates(wav_path):
+    """Resampling is not done silently."""
+    with pytest.raises(ValueError):
+        FileSource(wav_path, sample_rate=48000)
+
+def test_file_sink_follows_the_input_timeline(tmp_path):
+    """With a chunk size, every tick writes one chunk: silence, queued audio or a cut."""
+    path = str(tmp_path / "out.wav")
+    sink = FileSink(path, sample_rate=44100, chunk_size=4, crossfade=0, length=14)
+    silent = np.zeros(0, dtype=np.float32)
+    sink.play(silent)                                 # A silent tick
+    sink.play(np.full(8, 0.5), append=False)          # A cut with a spare block
+    sink.play(np.full(4, 0.25), append=True)          # Queued behind the spare block
+    sink.play(silent)                                 # Plays what is still queued
+    sink.stop()
+
+    source = FileSource(path, sample_rate=44100, chunk_size=16)
+    assert source.n_frames == 14 # The last tick is cut to the input's length
+    audio = source.listen()[:14]
+    assert np.allclose(audio, [0] * 4 + [0.5] * 8 + [0.25] * 2, atol=1e-4)
@@ -0,0 +1,72 @@
+# tests/test_inference.py
+
+import torch
+import pytest
+from psyche.memory import ShortTermMemory
+from spine.inference import InferenceRuntime, compare_variants
+
+@pytest.fixture
+def lstm_case():
+    torch.manual_seed(0)
+    memory = ShortTermMemory(input_size=19, hidden_size=64)
+    return memory.lstm, (torch.randn(1, 10, 19), memory.init_hidden())
+
+@pytest.mark.parametrize("variant, tolerance", [('eager', 1e-6), ('script', 1e-5), ('quantized', 5e-2)])
+def test_variants_match_eager(lstm_case, variant, tolerance):
+    """Every variant stays within its tolerance of plain autograd execution."""
+    module, args = lstm_case
+    expected, _ = module(*args)
+    runtime = InferenceRuntime(module, variant)
+    for _ in range(2): # The script variant is traced on the first call.
+        output, (hidden, cell) = runtime(*args)
+    assert output.shape == expected.shape
+    assert (output - expected.detach()).abs().max() < tolerance
+    assert not output.requires_grad
+
+def test_unknown_variant(lstm_case):
+    with pytest.raises(ValueError):
+        InferenceRuntime(lstm_case[0], 'onnx')
+
+@pytest.mark.parametrize("variant", ['script', 'quantized'])
+def test_runtime_follows_loaded_weights(lstm_case, variant):
+    """Loading new weights rebuilds the compiled variant; the caller's module keeps its mode."""
+    module, args = lstm_case
+    module.train()
+    runtime = InferenceRuntime(module, variant)
+    runtime(*args)
+    assert module.training
+
+    torch.manual_seed(1)
+    module.load_state_dict(ShortTermMemory(input_size=19, hidden_size=64).lstm.state_dict())
+    expected, _ = module(*args)
+    output, _ = runtime(*args)
+    assert (output - expected.detach()).abs().max() < 5e-2
+
+def test_scripted_module_runs_as_is():
+    torch.manual_seed(0)
+    module = torch.nn.Linear(4, 2)
+    scripted = torch.jit.script(module)
+    runtime = InferenceRuntime(scripted, 'script')
+    assert runtime.compiled is scripted
+    x = torch.randn(3, 4)
+    assert torch.allclose(runtime(x), module(x))
+    with pytest.raises(ValueError):
+        InferenceRuntime(scripted, 'quantized')
+
+def test_compare_variants(lstm_case):
+    results = compare_variants(*lstm_case, iterations=5, warmup=1)
+    assert [r['variant'] for r in results] == ['eager', 'script', 'quantized']
+    assert all(r['mean_us'] > 0 and r['drift'] >= 0 for r in results)
+
+@pytest.mark.parametrize("variant", ['script', 'quantized'])
+def test_incremental_memory_with_runtime(variant):
+    """An incremental memory running a compiled LSTM tracks the eager one."""
+    torch.manual_seed(0)
+    reference = ShortTermMemory(input_size=19, hidden_size=64, incremental=True)
+    memory = ShortTermMemory(input_size=19, hidden_size=64, incremental=True, variant=variant)
+    memory.lstm.load_state_dict(reference.lstm.state_dict())
+    for _ in range(5):
+        step = torch.randn(1, 1, 19)
+        expected, _ = reference.remember(step)
+        output, _ = memory.remember(step)
+    assert torch.allclose(output, expected, atol=5e-2)
@@ -0,0 +1,73 @@
+# tests/test_jitter.py
+
+import numpy as np
+from voice.jitter import JitterBuffer
+
+def drain(jitter, block_size=256):
+    block = np.empty(block_size, dtype=np.float32)
+    played = []
+    while True:
+        n = jitter.read(block)
+        if not n:
+            return np.concatenate(played) if played else np.zeros(0, dtype=np.float32)
+        played.append(block[:n].copy())
+
+def test_plays_what_was_written():
+    jitter = JitterBuffer(capacity=1000, crossfade=10)
+    audio = np.arange(600, dtype=np.float32)
+    jitter.write(audio)
+    assert jitter.depth == 600
+    assert np.array_equal(drain(jitter), audio)
+
+def test_new_clip_crossfades_from_the_old():
+    jitter = JitterBuffer(capacity=1000, crossfade=100)
+    jitter.write(np.ones(500, dtype=np.float32))
+    jitter.read(np.empty(200, dtype=np.float32))
+    jitter.write(np.zeros(300, dtype=np.float32))
+
+    played = drain(jitter)
+    assert len(played) == 300 # The rest of the old clip is replaced.
+    fade = played[:100]
+    assert fade[0] < 1.0 and fade[-1] > 0.0
+    assert np.all(np.diff(fade) < 0)
+    assert np.all(played[100:] == 0.0)
+
+def test_append_queues_after():
+    jitter = JitterBuffer(capacity=1000, crossfade=100)
+    jitter.write(np.ones(300, dtype=np.float32))
+    jitter.write(np.full(300, 2.0, dtype=np.float32), append=True)
+    played = drain(jitter)
+    assert np.array_equal(played, np.r_[np.ones(300), np.full(300, 2.0)])
+
+def test_underruns_only_when_more_was_promised():
+    jitter = JitterBuffer(capacity=1000)
+    block = np.empty(256, dtype=np.float32)
+    jitter.write(np.ones(300, dtype=np.float32))
+    jitter.read(block)
+    jitter.read(block) # A clip ending is not an underrun.
+    assert jitter.underruns == 0
+
+    jitter.write(np.ones(300, dtype=np.float32), continues=True)
+    jitter.read(block)
+    assert jitter.read(block) == 44
+    assert np.all(block[44:] == 0.0)
+    assert jitter.underruns == 1
+
+def test_overflow_drops_the_excess():
+    jitter = JitterBuffer(capacity=500)
+    jitter.write(np.ones(400, dtype=np.float32))
+    jitter.write(np.ones(400, dtype=np.float32), append=True)
+    assert jitter.depth == 500
+    assert jitter.overflows == 300
+
+def test_wraps_around_the_ring():
+    jitter = JitterBuffer(capacity=512, crossfade=8)
+    audio = np.arange(2000, dtype=np.float32)
+    played = []
+    block = np.empty(180, dtype=np.float32)
+    for start in range(0, 2000, 200):
+        jitter.write(audio[start:start + 200], append=True)
+        n = jitter.read(block)
+        played.append(block[:n].copy())
+    played.append(drain(jitter, 100))
+    assert np.array_equal(np.concatenate(played), audio)
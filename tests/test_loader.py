@@ -0,0 +1,77 @@
+# tests/test_loader.py
+
+import pytest
+import torch
+from voice.ddsp import SimpleDDSP
+from voice.loader import ModelLoader, export_script, script_path
+from voice.neural_synth import NeuralSynth
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    torch.manual_seed(0)
+    model = SimpleDDSP()
+    path = str(tmp_path / 'pneuma_soul.pth')
+    torch.save(model.state_dict(), path)
+    return model, path
+
+def test_loads_state_dict(checkpoint):
+    model, path = checkpoint
+    loader = ModelLoader(path)
+    runtime = loader.load()
+    assert loader.source == path
+    assert set(loader.timings) == {'load', 'warmup'}
+    frame = torch.randn(1, 1025)
+    assert torch.allclose(runtime(frame), model(frame))
+
+def test_prefers_torchscript_export(checkpoint):
+    model, path = checkpoint
+    assert export_script(model, path) == script_path(path)
+    loader = ModelLoader(path)
+    runtime = loader.load()
+    assert loader.source == script_path(path)
+    frame = torch.randn(1, 1025)
+    assert torch.allclose(runtime(frame), model(frame))
+
+@pytest.mark.parametrize('variant', ['eager', 'script', 'quantized'])
+def test_export_loads_under_every_variant(checkpoint, variant):
+    """The export runs as is, except quantized, which needs the Python model."""
+    model, path = checkpoint
+    export_script(model, path)
+    loader = ModelLoader(path, variant=variant)
+    runtime = loader.load()
+    assert loader.source == (path if variant == 'quantized' else script_path(path))
+    frame = torch.randn(1, 1025)
+    assert torch.allclose(runtime(frame), model(frame), atol=0.05 if variant == 'quantized' else 1e-6)
+
+def test_stale_torchscript_export_is_skipped(checkpoint):
+    """A checkpoint written after the export wins over it."""
+    model, path = checkpoint
+    export_script(model, path)
+    torch.manual_seed(1)
+    retrained = SimpleDDSP()
+    torch.save(retrained.state_dict(), path)
+    loader = ModelLoader(path)
+    runtime = loader.load()
+    assert loader.source == path
+    frame = torch.randn(1, 1025)
+    assert torch.allclose(runtime(frame), retrained(frame))
+
+def test_loads_in_background(checkpoint):
+    _, path = checkpoint
+    loader = ModelLoader(path).start()
+    assert loader.wait(timeout=30) is not None
+    assert loader.ready and loader.error is None
+
+def test_missing_checkpoint_reports_error(tmp_path):
+    loader = ModelLoader(str(tmp_path / 'missing.pth')).start()
+    assert loader.wait(timeout=30) is None
+    assert isinstance(loader.error, FileNotFoundError)
+
+def test_synth_plays_once_loaded(checkpoint):
+    _, path = checkpoint
+    synth = NeuralSynth(path)
+    synth.loader.wait(timeout=30)
+    harmony = synth.synthesize("harmonize", None)
+    assert synth.model is not None
+    assert harmony.abs().max() > 0.1
+    assert synth.cold_start is not None
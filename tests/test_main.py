@@ -0,0 +1,62 @@
+# tests/test_main.py
+
+import sys
+import types
+from argparse import Namespace
+import pytest
+import yaml
+import main
+
+class FakeStream:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.closed = False
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+class FakePyAudio:
+    def __init__(self):
+        self.streams = []
+        self.terminated = False
+
+    def open(self, **kwargs):
+        self.streams.append(FakeStream(**kwargs))
+        return self.streams[-1]
+
+    def terminate(self):
+        self.terminated = True
+
+@pytest.fixture
+def pyaudio(monkeypatch):
+    """A stand-in pyaudio module, so the live devices open without PortAudio."""
+    module = types.SimpleNamespace(PyAudio=FakePyAudio, paFloat32=1, paContinue=0,
+                                   paInputOverflow=2, paFramesPerBufferUnspecified=0)
+    monkeypatch.setitem(sys.modules, 'pyaudio', module)
+    for name in ('cortex.listener', 'voice.streamer'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+    return module
+
+@pytest.fixture
+def bio_metrics():
+    with open('config/bio_metrics.yaml') as f:
+        return yaml.safe_load(f)
+
+def test_live_session_opens_both_devices(pyaudio, bio_metrics):
+    listener, streamer = main.open_audio(Namespace(input=None, output=None), bio_metrics)
+    assert listener.stream.kwargs['input'] and streamer.stream.kwargs['output']
+    assert listener.mode == bio_metrics['listener_mode'] and streamer.mode == bio_metrics['streamer_mode']
+    listener.stop()
+    streamer.stop()
+    assert listener.stream.closed and streamer.stream.closed
+
+def test_failed_output_closes_the_input(pyaudio, bio_metrics):
+    bio_metrics['streamer_mode'] = 'nonsense'
+    opened = []
+    pyaudio.PyAudio = lambda: opened.append(FakePyAudio()) or opened[-1]
+    with pytest.raises(ValueError):
+        main.open_audio(Namespace(input=None, output=None), bio_metrics)
+    assert len(opened) == 1 and opened[0].streams[0].closed and opened[0].terminated
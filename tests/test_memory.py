@@ -3,7 +3,8 @@
 import torch
 import numpy as np
 import pytest
-from psyche.memory import flatten_features, ShortTermMemory
+from cortex.features import FeatureVector
+from psyche.memory import flatten_features, MemoryBank, ShortTermMemory
 
 @pytest.fixture
 def feature_dict():
@@ -26,6 +27,25 @@ def test_flatten_features(feature_dict):
     assert tensor.shape == (1, 1, 19)
     assert isinstance(tensor, torch.Tensor)
 
+def test_flatten_feature_vector_matches_dict(feature_dict):
+    """A FeatureVector flattens to the dict layout, without copying."""
+    record = FeatureVector()
+    for key, value in feature_dict.items():
+        record[key] = value
+    tensor = flatten_features(record)
+    assert tensor.shape == (1, 1, 19)
+    assert torch.allclose(tensor, flatten_features(feature_dict))
+    assert tensor.data_ptr() == record.data.ctypes.data
+
+def test_memory_copies_reused_records(feature_dict):
+    """Refilling the same record every tick does not rewrite the past."""
+    memory = ShortTermMemory(input_size=19, hidden_size=64)
+    record = FeatureVector()
+    for i in range(3):
+        record.rmse = i
+        memory.remember(flatten_features(record))
+    assert [step[0, 0, 13].item() for step in memory.memory_sequence] == [0, 1, 2]
+
 def test_memory_initialization():
     """Tests the initialization of the ShortTermMemory module."""
     memory = ShortTermMemory(input_size=19, hidden_size=64)
@@ -58,3 +78,93 @@ def test_memory_sequence_length(feature_dict):
         memory.remember(feature_tensor)
 
     assert len(memory.memory_sequence) == 5
+
+def test_incremental_memory_matches_lstm():
+    """One in-place step per tick gives the same state as running the LSTM over the sequence."""
+    torch.manual_seed(0)
+    memory = ShortTermMemory(input_size=19, hidden_size=64, num_layers=2, incremental=True)
+    steps = [torch.randn(1, 1, 19) for _ in range(15)]
+    with torch.no_grad():
+        expected_out, (expected_h, expected_c) = memory.lstm(torch.cat(steps, dim=1), memory.init_hidden())
+
+    for step in steps:
+        lstm_out, (hidden, cell) = memory.remember(step)
+
+    assert lstm_out.shape == (1, 1, 64)
+    assert torch.allclose(lstm_out, expected_out[:, -1:], atol=1e-6)
+    assert torch.allclose(hidden, expected_h, atol=1e-6)
+    assert torch.allclose(cell, expected_c, atol=1e-6)
+
+def test_incremental_memory_window():
+    """The window holds the last `sequence_length` feature sets, oldest first."""
+    memory = ShortTermMemory(input_size=19, hidden_size=64, sequence_length=5, incremental=True)
+    hidden_buffer = memory.hidden[0]
+    for i in range(8):
+        memory.remember(torch.full((1, 1, 19), float(i)))
+
+    window = memory.get_window()
+    assert window.shape == (1, 5, 19)
+    assert window[0, :, 0].tolist() == [3, 4, 5, 6, 7]
+    # The state is updated in place rather than reallocated.
+    assert memory.hidden[0] is hidden_buffer
+
+def matching_memories(bank, n):
+    memories = [ShortTermMemory(bank.input_size, bank.hidden_size, bank.num_layers, incremental=True)
+                for _ in range(n)]
+    for memory in memories:
+        memory.lstm.load_state_dict(bank.lstm.state_dict())
+    return memories
+
+@pytest.mark.parametrize("variant", [None, "script"])
+def test_bank_steps_like_separate_memories(variant):
+    """One batched step advances every session exactly like its own incremental memory."""
+    torch.manual_seed(0)
+    bank = MemoryBank(input_size=19, hidden_size=32, num_layers=2, capacity=2, variant=variant)
+    slots = [bank.add() for _ in range(3)] # Grows past its capacity
+    memories = matching_memories(bank, 3)
+    for _ in range(5):
+        for slot, memory in zip(slots, memories):
+            step = torch.randn(1, 1, 19)
+            slot.remember(step)
+            memory.remember(step)
+        out = bank.step()
+    assert out.shape == (3, 1, 32)
+    for i, (slot, memory) in enumerate(zip(slots, memories)):
+        assert slot.get_context()[0].shape == (2, 1, 32)
+        assert torch.allclose(slot.get_context()[0], memory.get_context()[0], atol=1e-6)
+        assert torch.allclose(slot.get_context()[1], memory.get_context()[1], atol=1e-6)
+        assert torch.allclose(out[i], memory.get_context()[0][-1], atol=1e-6)
+
+def test_removing_a_session_keeps_the_others():
+    torch.manual_seed(0)
+    bank = MemoryBank(input_size=19, hidden_size=16)
+    slots = [bank.add() for _ in range(3)]
+    memories = matching_memories(bank, 3)
+
+    def tick():
+        for slot, memory in zip(slots, memories):
+            step = torch.randn(1, 1, 19)
+            slot.remember(step)
+            memory.remember(step)
+        bank.step()
+
+    tick()
+    bank.remove(slots.pop(0))
+    memories.pop(0)
+    tick()
+    slots.append(bank.add()) # Takes the freed row, starting empty
+    memories += matching_memories(bank, 1)
+    tick()
+    assert len(bank) == 3
+    for slot, memory in zip(slots, memories):
+        assert torch.allclose(slot.get_context()[0], memory.get_context()[0], atol=1e-6)
+
+def test_bank_rejects_foreign_or_removed_slots():
+    bank, other = MemoryBank(input_size=19, hidden_size=16), MemoryBank(input_size=19, hidden_size=16)
+    slot, kept = bank.add(), bank.add()
+    with pytest.raises(ValueError):
+        other.remove(slot)
+    bank.remove(slot)
+    with pytest.raises(ValueError):
+        bank.remove(slot) # Would otherwise evict `kept`
+    assert bank.slots == [kept] and kept.index == 0
@@ -0,0 +1,96 @@
+# tests/test_neural_synth.py
+
+import numpy as np
+import pytest
+from voice.hallucinator import Hallucinator
+from voice.neural_synth import NeuralSynth, PHRASE
+from voice.oscillator import WARM, chord_from_chroma
+
+@pytest.fixture
+def synth():
+    synth = NeuralSynth()
+    synth.model = True # Stands in for a loaded model.
+    return synth
+
+def test_stream_yields_the_phrase_in_blocks(synth):
+    sizes = [len(block) for block in synth.stream("disrupt", None, chunk_size=1000)]
+    assert sizes[:-1] == [1000] * (len(sizes) - 1)
+    assert sum(sizes) == PHRASE
+
+def test_streamed_harmony_keeps_phase(synth):
+    chroma = np.zeros(12)
+    chroma[[2, 6, 9]] = 1.0
+    audio = np.concatenate([block.numpy().copy() for block in
+                            synth.stream("harmonize", None, {'chroma': chroma}, chunk_size=500)])
+
+    # Past the fade-in of the first block, every block continues the same chord.
+    freqs, amps = chord_from_chroma(chroma)
+    weights = np.asarray(WARM) / np.sum(WARM)
+    t = np.arange(PHRASE) / 44100
+    expected = sum(a * w * np.sin(2. * np.pi * f * h * t)
+                   for f, a in zip(freqs, amps) for h, w in enumerate(weights, 1))
+    assert np.allclose(audio[500:], expected[500:], atol=1e-4)
+
+def test_echo_repeats_what_was_heard(synth):
+    synth.space.reverb_mix = 0.0
+    synth.space.delay.set_taps([(2048, 0.5)])
+    synth.listen(np.zeros(1024, dtype=np.float32))
+    stream = synth.stream("echo", None, chunk_size=1024)
+    heard = np.arange(1024, dtype=np.float32)
+
+    blocks = []
+    for _ in range(4):
+        synth.listen(heard)
+        blocks.append(next(stream).numpy().copy())
+    # The newest input when the echo started arrives 2048 samples later.
+    assert not stream.done
+    assert np.all(blocks[0] == 0.0)
+    assert np.array_equal(blocks[2], heard * 0.5)
+
+def test_decimation_makes_every_voice_cheaper(synth):
+    """Under decimation harmonies render at a lower rate and echoes drop the reverb."""
+    synth.decimation = 4
+    next(synth.stream("harmonize", None, chunk_size=1024))
+    assert synth.oscillators._decimation == 4
+
+    synth.space.delay.set_taps([(0, 1.0)])
+    synth.listen(np.ones(1024, dtype=np.float32))
+    stream = synth.stream("echo", None, chunk_size=1024)
+    synth.listen(np.ones(1024, dtype=np.float32))
+    assert np.array_equal(next(stream).numpy(), np.ones(1024))
+
+def test_cancel_ends_the_stream(synth):
+    stream = synth.stream("harmonize", None, chunk_size=1024)
+    next(stream)
+    stream.cancel()
+    assert stream.done
+    assert next(stream, None) is None
+
+def test_hallucinator_cancels_on_new_intent():
+    hallucinator = Hallucinator()
+    first = hallucinator.stream("harmonize", None, chunk_size=1024)
+    next(first)
+    assert hallucinator.stream("harmonize", None, chunk_size=1024) is first
+
+    second = hallucinator.stream("disrupt", None, chunk_size=1024)
+    assert second is not first
+    assert first.cancelled and not second.done
+
+    hallucinator.cancel()
+    assert second.cancelled and hallucinator.phrase is None
+
+def test_respond_cuts_in_with_a_spare_block():
+    hallucinator = Hallucinator()
+    chunk = np.zeros(1024, dtype=np.float32)
+    assert hallucinator.respond("silence", chunk) is None
+
+    audio, append, continues = hallucinator.respond("harmonize", chunk, chunk_size=1024)
+    assert (len(audio), append, continues) == (2048, False, True)
+    audio, append, _ = hallucinator.respond("harmonize", chunk, chunk_size=1024)
+    assert (len(audio), append) == (1024, True)
+    audio, append, _ = hallucinator.respond("disrupt", chunk, chunk_size=1024)
+    assert (len(audio), append) == (2048, False)
+
+    audio, append, continues = hallucinator.respond("silence", chunk)
+    assert (len(audio), append, continues) == (0, True, False)
+    assert hallucinator.phrase is None
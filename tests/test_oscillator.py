@@ -0,0 +1,71 @@
+# tests/test_oscillator.py
+
+import numpy as np
+import pytest
+from voice.oscillator import OscillatorBank, SINE, chord_from_chroma
+
+def analytic(freqs, amps, n, sample_rate=44100):
+    t = np.arange(n) / sample_rate
+    return sum(a * np.sin(2. * np.pi * f * t) for f, a in zip(freqs, amps))
+
+def test_phase_continues_across_renders():
+    bank = OscillatorBank(voices=4, harmonics=SINE, block_size=64)
+    freqs, amps = [220.0, 330.0, 523.25], [0.5, 0.3, 0.2]
+    bank.set_voices(freqs, amps)
+    bank._amps_now[:3] = amps # Skip the fade-in.
+
+    rendered = np.concatenate([bank.render(n).copy() for n in (100, 64, 1000, 37, 3000)])
+    assert np.allclose(rendered, analytic(freqs, amps, len(rendered)), atol=1e-5)
+
+@pytest.mark.parametrize("decimation", [2, 4])
+def test_decimated_render_keeps_phase(decimation):
+    """A decimated render interpolates the same waveform and hands phase on to a full-rate one."""
+    bank = OscillatorBank(voices=4, harmonics=SINE, block_size=64)
+    freqs, amps = [220.0, 330.0, 523.25], [0.5, 0.3, 0.2]
+    bank.set_voices(freqs, amps)
+    bank._amps_now[:3] = amps
+
+    rendered = np.concatenate([bank.render(n, decimation=decimation).copy() for n in (100, 1, 1000, 37)]
+                              + [bank.render(500).copy()])
+    assert np.allclose(rendered, analytic(freqs, amps, len(rendered)), atol=5e-3)
+
+def test_partials_above_nyquist_are_dropped():
+    """At a quarter of the rate an 8 kHz partial is past the 5.5 kHz Nyquist and stays silent."""
+    banks = [OscillatorBank(voices=1, harmonics=harmonics, block_size=64) for harmonics in ((1.0, 1.0), SINE)]
+    for bank in banks:
+        bank.set_voices([4000.0], [1.0])
+        bank._amps_now[:] = 1.0
+    with_overtone, fundamental = (bank.render(4410, decimation=4) for bank in banks)
+    assert np.allclose(with_overtone, 0.5 * fundamental, atol=1e-6)
+
+def test_amplitude_ramps_in():
+    bank = OscillatorBank(voices=1, harmonics=SINE, block_size=64)
+    bank.set_voices([441.0], [1.0])
+    first = bank.render(4410).copy()
+    assert np.abs(first[:64]).max() < 0.05
+    assert np.abs(first[-100:]).max() > 0.9
+    # Once ramped, the next render stays at full level.
+    assert np.abs(bank.render(4410)[:100]).max() > 0.9
+
+def test_renders_into_the_same_buffer():
+    bank = OscillatorBank(max_samples=4096)
+    bank.set_voices([440.0], [1.0])
+    first = bank.render(4096)
+    second = bank.render(2048)
+    assert np.shares_memory(first, second)
+
+    out = np.zeros(1000, dtype=np.float32)
+    assert bank.render(1000, out=out) is out
+
+def test_chord_from_chroma():
+    chroma = np.zeros(12)
+    chroma[[0, 4, 7, 9]] = [1.0, 0.8, 0.6, 0.1] # C major, plus a little A
+    freqs, amps = chord_from_chroma(chroma)
+    assert freqs == pytest.approx([261.63, 329.63, 392.0], abs=0.01)
+    assert amps.sum() == pytest.approx(1.0)
+    assert amps[0] > amps[1] > amps[2]
+
+def test_chord_from_silence_is_even():
+    freqs, amps = chord_from_chroma(np.zeros(12))
+    assert len(freqs) == 3
+    assert np.allclose(amps, 1.0 / 3)
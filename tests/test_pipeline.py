@@ -0,0 +1,93 @@
+# tests/test_pipeline.py
+
+import threading
+import time
+import pytest
+from spine.pipeline import Pipeline, StageQueue, CLOSED
+
+def counter(n):
+    """A source stage yielding 0..n-1, then ending like a file source."""
+    items = iter(range(n))
+    def produce():
+        try:
+            return next(items)
+        except StopIteration:
+            raise EOFError
+    return produce
+
+def test_pipeline_delivers_everything_in_order():
+    results = []
+    pipeline = (Pipeline()
+                .add_stage("source", counter(50))
+                .add_stage("double", lambda x: x * 2)
+                .add_stage("sink", results.append))
+    pipeline.start().wait()
+    assert results == [2 * i for i in range(50)]
+    assert pipeline.stats()['double']['processed'] == 50
+
+def test_none_results_are_not_forwarded():
+    results = []
+    pipeline = (Pipeline()
+                .add_stage("source", counter(10))
+                .add_stage("evens", lambda x: x if x % 2 == 0 else None)
+                .add_stage("sink", results.append))
+    pipeline.start().wait()
+    assert results == [0, 2, 4, 6, 8]
+
+def test_drop_oldest_keeps_the_freshest():
+    queue = StageQueue(maxsize=2, policy='drop_oldest')
+    for i in range(5):
+        queue.put(i)
+    assert queue.dropped == 3
+    assert [queue.get(), queue.get()] == [3, 4]
+
+def test_block_applies_backpressure():
+    queue = StageQueue(maxsize=1, policy='block')
+    queue.put(0)
+    producer = threading.Thread(target=queue.put, args=(1,))
+    producer.start()
+    time.sleep(0.05)
+    assert producer.is_alive() # Waiting for room
+    assert queue.get() == 0
+    producer.join(timeout=1)
+    assert queue.get() == 1
+    assert queue.blocked == 1
+
+def test_closed_queue_drains_then_ends():
+    queue = StageQueue(maxsize=2)
+    queue.put('a')
+    queue.close()
+    assert queue.get() == 'a'
+    assert queue.get() is CLOSED
+
+def test_stage_errors_are_raised_by_wait():
+    def fail(x):
+        if x == 3:
+            raise RuntimeError("boom")
+        return x
+
+    pipeline = (Pipeline()
+                .add_stage("source", counter(1000))
+                .add_stage("fail", fail)
+                .add_stage("sink", lambda x: None))
+    with pytest.raises(RuntimeError, match="boom"):
+        pipeline.start().wait(poll_interval=0.01)
+
+def test_stages_overlap():
+    """Two 10 ms stages take ~10 ms per item together, not ~20 ms."""
+    def slow(x=None):
+        time.sleep(0.01)
+        return x
+
+    items = iter(range(20))
+    def source():
+        slow()
+        try:
+            return next(items)
+        except StopIteration:
+            raise EOFError
+
+    pipeline = Pipeline().add_stage("source", source).add_stage("work", slow)
+    start = time.perf_counter()
+    pipeline.start().wait(poll_interval=0.01)
+    assert time.perf_counter() - start < 20 * 0.02 * 0.8
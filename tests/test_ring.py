@@ -0,0 +1,66 @@
+# tests/test_ring.py
+
+import threading
+import time
+import numpy as np
+from cortex.ring import SampleRing
+
+def test_ring_preserves_order():
+    """Samples come out in the order they went in, across the wrap point."""
+    ring = SampleRing(capacity=1000)
+    data = np.arange(2500, dtype=np.float32)
+    out = []
+    for start in range(0, len(data), 250):
+        ring.write(data[start:start + 250])
+        out.append(ring.read(250))
+    assert np.array_equal(np.concatenate(out), data)
+    assert ring.overflows == 0
+
+def test_ring_overflow_is_counted():
+    """A consumer that falls behind loses the oldest samples, and is told so."""
+    ring = SampleRing(capacity=1000)
+    for start in range(0, 3000, 100):
+        ring.write(np.arange(start, start + 100, dtype=np.float32))
+    chunk = ring.read(100)
+    assert ring.overflows > 0
+    # Whatever is read is contiguous audio that survived.
+    assert np.array_equal(np.diff(chunk), np.ones(99))
+    assert chunk[0] >= 3000 - 1000
+
+def test_ring_latest():
+    """`latest` returns the newest samples without consuming them."""
+    ring = SampleRing(capacity=1000)
+    ring.write(np.arange(300, dtype=np.float32))
+    assert np.array_equal(ring.latest(50), np.arange(250, 300))
+    assert ring.available() == 300
+
+def test_ring_read_waits_for_producer():
+    """A read blocks until enough samples arrive and counts the underrun."""
+    ring = SampleRing(capacity=4096)
+
+    def produce():
+        for i in range(8):
+            time.sleep(0.005)
+            ring.write(np.full(128, i, dtype=np.float32))
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    chunk = ring.read(1024, timeout=2.0)
+    producer.join()
+    assert np.array_equal(chunk, np.repeat(np.arange(8), 128))
+    assert ring.underruns == 1
+
+def test_ring_read_timeout():
+    """A read that cannot be satisfied in time returns None."""
+    ring = SampleRing(capacity=1000)
+    assert ring.read(100, timeout=0.01) is None
+
+def test_ring_multichannel_frames():
+    """Multi-channel rings store whole frames and read back (n, channels)."""
+    ring = SampleRing(capacity=512, channels=2)
+    frames = np.stack([np.arange(300), -np.arange(300)], axis=1).astype(np.float32)
+    ring.write(frames[:150])
+    ring.write(frames[150:])
+    chunk = ring.read(300)
+    assert chunk.shape == (300, 2)
+    assert np.array_equal(chunk, frames)
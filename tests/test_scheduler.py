@@ -0,0 +1,61 @@
+# tests/test_scheduler.py
+
+import pytest
+from spine.scheduler import DeadlineScheduler
+
+@pytest.fixture
+def quality():
+    """Two degradable settings, both on at full quality."""
+    return {'tempo': True, 'chroma': True}
+
+def make_scheduler(quality, **kwargs):
+    steps = [(name, lambda n=name: quality.update({n: False}), lambda n=name: quality.update({n: True}))
+             for name in quality]
+    return DeadlineScheduler(period=0.02, steps=steps, cooldown=1, restore_after=3, **kwargs)
+
+def run_tick(scheduler, **costs):
+    for name, seconds in costs.items():
+        scheduler.record(name, seconds)
+    return scheduler.adapt()
+
+def test_degrades_when_over_budget(quality):
+    scheduler = make_scheduler(quality)
+    assert not run_tick(scheduler, analysis=0.012, psyche=0.006) # 18 ms: on time, but over 80%
+    assert scheduler.degraded == ['tempo']
+    assert quality == {'tempo': False, 'chroma': True}
+
+def test_counts_missed_deadlines(quality):
+    scheduler = make_scheduler(quality)
+    assert run_tick(scheduler, analysis=0.025)
+    assert not run_tick(scheduler, analysis=0.001)
+    assert scheduler.missed == 1
+    assert scheduler.ticks == 2
+
+def test_restores_after_sustained_headroom(quality):
+    scheduler = make_scheduler(quality, smoothing=1.0)
+    run_tick(scheduler, analysis=0.03)
+    run_tick(scheduler, analysis=0.03)
+    assert scheduler.level == 2
+    # In between the restore and degrade thresholds nothing changes.
+    for _ in range(5):
+        run_tick(scheduler, analysis=0.012)
+    assert scheduler.level == 2
+    for _ in range(3):
+        run_tick(scheduler, analysis=0.002)
+    assert scheduler.degraded == ['tempo']
+    for _ in range(3):
+        run_tick(scheduler, analysis=0.002)
+    assert quality == {'tempo': True, 'chroma': True}
+
+def test_offline_never_degrades(quality):
+    scheduler = make_scheduler(quality, realtime=False)
+    for _ in range(5):
+        assert run_tick(scheduler, analysis=0.05)
+    assert scheduler.level == 0
+    assert scheduler.missed == 5
+
+def test_overlapped_stages_cost_the_slowest(quality):
+    scheduler = make_scheduler(quality, overlapped=True)
+    assert not run_tick(scheduler, analysis=0.015, psyche=0.015)
+    assert scheduler.expected_cost == pytest.approx(0.015)
+    assert scheduler.level == 0
@@ -0,0 +1,81 @@
+# tests/test_session.py
+
+import numpy as np
+import pytest
+from spine.session import SessionHost
+
+class Tone:
+    """A test input of `chunks` chunks of a sine, then EOFError."""
+    def __init__(self, freq, chunks=None, chunk_size=1024):
+        self.freq, self.chunks, self.chunk_size = freq, chunks, chunk_size
+        self.read = 0
+        self.stopped = False
+
+    def listen(self):
+        if self.chunks is not None and self.read == self.chunks:
+            raise EOFError
+        t = (self.read * self.chunk_size + np.arange(self.chunk_size)) / 44100
+        self.read += 1
+        return (0.3 * np.sin(2 * np.pi * self.freq * t)).astype(np.float32)
+
+    def stop(self):
+        self.stopped = True
+
+class Recorder:
+    def __init__(self):
+        self.played = []
+        self.stopped = False
+
+    def play(self, audio, append=True, continues=False):
+        self.played.append(len(audio))
+
+    def stop(self):
+        self.stopped = True
+
+@pytest.fixture
+def host():
+    return SessionHost(capacity=2)
+
+def add(host, name, chunks=None):
+    return host.add(name, Tone(220.0, chunks), Recorder(), {'cooperativeness': 0.9, 'temperament': 0.1})
+
+def test_one_memory_step_per_tick(host, monkeypatch):
+    sessions = [add(host, f"room-{i}") for i in range(5)]
+    steps = []
+    step = host.memory.step
+    monkeypatch.setattr(host.memory, 'step', lambda: steps.append(len(host.memory)) or step())
+    for _ in range(3):
+        assert host.tick() == 5
+    assert steps == [5, 5, 5]
+    assert all(session.ticks == 3 and session.intent is not None for session in sessions)
+
+def test_sessions_come_and_go(host):
+    first, second = add(host, "a"), add(host, "b")
+    host.tick()
+    host.remove(first)
+    assert first.listener.stopped and first.streamer.stopped
+    third = add(host, "c")
+    host.tick()
+    assert host.sessions == [second, third]
+    assert (second.ticks, third.ticks, first.ticks) == (2, 1, 1)
+    assert second.memory.index == 0 and third.memory.index == 1
+
+def test_ended_input_removes_its_session(host):
+    short, long = add(host, "short", chunks=2), add(host, "long", chunks=4)
+    host.run()
+    assert (short.ticks, long.ticks) == (2, 4)
+    assert host.sessions == [] and len(host.memory) == 0
+    assert short.listener.stopped and long.listener.stopped
+
+def test_sessions_use_the_configured_analyzer():
+    from cortex.analyzer import Analyzer
+    from cortex.streaming import StreamingAnalyzer
+    assert isinstance(add(SessionHost(), "a").analyzer, StreamingAnalyzer)
+    assert type(add(SessionHost(analysis_mode='chunk'), "a").analyzer) is Analyzer
+
+def test_every_tick_plays_silent_ticks(host):
+    """A timeline-mode sink needs one play per tick, even when the voice is quiet."""
+    session = host.add("a", Tone(220.0, 3), Recorder(), {'cooperativeness': 0.9, 'temperament': 0.1},
+                       every_tick=True)
+    host.run()
+    assert len(session.streamer.played) == 3
@@ -0,0 +1,68 @@
+# tests/test_space.py
+
+import numpy as np
+import pytest
+from voice.space import Convolver, DelayLine, Space, synthetic_ir
+
+def test_convolver_matches_direct_convolution():
+    rng = np.random.default_rng(0)
+    ir = rng.standard_normal(1000).astype(np.float32)
+    signal = rng.standard_normal(5000).astype(np.float32)
+    convolver = Convolver(ir, block_size=256)
+
+    # Fed in uneven pieces; the output lags by one block.
+    out = np.empty_like(signal)
+    for start, stop in [(0, 100), (100, 1000), (1000, 1001), (1001, 5000)]:
+        convolver.process(signal[start:stop], out[start:stop])
+    expected = np.convolve(signal, ir)[:len(signal) - 256]
+    assert np.allclose(out[:256], 0.0)
+    assert np.allclose(out[256:], expected, atol=1e-4)
+
+def test_convolver_reset_clears_the_tail():
+    convolver = Convolver(synthetic_ir(0.1), block_size=128)
+    out = np.empty(1024, dtype=np.float32)
+    convolver.process(np.ones(1024, dtype=np.float32), out)
+    convolver.reset()
+    convolver.process(np.zeros(1024, dtype=np.float32), out)
+    assert np.all(out == 0.0)
+
+def test_delay_line_taps():
+    delay = DelayLine(max_delay=1000, max_block=500, taps=[(0, 1.0), (300, 0.5)])
+    signal = np.arange(1, 2001, dtype=np.float32)
+    out = np.empty(500, dtype=np.float32)
+    played = []
+    for start in range(0, len(signal), 500):
+        delay.write(signal[start:start + 500])
+        played.append(delay.read(out).copy())
+    played = np.concatenate(played)
+
+    expected = signal.copy()
+    expected[300:] += 0.5 * signal[:-300]
+    assert np.array_equal(played, expected) # Including across the ring's wrap.
+
+def test_delay_line_reads_unwritten_input_as_silence():
+    delay = DelayLine(max_delay=1000, max_block=100, taps=[(50, 1.0)])
+    delay.write(np.ones(100, dtype=np.float32))
+    delay.sync()
+    out = delay.read(np.empty(100, dtype=np.float32))
+    assert np.all(out[:50] == 1.0) and np.all(out[50:] == 0.0)
+
+def test_delay_line_rejects_long_taps():
+    with pytest.raises(ValueError):
+        DelayLine(max_delay=100, taps=[(200, 1.0)])
+
+def test_space_renders_into_one_buffer():
+    space = Space(block_size=256)
+    space.listen(np.ones(44100, dtype=np.float32))
+    space.start()
+    first = space.render(1024)
+    assert np.shares_memory(first, space.render(512))
+
+def test_space_without_reverb_plays_the_delay_alone():
+    space = Space(taps=((0.0, 1.0),), block_size=256)
+    space.listen(np.ones(4096, dtype=np.float32))
+    space.start()
+    space.listen(np.ones(4096, dtype=np.float32))
+    assert np.array_equal(space.render(1024, reverb=False), np.ones(1024))
+    # Back with the reverb, it starts from silence: nothing is left from before.
+    assert np.array_equal(space.render(256), np.ones(256))
@@ -0,0 +1,60 @@
+# tests/test_streaming.py
+
+import numpy as np
+import pytest
+from cortex.streaming import StreamingAnalyzer
+
+@pytest.fixture
+def sine_audio():
+    # 3 seconds of a simple sine wave
+    sr = 44100
+    t = np.arange(sr * 3) / sr
+    return 0.5 * np.sin(2. * np.pi * 440 * t)
+
+def feed(analyzer, audio, chunk_size):
+    for start in range(0, len(audio), chunk_size):
+        features = analyzer.analyze(audio[start:start + chunk_size])
+    return features
+
+def test_streaming_output_keys(sine_audio):
+    """The streaming analyzer returns the same keys as the chunk analyzer."""
+    features = feed(StreamingAnalyzer(), sine_audio, 1024)
+    expected_keys = [
+        'rmse', 'spectral_centroid', 'spectral_bandwidth',
+        'spectral_rolloff', 'zero_crossing_rate', 'onset_density',
+        'tempo', 'chroma'
+    ]
+    assert sorted(features.keys()) == sorted(expected_keys)
+    assert features['chroma'].shape == (12,)
+
+def test_streaming_is_chunk_size_independent(sine_audio):
+    """Frames spanning chunk boundaries are kept, so chunking does not matter."""
+    a = feed(StreamingAnalyzer(window_seconds=1.0), sine_audio, 1024)
+    b = feed(StreamingAnalyzer(window_seconds=1.0), sine_audio, 700)
+    for key in a:
+        assert np.allclose(a[key], b[key])
+
+def test_streaming_sine_features(sine_audio):
+    """A steady 440 Hz sine has its energy and chroma at A."""
+    features = feed(StreamingAnalyzer(window_seconds=1.0), sine_audio, 1024)
+    assert features['rmse'] == pytest.approx(0.5 / np.sqrt(2), rel=0.01)
+    assert features['spectral_centroid'] == pytest.approx(440, rel=0.05)
+    assert np.argmax(features['chroma']) == 9 # A
+    assert features['onset_density'] == 0
+
+def test_streaming_window_is_bounded(sine_audio):
+    """Only the last `window_seconds` of audio contribute to the features."""
+    analyzer = StreamingAnalyzer(window_seconds=0.5)
+    feed(analyzer, sine_audio, 1024)
+    features = analyzer.analyze(np.zeros(44100))
+    assert features['rmse'] == pytest.approx(0.0, abs=1e-9)
+
+def test_streaming_tempo():
+    """A click track at 120 BPM is tracked across chunks."""
+    sr = 44100
+    audio = np.zeros(sr * 8)
+    click = 0.8 * np.sin(2. * np.pi * 1000 * np.arange(441) / sr)
+    for start in np.arange(0, len(audio) - 441, sr // 2):
+        audio[start:start + 441] = click
+    features = feed(StreamingAnalyzer(), audio, 1024)
+    assert features['tempo'] == pytest.approx(120, abs=2)
@@ -0,0 +1,73 @@
+# tests/test_telemetry.py
+
+import json
+import threading
+import time
+import pytest
+from spine.scheduler import DeadlineScheduler
+from spine.telemetry import LatencyHistogram, SamplingProfiler, Telemetry
+
+def test_histogram_percentiles():
+    """Percentiles land within one bucket (~19%) above the true value."""
+    histogram = LatencyHistogram()
+    for i in range(1, 1001):
+        histogram.record(i * 1e-5) # 10 us .. 10 ms
+    assert 5e-3 <= histogram.percentile(50) <= 5e-3 * 1.19
+    assert 9.9e-3 <= histogram.percentile(99) <= 9.9e-3 * 1.19
+    assert histogram.percentile(100) == histogram.max == pytest.approx(1e-2)
+    assert histogram.mean == pytest.approx(5.005e-3)
+
+def test_histogram_extremes():
+    histogram = LatencyHistogram()
+    histogram.record(0.0)
+    histogram.record(1e5)
+    assert histogram.count == 2
+    assert histogram.percentile(100) == 1e5
+
+def test_scheduler_feeds_telemetry(tmp_path):
+    telemetry = Telemetry()
+    scheduler = DeadlineScheduler(period=0.01, realtime=False, telemetry=telemetry)
+    for cost in (0.002, 0.02, 0.003):
+        scheduler.record('analysis', cost)
+        scheduler.adapt()
+
+    path = tmp_path / "telemetry.json"
+    telemetry.dump(path)
+    report = json.loads(path.read_text())
+    assert report['ticks'] == 3
+    assert report['counters']['deadline_misses'] == 1
+    assert report['stages']['analysis']['count'] == 3
+    assert report['stages']['analysis']['max_ms'] == pytest.approx(20.0)
+
+def test_sampling_profiler_finds_the_hot_function():
+    def hot_loop(stop):
+        while not stop.is_set():
+            sum(range(1000))
+
+    stop = threading.Event()
+    worker = threading.Thread(target=hot_loop, args=(stop,))
+    worker.start()
+    profiler = SamplingProfiler(interval=0.001).start()
+    time.sleep(0.2)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    assert profiler.samples > 10
+    assert any('hot_loop' in stack for stack in profiler.stacks)
+
+def test_panel_while_stages_are_added():
+    """Reading the telemetry never trips over a stage a worker thread adds meanwhile."""
+    telemetry = Telemetry()
+    done = threading.Event()
+    def worker():
+        for i in range(2000):
+            telemetry.record(f"stage{i}", 1e-3)
+        done.set()
+    thread = threading.Thread(target=worker)
+    thread.start()
+    while not done.is_set():
+        telemetry.panel()
+        telemetry.snapshot()
+    thread.join()
+    assert len(telemetry.snapshot()['stages']) == 2000
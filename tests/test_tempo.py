@@ -0,0 +1,50 @@
+# tests/test_tempo.py
+
+import numpy as np
+import pytest
+from cortex.tempo import TempoTracker
+
+def click_envelope(tracker, bpm, seconds=10):
+    """An onset envelope with one onset per beat plus a little noise."""
+    period = 60.0 * tracker.frame_rate / bpm
+    onsets = np.random.default_rng(0).random(int(tracker.frame_rate * seconds)) * 0.1
+    onsets[np.round(np.arange(0, len(onsets) - 1, period)).astype(int)] += 1.0
+    return onsets
+
+@pytest.mark.parametrize("bpm", [70, 100, 120, 140])
+def test_tempo_tracks_click(bpm):
+    """A steady click is estimated within 2 BPM with high confidence."""
+    tracker = TempoTracker()
+    onsets = click_envelope(tracker, bpm)
+    for start in range(0, len(onsets), 2):
+        tracker.update(onsets[start:start + 2])
+    assert tracker.bpm == pytest.approx(bpm, abs=2)
+    assert tracker.confidence > 0.4
+
+def test_tempo_silence():
+    """Silence has no tempo."""
+    tracker = TempoTracker()
+    tracker.update(np.zeros(500))
+    assert tracker.bpm == 0
+    assert tracker.confidence == 0
+
+def test_tempo_noise_has_low_confidence():
+    """Aperiodic onsets do not produce a confident tempo."""
+    tracker = TempoTracker()
+    tracker.update(np.random.default_rng(1).random(1000))
+    assert tracker.confidence < 0.2
+
+def test_tempo_history_is_bounded():
+    """The onset history does not grow with the amount of audio heard."""
+    tracker = TempoTracker()
+    shape = tracker._history.shape
+    tracker.update(np.random.default_rng(2).random(5000))
+    assert tracker._history.shape == shape
+
+def test_tempo_tracks_channels_independently():
+    """A multi-channel tracker follows each channel's own tempo."""
+    tracker = TempoTracker(channels=2)
+    onsets = np.stack([click_envelope(tracker, 90), click_envelope(tracker, 130)])
+    for start in range(0, onsets.shape[1], 2):
+        tracker.update(onsets[:, start:start + 2])
+    assert tracker.bpm == pytest.approx([90, 130], abs=2)
@@ -0,0 +1,272 @@
+# tests/test_train_voice.py
+
+import os
+import random
+import librosa
+import numpy as np
+import pytest
+import torch
+from torch.utils.data import DataLoader
+from train_voice import (AudioCorpus, CheckpointManager, CorpusIndex, SegmentSampler, SpectrogramCache,
+                         batch_stft, rng_state, set_rng_state, train_epoch)
+from voice.ddsp import SimpleDDSP
+from voice.file_sink import FileSink
+
+def write_wav(path, seconds=2.5, freq=220.0, sr=22050):
+    t = np.arange(int(seconds * sr)) / sr
+    sink = FileSink(str(path), sample_rate=sr)
+    sink.play(0.5 * np.sin(2. * np.pi * freq * t))
+    sink.stop()
+
+@pytest.fixture
+def corpus(tmp_path):
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    write_wav(raw / 'a.wav')
+    write_wav(raw / 'b.wav', seconds=1.0, freq=330.0)
+    return raw
+
+def test_cached_items_match_uncached(corpus, tmp_path):
+    cache = SpectrogramCache(str(tmp_path / 'processed'), sr=22050)
+    cached = AudioCorpus(str(corpus), sr=22050, cache=cache)
+    plain = AudioCorpus(str(corpus), sr=22050)
+    for i in range(len(plain)):
+        expected, got = plain[i], cached[i]
+        assert got.shape == expected.shape
+        # Frames whose window reaches the end of the audio differ: the cache
+        # sees past the cut (or pads frames, not samples). The rest match.
+        assert torch.allclose(got[:, :40], expected[:, :40], atol=1e-3)
+
+def test_cached_later_segments_are_hop_aligned(tmp_path):
+    """Past segment 0 a cached item is the uncached STFT of its start rounded down to a hop."""
+    raw = tmp_path / 'raw'
+    raw.mkdir()
+    write_wav(raw / 'long.wav', seconds=6.5)
+    y, _ = librosa.load(str(raw / 'long.wav'), sr=None)
+    cached = AudioCorpus(str(raw), sr=22050, cache=SpectrogramCache(str(tmp_path / 'processed'), sr=22050))
+    assert len(cached) == 3
+    for i in range(1, len(cached)):
+        _, _, start, length = cached.index.locate(i)
+        assert start % 512 # The segment does not start on a hop boundary,
+        aligned = start // 512 * 512 # so its frames come from here instead.
+        expected = np.abs(librosa.stft(y[aligned:aligned + length], n_fft=2048, hop_length=512))
+        # The first two frames reach before the segment: the cache sees the
+        # audio there instead of zero padding.
+        assert torch.allclose(cached[i][:, 2:40], torch.from_numpy(expected[:, 2:40]), atol=1e-3)
+
+def test_open_shards_are_bounded(corpus, tmp_path):
+    cached = AudioCorpus(str(corpus), sr=22050, cache=SpectrogramCache(str(tmp_path / 'processed'), sr=22050),
+                         max_open=1)
+    for i in range(len(cached)):
+        cached[i]
+    assert list(cached._shards) == [str(corpus / 'b.wav')]
+
+def test_files_are_hashed_once(corpus, tmp_path, monkeypatch):
+    """Reopening an evicted shard does not hash its recording again."""
+    import train_voice
+    hashed = []
+    digest = train_voice.file_digest
+    monkeypatch.setattr(train_voice, 'file_digest', lambda path: hashed.append(path) or digest(path))
+    cached = AudioCorpus(str(corpus), sr=22050, cache=SpectrogramCache(str(tmp_path / 'processed'), sr=22050),
+                         max_open=1)
+    for epoch in range(3):
+        for i in range(len(cached)):
+            cached[i]
+    assert sorted(hashed) == [str(corpus / 'a.wav'), str(corpus / 'b.wav')]
+
+def test_open_files_are_bounded_and_closed(corpus):
+    plain = AudioCorpus(str(corpus), sr=22050, max_open=1)
+    for i in range(len(plain)):
+        plain[i]
+    first, = plain._handles.values()
+    plain[0] # Reopens a.wav and closes b.wav
+    assert first.closed
+    last, = plain._handles.values()
+    plain.close()
+    assert last.closed and not plain._handles
+
+def test_files_are_decoded_once(corpus, tmp_path, monkeypatch):
+    directory = str(tmp_path / 'processed')
+    AudioCorpus(str(corpus), sr=22050, cache=SpectrogramCache(directory, sr=22050))[0]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("decoded again")
+    monkeypatch.setattr(librosa, 'load', fail)
+    cache = SpectrogramCache(directory, sr=22050)
+    dataset = AudioCorpus(str(corpus), sr=22050, cache=cache)
+    dataset[0], dataset[0]
+    assert cache.hits == 1 and cache.misses == 0
+
+def test_shard_is_invalidated_by_content_and_params(corpus, tmp_path):
+    directory = str(tmp_path / 'processed')
+    path = str(corpus / 'a.wav')
+    cache = SpectrogramCache(directory, sr=22050)
+    cache.load(path)
+    SpectrogramCache(directory, sr=22050, hop_length=256).load(path)
+    write_wav(path, freq=440.0)
+    cache.load(path)
+    assert cache.misses == 2
+    assert len(os.listdir(directory)) == 3
+
+def test_items_are_views_of_the_shard(corpus, tmp_path):
+    cache = SpectrogramCache(str(tmp_path / 'processed'), sr=22050)
+    dataset = AudioCorpus(str(corpus), sr=22050, cache=cache)
+    item = dataset[0] # a.wav, sorted first
+    shard = dataset._shards[str(corpus / 'a.wav')]
+    assert isinstance(shard, np.memmap)
+    assert np.shares_memory(item.numpy(), shard)
+
+def test_index_covers_every_segment(tmp_path):
+    write_wav(tmp_path / 'long.wav', seconds=7.5)
+    write_wav(tmp_path / 'short.wav', seconds=0.5)
+    nested = tmp_path / 'rehearsals'
+    nested.mkdir()
+    write_wav(nested / 'take.wav', seconds=4.0)
+
+    index = CorpusIndex(str(tmp_path), duration=2)
+    assert [os.path.basename(path) for path, _, _ in index.files] == ['long.wav', 'short.wav', 'take.wav']
+    assert len(index) == 3 + 1 + 2
+    assert [index.locate(i)[2] for i in range(3)] == [0, 2 * 22050, 4 * 22050]
+    for i in range(len(index)):
+        for _ in range(20):
+            _, sr, start, length = index.locate(i, random_offset=True)
+            frames = index.files[index.segment_file[i]][2]
+            assert 0 <= start and (start + length <= frames or start == 0)
+
+def test_segments_are_read_by_seeking(tmp_path):
+    write_wav(tmp_path / 'long.wav', seconds=6.0)
+    dataset = AudioCorpus(str(tmp_path), sr=22050)
+    whole, _ = librosa.load(str(tmp_path / 'long.wav'), sr=None)
+    expected = np.abs(librosa.stft(whole[2 * 22050:4 * 22050]))
+    assert len(dataset) == 3
+    assert torch.allclose(dataset[1], torch.from_numpy(expected), atol=1e-3)
+
+def test_segments_feed_a_multi_worker_loader(corpus):
+    dataset = AudioCorpus(str(corpus), sr=22050, random_offset=True)
+    loader = torch.utils.data.DataLoader(dataset, batch_size=2, num_workers=2)
+    batches = list(loader)
+    assert len(batches) == 1 and batches[0].shape == (2, 1025, dataset.frames)
+
+def test_batch_stft_matches_librosa():
+    rng = np.random.default_rng(0)
+    waveforms = rng.standard_normal((3, 22050)).astype(np.float32)
+    expected = np.stack([np.abs(librosa.stft(y)) for y in waveforms])
+    got = batch_stft(torch.from_numpy(waveforms))
+    assert got.shape == expected.shape
+    assert torch.allclose(got, torch.from_numpy(expected), rtol=1e-4, atol=1e-3)
+
+def test_waveform_items_feed_batch_stft(corpus):
+    spectra = AudioCorpus(str(corpus), sr=22050)
+    waveforms = AudioCorpus(str(corpus), sr=22050, waveform=True)
+    assert waveforms[0].shape == (2 * 22050,)
+    batch = torch.stack([waveforms[i] for i in range(len(waveforms))])
+    expected = torch.stack([spectra[i] for i in range(len(spectra))])
+    assert torch.allclose(batch_stft(batch), expected, atol=1e-3)
+
+def test_waveforms_are_not_cached(corpus, tmp_path):
+    with pytest.raises(ValueError):
+        AudioCorpus(str(corpus), cache=SpectrogramCache(str(tmp_path / 'processed')), waveform=True)
+
+def trained_weights(batches, **kwargs):
+    torch.manual_seed(0)
+    model = SimpleDDSP()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    train_epoch(model, batches, torch.nn.MSELoss(), optimizer, torch.device('cpu'), **kwargs)
+    return model.processor.weight.detach().clone()
+
+def test_accumulated_batches_step_like_one_large_batch():
+    torch.manual_seed(1)
+    data = torch.rand(8, 1025, 3)
+    whole = trained_weights([data])
+    accumulated = trained_weights(list(data.split(2)), accumulate=4)
+    assert torch.allclose(whole, accumulated, atol=1e-6)
+    # Without accumulation the same batches take four steps.
+    assert not torch.allclose(whole, trained_weights(list(data.split(2))), atol=1e-6)
+
+def test_short_last_group_is_averaged_over_its_own_size():
+    """Six batches with accumulate=4 step like a batch of four, then a batch of two."""
+    torch.manual_seed(1)
+    data = torch.rand(12, 1025, 3)
+    expected = trained_weights([data[:8], data[8:]])
+    accumulated = trained_weights(list(data.split(2)), accumulate=4)
+    assert torch.allclose(expected, accumulated, atol=1e-6)
+
+def test_bf16_autocast_trains_float32_weights():
+    torch.manual_seed(1)
+    batches = list(torch.rand(4, 1025, 3).split(2))
+    weights = trained_weights(batches, bf16=True)
+    assert weights.dtype == torch.float32
+    assert torch.allclose(weights, trained_weights(batches), atol=1e-2)
+
+def shuffled_epoch(model, optimizer, data):
+    # Draws from every generator a checkpoint restores.
+    batches = list(data[torch.randperm(len(data))].split(2))
+    noise = np.random.rand() + random.random()
+    train_epoch(model, batches, torch.nn.MSELoss(), optimizer, torch.device('cpu'))
+    return noise
+
+def test_resumed_training_matches_uninterrupted(tmp_path):
+    data = torch.rand(6, 1025, 3)
+
+    def run(epochs, checkpoints=None):
+        torch.manual_seed(0); np.random.seed(0); random.seed(0)
+        model = SimpleDDSP()
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+        start = checkpoints.resume(model, optimizer) if checkpoints else 0
+        noise = [shuffled_epoch(model, optimizer, data) for _ in range(start, epochs)]
+        if checkpoints:
+            checkpoints.save(epochs, model, optimizer)
+            checkpoints.wait()
+        return model.processor.weight.detach(), noise
+
+    expected, expected_noise = run(3)
+    checkpoints = CheckpointManager(str(tmp_path))
+    run(2, checkpoints)
+    resumed, noise = run(3, checkpoints)
+    assert torch.equal(resumed, expected)
+    assert noise == expected_noise[2:]
+
+def test_resumed_epochs_cut_the_same_segments_with_workers(tmp_path):
+    """Persistent workers cannot shift a resumed run's shuffle or random offsets."""
+    write_wav(tmp_path / 'long.wav', seconds=6.5)
+    dataset = AudioCorpus(str(tmp_path), sr=22050, random_offset=True, waveform=True)
+
+    def epochs(n):
+        loader = DataLoader(dataset, sampler=SegmentSampler(len(dataset)), generator=torch.Generator(),
+                            num_workers=2, persistent_workers=True)
+        return [torch.cat(list(loader)) for _ in range(n)]
+
+    torch.manual_seed(0)
+    expected = epochs(3)
+    torch.manual_seed(0)
+    epochs(2)
+    state = rng_state() # What a checkpoint after epoch 2 holds
+    torch.manual_seed(1)
+    set_rng_state(state)
+    assert torch.equal(epochs(1)[0], expected[2])
+    assert not torch.equal(expected[1], expected[2])
+
+def test_checkpoints_are_pruned_and_never_torn(tmp_path):
+    model = SimpleDDSP()
+    optimizer = torch.optim.Adam(model.parameters())
+    checkpoints = CheckpointManager(str(tmp_path), keep=2)
+    for epoch in range(1, 5):
+        checkpoints.save(epoch, model, optimizer)
+    checkpoints.wait()
+    assert sorted(os.listdir(tmp_path)) == ['checkpoint-00003.pt', 'checkpoint-00004.pt']
+
+    # A damaged newest checkpoint falls back to the one before it.
+    with open(checkpoints.path(4), 'r+b') as f:
+        f.truncate(100)
+    assert checkpoints.latest()['epoch'] == 3
+
+def test_snapshot_is_independent_of_training(tmp_path):
+    model = SimpleDDSP()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.1)
+    before = model.processor.weight.detach().clone()
+    checkpoints = CheckpointManager(str(tmp_path))
+    checkpoints.save(1, model, optimizer)
+    with torch.no_grad():
+        model.processor.weight.add_(1.0) # Training moves on during the write
+    checkpoints.wait()
+    assert torch.equal(checkpoints.latest()['model']['processor.weight'], before)
@@ -2,114 +2,533 @@
 # The Ritual to make Pneuma sound like you.
 
 import argparse
+import collections
+import hashlib
 import os
+import random
+import re
+import resource
+import sys
+import threading
+import time
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
+from torch.utils.data import Dataset, DataLoader, Sampler
 import librosa
 import numpy as np
+import soundfile as sf
 
-# This is a placeholder for a real DDSP/RAVE model architecture.
-# In a real scenario, this would be a complex neural network.
-class SimpleDDSP(nn.Module):
-    def __init__(self):
-        super(SimpleDDSP, self).__init__()
-        # Simplified model: a linear layer to represent some processing
-        self.processor = nn.Linear(1025, 512) # Example sizes
-        self.synthesizer = nn.Linear(512, 1024) # Example sizes
-
-    def forward(self, x):
-        # x would be some form of processed audio features (e.g., STFT)
-        processed = torch.relu(self.processor(x))
-        # The output would be parameters for a synthesizer (e.g., amplitudes, noise levels)
-        synth_params = torch.sigmoid(self.synthesizer(processed))
-        return synth_params
+from voice.ddsp import SimpleDDSP
+from voice.loader import export_script
+
+# librosa.stft's defaults, which the model's 1025 input bins follow.
+N_FFT = 2048
+HOP_LENGTH = 512
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.ogg')
+
+_windows = {}
+
+def batch_stft(waveforms, n_fft=N_FFT, hop_length=HOP_LENGTH):
+    """
+    STFT magnitudes of a (batch, samples) waveform tensor in one torch.stft
+    call, framed like librosa.stft's defaults (periodic Hann window,
+    centered, zero-padded): (batch, bins, frames).
+    """
+    key = (n_fft, waveforms.device)
+    window = _windows.get(key)
+    if window is None:
+        window = _windows[key] = torch.hann_window(n_fft, device=waveforms.device)
+    return torch.stft(waveforms, n_fft, hop_length, window=window, center=True,
+                      pad_mode='constant', return_complex=True).abs()
+
+def file_digest(path, block_size=2**20):
+    """SHA-1 of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class SpectrogramCache:
+    def __init__(self, directory='corpus/processed', sr=44100, n_fft=N_FFT, hop_length=HOP_LENGTH):
+        """
+        STFT magnitudes of whole audio files, computed once and kept on disk
+        as one .npy shard per file, stored time-major (frames x bins).
+        A shard is named after the file's content hash and the STFT
+        parameters, so editing a recording or changing the parameters simply
+        misses the old entry. Shards are opened memory-mapped
+        (copy-on-write), so reading a segment is a slice of the page cache
+        rather than a decode.
+        """
+        self.directory = directory
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def shard_path(self, digest):
+        params = f"sr{self.sr}-fft{self.n_fft}-hop{self.hop_length}"
+        return os.path.join(self.directory, f"{digest}-{params}.npy")
+
+    def load(self, path, digest=None):
+        """The memory-mapped (frames, bins) magnitude of `path`, computed on a miss."""
+        shard = self.shard_path(digest or file_digest(path))
+        if os.path.exists(shard):
+            self.hits += 1
+        else:
+            self.misses += 1
+            y, _ = librosa.load(path, sr=self.sr, mono=True)
+            magnitude = np.abs(librosa.stft(y, n_fft=self.n_fft, hop_length=self.hop_length))
+            # Written under a temporary name first, so a crash never leaves a torn shard.
+            temporary = shard + f".{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                np.save(f, np.ascontiguousarray(magnitude.T, dtype=np.float32))
+            os.replace(temporary, shard)
+        return np.load(shard, mmap_mode='c')
+
+class CorpusIndex:
+    def __init__(self, directory, duration=2):
+        """
+        Every `duration`-second segment of every recording under `directory`
+        (searched recursively, in sorted order). Lengths and sample rates
+        come from the file headers, read once here; no audio is decoded.
+        A recording shorter than one segment still counts as one, padded.
+        """
+        self.directory = directory
+        self.duration = duration
+        self.files = []  # (path, sample rate, length in samples)
+        for root, dirs, names in os.walk(directory):
+            dirs.sort()
+            for name in sorted(names):
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    path = os.path.join(root, name)
+                    info = sf.info(path)
+                    self.files.append((path, info.samplerate, info.frames))
+
+        counts = [max(1, frames // (duration * sr)) for _, sr, frames in self.files]
+        self.segment_file = np.repeat(np.arange(len(self.files)), counts)
+        self.segment_number = np.concatenate([np.arange(n) for n in counts]) if counts else np.zeros(0, int)
+
+    def __len__(self):
+        return len(self.segment_file)
+
+    def locate(self, idx, random_offset=False, draw=None):
+        """
+        (path, sample rate, first sample, samples) of segment `idx`, in the
+        file's own rate. With `random_offset` the segment starts anywhere in
+        its slot (staying inside the file), so epochs see shifted cuts; the
+        offset comes from `draw` (a non-negative int) when one is given,
+        from torch's RNG otherwise.
+        """
+        path, sr, frames = self.files[self.segment_file[idx]]
+        length = self.duration * sr
+        start = int(self.segment_number[idx]) * length
+        if random_offset:
+            start += draw % length if draw is not None else int(torch.randint(length, ()))
+        return path, sr, max(0, min(start, frames - length)), length
+
+class SegmentSampler(Sampler):
+    def __init__(self, n):
+        """
+        A shuffled pass over `n` segments that also draws each segment's
+        random offset: it yields (index, draw) pairs for AudioCorpus.
+        Both come from torch's global RNG in the main process, which a
+        checkpoint restores, so a resumed run cuts exactly the segments an
+        uninterrupted one would have. DataLoader workers have RNGs of their
+        own that a checkpoint cannot reach, and persistent workers carry
+        them on from epoch to epoch. (Give the DataLoader a generator of
+        its own too: by default it seeds its workers from the global RNG
+        when it is created, which a resumed run does at a different point.)
+        """
+        self.n = n
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        order = torch.randperm(self.n).tolist()
+        draws = torch.randint(2**31 - 1, (self.n,)).tolist()
+        return iter(zip(order, draws))
 
 # Custom Dataset for loading audio files
 class AudioCorpus(Dataset):
-    def __init__(self, directory, sr=44100, duration=2):
+    def __init__(self, directory, sr=44100, duration=2, cache=None, random_offset=False, waveform=False,
+                 max_open=16):
+        """
+        Fixed-length STFT magnitudes of every `duration`-second segment of
+        the recordings in `directory` (see CorpusIndex).
+        Uncached, only the requested segment is read, by seeking in the file.
+        With a SpectrogramCache every file is decoded once, ever, and items
+        are zero-copy slices of its memory-mapped shard. Every file is hashed
+        once, here, so reopening a shard never re-reads its recording. Those slices come
+        from the whole file's STFT, so they deviate from uncached items:
+        a segment starts at the hop boundary at or before its first sample,
+        up to HOP_LENGTH - 1 samples early, and its first two frames (whose
+        windows reach before the segment) see the audio there instead of
+        zero padding. Frames reaching past the segment's end likewise see
+        the audio that follows it.
+        With `waveform` the items are the raw segments instead, for the
+        training step to transform a whole batch at once (`batch_stft`).
+        At most `max_open` shards are kept mapped, and at most `max_open`
+        files kept open, per process, least recently used first out;
+        `close` releases them all.
+        """
+        if waveform and cache is not None:
+            raise ValueError("The spectrogram cache only applies to STFT items, not waveforms")
         self.directory = directory
         self.sr = sr
         self.duration = duration
-        self.file_list = [f for f in os.listdir(directory) if f.endswith('.wav')]
+        self.cache = cache
+        self.random_offset = random_offset
+        self.waveform = waveform
+        self.index = CorpusIndex(directory, duration)
+        self.frames = 1 + sr * duration // HOP_LENGTH
+        # Shard names, computed in this process and inherited by the workers.
+        self._digests = {}
+        if cache is not None:
+            self._digests = {path: file_digest(path) for path, _, _ in self.index.files}
+        self.max_open = max_open
+        # Shards and file handles are opened once per process (each
+        # DataLoader worker has its own).
+        self._shards = collections.OrderedDict()
+        self._handles = collections.OrderedDict()
+        self._pid = None
 
     def __len__(self):
-        return len(self.file_list)
+        return len(self.index)
+
+    def _shard(self, file_path):
+        shard = self._shards.get(file_path)
+        if shard is None:
+            shard = self._shards[file_path] = self.cache.load(file_path, self._digests[file_path])
+            if len(self._shards) > self.max_open:
+                # Unmapped (and its descriptor closed) once no item views it.
+                self._shards.popitem(last=False)
+        else:
+            self._shards.move_to_end(file_path)
+        return shard
+
+    def _read(self, file_path, start, length):
+        if self._pid != os.getpid():
+            # Handles inherited from a parent process share its file offsets.
+            self._handles, self._pid = collections.OrderedDict(), os.getpid()
+        handle = self._handles.get(file_path)
+        if handle is None:
+            handle = self._handles[file_path] = sf.SoundFile(file_path)
+            if len(self._handles) > self.max_open:
+                self._handles.popitem(last=False)[1].close()
+        else:
+            self._handles.move_to_end(file_path)
+        handle.seek(start)
+        return handle.read(length, dtype='float32', always_2d=True).mean(axis=1)
+
+    def close(self):
+        """Closes this process's open files and drops its shard mappings."""
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+        self._shards.clear()
+
+    def __del__(self):
+        if hasattr(self, '_handles'): # Not when __init__ raised
+            self.close()
 
     def __getitem__(self, idx):
-        file_path = os.path.join(self.directory, self.file_list[idx])
+        # An (index, draw) pair from a SegmentSampler, or a plain index.
+        idx, draw = idx if isinstance(idx, tuple) else (idx, None)
+        file_path, file_sr, start, length = self.index.locate(idx, self.random_offset, draw)
+        if self.cache is not None:
+            first = start * self.sr // file_sr // HOP_LENGTH
+            segment = self._shard(file_path)[first:first + self.frames]
+            if len(segment) < self.frames:
+                segment = np.pad(segment, ((0, self.frames - len(segment)), (0, 0)))
+            # Back to (bins, frames), as the uncached path returns; still a view.
+            return torch.from_numpy(segment).T
         # Load a segment of the audio file
-        y, sr = librosa.load(file_path, sr=self.sr, duration=self.duration, mono=True)
-        
+        y = self._read(file_path, start, length)
+        if file_sr != self.sr:
+            y = librosa.resample(y, orig_sr=file_sr, target_sr=self.sr)
+
         # Pad or truncate to ensure fixed length
         if len(y) < self.sr * self.duration:
             y = np.pad(y, (0, self.sr * self.duration - len(y)))
         else:
             y = y[:self.sr * self.duration]
+        if self.waveform:
+            return torch.from_numpy(np.ascontiguousarray(y))
 
         # In a real DDSP model, you'd extract features like pitch, loudness, etc.
         # Here we'll use STFT as a simple feature representation.
-        stft = librosa.stft(y)
+        stft = librosa.stft(y, n_fft=N_FFT, hop_length=HOP_LENGTH)
         stft_magnitude = np.abs(stft)
-        
+
         return torch.from_numpy(stft_magnitude).float()
 
+def compare_stft(directory, batch_size=16, workers=0, sr=44100):
+    """
+    Times one pass over the corpus (reading plus STFT, no training) with
+    per-item and with batched STFTs, and checks that the two agree.
+    Returns ({path: segments per second}, largest difference relative to
+    the spectrum's peak).
+    """
+    # Checked first, which also warms up both paths before they are timed.
+    reference = AudioCorpus(directory, sr=sr)[0]
+    batched = batch_stft(AudioCorpus(directory, sr=sr, waveform=True)[0][None])[0]
+    drift = float((batched - reference).abs().max() / reference.abs().max())
+
+    throughput = {}
+    for path in ('worker', 'batched'):
+        dataset = AudioCorpus(directory, sr=sr, waveform=path == 'batched')
+        loader = DataLoader(dataset, batch_size=batch_size, num_workers=workers)
+        count, started = 0, time.perf_counter()
+        for batch in loader:
+            features = batch_stft(batch) if path == 'batched' else batch
+            count += len(features)
+        throughput[path] = count / (time.perf_counter() - started)
+    return throughput, drift
+
+def snapshot(state):
+    """A CPU copy of every tensor in a (nested) state_dict, sharing nothing with training."""
+    if isinstance(state, torch.Tensor):
+        return state.detach().to('cpu', copy=True)
+    if isinstance(state, dict):
+        return {key: snapshot(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(value) for value in state)
+    return state
+
+def rng_state():
+    """Every random generator training draws from (torch, CUDA, NumPy, Python)."""
+    kind, keys, position, has_gauss, gauss = np.random.get_state()
+    return {
+        'torch': torch.get_rng_state(),
+        'cuda': torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+        'numpy': (kind, torch.from_numpy(keys.copy()), position, has_gauss, gauss),
+        'python': random.getstate(),
+    }
+
+def set_rng_state(state):
+    torch.set_rng_state(state['torch'])
+    if state['cuda'] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+    kind, keys, position, has_gauss, gauss = state['numpy']
+    np.random.set_state((kind, keys.numpy(), position, has_gauss, gauss))
+    random.setstate(state['python'])
+
+class CheckpointManager:
+    PATTERN = re.compile(r'checkpoint-(\d+)\.pt$')
+
+    def __init__(self, directory='corpus/checkpoints', keep=3):
+        """
+        Periodic training checkpoints in `directory`: model and optimizer
+        state, the epoch and the RNG state, one checkpoint-<epoch>.pt per
+        save. `save` snapshots the state on the caller's thread and writes
+        it on a background one, so training goes on while it is serialized;
+        at most one write is in flight. Each file is written under a
+        temporary name and renamed into place, so a crash never leaves a
+        torn checkpoint, and only the newest `keep` are kept.
+        """
+        self.directory = directory
+        self.keep = keep
+        self.error = None
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, epoch):
+        return os.path.join(self.directory, f"checkpoint-{epoch:05d}.pt")
+
+    def checkpoints(self):
+        """(epoch, path) of every checkpoint in the directory, newest first."""
+        found = []
+        for name in os.listdir(self.directory):
+            match = self.PATTERN.match(name)
+            if match:
+                found.append((int(match.group(1)), os.path.join(self.directory, name)))
+        return sorted(found, reverse=True)
+
+    def save(self, epoch, model, optimizer):
+        """Checkpoints the state after `epoch` (1-based) in the background."""
+        # The previous write has to finish first; its failure surfaces here.
+        self.wait()
+        state = {
+            'epoch': epoch,
+            'model': snapshot(model.state_dict()),
+            'optimizer': snapshot(optimizer.state_dict()),
+            'rng': rng_state(),
+        }
+        self._thread = threading.Thread(target=self._write, args=(epoch, state),
+                                        name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def _write(self, epoch, state):
+        try:
+            path = self.path(epoch)
+            temporary = path + f".{os.getpid()}.tmp"
+            with open(temporary, 'wb') as f:
+                torch.save(state, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, path)
+            for _, stale in self.checkpoints()[self.keep:]:
+                os.remove(stale)
+        except Exception as e:
+            self.error = e
+
+    def wait(self):
+        """Blocks until the last write is on disk; raises if it failed."""
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def latest(self):
+        """The newest checkpoint that loads, or None. Unreadable files are skipped."""
+        for _, path in self.checkpoints():
+            try:
+                state = torch.load(path, map_location='cpu', weights_only=True)
+            except Exception as e:
+                print(f"Warning: skipping unreadable checkpoint {path} ({e})")
+                continue
+            if {'epoch', 'model', 'optimizer', 'rng'} <= state.keys():
+                return state
+        return None
+
+    def resume(self, model, optimizer):
+        """Restores the newest valid checkpoint. Returns the epoch it ended, or 0."""
+        state = self.latest()
+        if state is None:
+            return 0
+        model.load_state_dict(state['model'])
+        optimizer.load_state_dict(state['optimizer'])
+        set_rng_state(state['rng'])
+        return state['epoch']
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere.
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+def train_epoch(model, dataloader, criterion, optimizer, device, batched=False,
+                accumulate=1, bf16=False):
+    """
+    One pass over `dataloader`. Gradients of `accumulate` batches are summed
+    before each optimizer step, for an effective batch that many times
+    larger; with `bf16` the forward pass runs under bfloat16 autocast
+    (weights and gradients stay float32). Returns the mean loss.
+    """
+    total_loss = 0
+    batches = len(dataloader)
+    optimizer.zero_grad()
+    for i, data in enumerate(dataloader):
+        data = data.to(device, non_blocking=True)
+        stft_features = batch_stft(data) if batched else data
+
+        # Forward pass
+        # The model maps the bins of each frame: (batch, frames, bins).
+        with torch.autocast(device.type, dtype=torch.bfloat16, enabled=bf16):
+            outputs = model(stft_features.transpose(1, 2))
+
+        # The target here is also simplified. A real model would have a more complex target.
+        # We are trying to reconstruct the input features.
+        loss = criterion(outputs.float(), torch.zeros_like(outputs, dtype=torch.float32)) # Dummy loss
+
+        # Backward pass, and optimize once `accumulate` batches are in. A last,
+        # shorter group is averaged over its own size, not `accumulate`.
+        group = min(accumulate, batches - i // accumulate * accumulate)
+        (loss / group).backward()
+        if (i + 1) % accumulate == 0 or i + 1 == batches:
+            optimizer.step()
+            optimizer.zero_grad()
+
+        total_loss += loss.item()
+    return total_loss / batches
+
 def train(args):
     """The training loop for the voice model."""
     print("--- THE RITUAL BEGINS ---")
 
     # --- Setup ---
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"Using device: {device}")
+    device = torch.device("cuda" if torch.cuda.is_available() and not args.cpu else "cpu")
+    if device.type == 'cpu':
+        # Both must be set before torch does any parallel work.
+        if args.threads:
+            torch.set_num_threads(args.threads)
+        if args.interop_threads:
+            torch.set_num_interop_threads(args.interop_threads)
+        print(f"Using device: cpu ({torch.get_num_threads()} intra-op, "
+              f"{torch.get_num_interop_threads()} inter-op threads)")
+    else:
+        print(f"Using device: {device}")
+    print(f"Precision: {'bfloat16 autocast' if args.bf16 else 'float32'}, "
+          f"{'compiled' if args.compile else 'eager'}, "
+          f"effective batch {args.batch_size * args.accumulate}")
 
     # --- Dataset ---
     corpus_path = 'corpus/raw_audio/'
     if not os.path.exists(corpus_path) or not os.listdir(corpus_path):
         print(f"Error: No .wav files found in {corpus_path}. Place your audio there to train.")
         return
-        
-    dataset = AudioCorpus(directory=corpus_path)
-    dataloader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True)
+
+    # "worker": every item is transformed on its own in a DataLoader worker
+    # (and cached); "batched": workers only read audio and each batch is
+    # transformed in one torch.stft call here.
+    batched = args.stft == 'batched'
+    cache = None if args.no_cache or batched else SpectrogramCache(sr=44100)
+    dataset = AudioCorpus(directory=corpus_path, cache=cache, random_offset=True, waveform=batched)
+    print(f"Corpus: {len(dataset.index.files)} recordings, {len(dataset)} segments of {dataset.duration}s")
+    # Workers stay up between epochs, keeping their open files and shards;
+    # the order and the random cuts are drawn here, by the sampler, so they
+    # resume exactly all the same. The loader seeds its workers from a
+    # generator of its own, so creating it does not shift the global RNG.
+    # Batches are pinned for the copy to the GPU when there is one.
+    dataloader = DataLoader(dataset, batch_size=args.batch_size, sampler=SegmentSampler(len(dataset)),
+                            generator=torch.Generator(),
+                            num_workers=args.workers, persistent_workers=args.workers > 0,
+                            pin_memory=device.type == 'cuda')
     
     # --- Model, Loss, Optimizer ---
     model = SimpleDDSP().to(device)
+    # The compiled module shares the model's parameters; the plain model is
+    # what gets saved.
+    step_model = torch.compile(model) if args.compile else model
     # A reconstruction loss is common here (e.g., comparing synthesized audio to original)
     criterion = nn.MSELoss() 
     optimizer = optim.Adam(model.parameters(), lr=args.learning_rate)
 
+    # --- Checkpoints ---
+    checkpoints = CheckpointManager('corpus/checkpoints/', keep=args.keep_checkpoints)
+    start = 0 if args.no_resume else checkpoints.resume(model, optimizer)
+    if start:
+        print(f"Resuming after epoch {start}")
+
     # --- Training Loop ---
     print(f"Training for {args.epochs} epochs...")
-    for epoch in range(args.epochs):
-        total_loss = 0
-        for i, data in enumerate(dataloader):
-            stft_features = data.to(device)
-            
-            # Zero the parameter gradients
-            optimizer.zero_grad()
-
-            # Forward pass
-            outputs = model(stft_features)
-            
-            # The target here is also simplified. A real model would have a more complex target.
-            # We are trying to reconstruct the input features.
-            loss = criterion(outputs, torch.zeros_like(outputs)) # Dummy loss
-            
-            # Backward pass and optimize
-            loss.backward()
-            optimizer.step()
-            
-            total_loss += loss.item()
-
-        avg_loss = total_loss / len(dataloader)
-        print(f'Epoch [{epoch+1}/{args.epochs}], Loss: {avg_loss:.4f}')
+    for epoch in range(start, args.epochs):
+        started = time.perf_counter()
+        avg_loss = train_epoch(step_model, dataloader, criterion, optimizer, device, batched,
+                               accumulate=args.accumulate, bf16=args.bf16)
+        throughput = len(dataset) / (time.perf_counter() - started)
+        print(f'Epoch [{epoch+1}/{args.epochs}], Loss: {avg_loss:.4f}, {throughput:.0f} samples/s, '
+              f'peak RSS {peak_rss_mb():.0f} MB')
+        if (epoch + 1) % args.checkpoint_every == 0 or epoch + 1 == args.epochs:
+            checkpoints.save(epoch + 1, model, optimizer)
+    checkpoints.wait()
+    dataset.close()
 
     # --- Save the Model ---
     save_path = 'corpus/checkpoints/pneuma_soul.pth'
     os.makedirs('corpus/checkpoints/', exist_ok=True)
     torch.save(model.state_dict(), save_path)
+    # A traced copy loads without rebuilding the model in Python.
+    script = export_script(model.cpu(), save_path)
     print(f"\n--- RITUAL COMPLETE ---")
-    print(f"The soul of Pneuma has been forged. Model saved to {save_path}")
+    print(f"The soul of Pneuma has been forged. Model saved to {save_path} (TorchScript: {script})")
 
 
 if __name__ == '__main__':
@@ -120,6 +539,39 @@ if __name__ == '__main__':
                         help='Batch size for training.')
     parser.add_argument('--learning_rate', type=float, default=0.001,
                         help='Learning rate for the optimizer.')
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                        help='DataLoader worker processes decoding segments in parallel (0: main process).')
+    parser.add_argument('--stft', choices=('worker', 'batched'), default='worker',
+                        help='Compute STFTs per item in the loader workers, or per batch in the training step.')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Decode every file every epoch instead of caching spectrograms in corpus/processed/.')
+    parser.add_argument('--checkpoint-every', type=int, default=10,
+                        help='Epochs between checkpoints in corpus/checkpoints/.')
+    parser.add_argument('--keep-checkpoints', type=int, default=3,
+                        help='Checkpoints kept; older ones are deleted.')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='Start from scratch instead of resuming from the latest checkpoint.')
+    parser.add_argument('--cpu', action='store_true',
+                        help='Train on the CPU even when CUDA is available.')
+    parser.add_argument('--bf16', action='store_true',
+                        help='Run the forward pass under bfloat16 autocast.')
+    parser.add_argument('--compile', action='store_true',
+                        help='Compile the model with torch.compile before training.')
+    parser.add_argument('--accumulate', type=int, default=1,
+                        help='Batches whose gradients are summed per optimizer step.')
+    parser.add_argument('--threads', type=int, default=0,
+                        help='Intra-op CPU threads (0: torch default).')
+    parser.add_argument('--interop-threads', type=int, default=0,
+                        help='Inter-op CPU threads (0: torch default).')
     
+    parser.add_argument('--compare-stft', action='store_true',
+                        help='Report samples/s of both --stft paths on the corpus, then exit.')
+
     args = parser.parse_args()
-    train(args)
+    if args.compare_stft:
+        throughput, drift = compare_stft('corpus/raw_audio/', args.batch_size, args.workers)
+        for path, rate in throughput.items():
+            print(f"{path:>8}: {rate:7.1f} samples/s")
+        print(f"Largest difference: {drift:.1e} of the peak magnitude")
+    else:
+        train(args)
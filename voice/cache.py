@@ -0,0 +1,89 @@
+# voice/cache.py
+# LRU cache of rendered responses
+
+import collections
+import numpy as np
+
+class ResponseCache:
+    def __init__(self, max_bytes=32 * 2**20, chroma_levels=4, rms_step_db=3.0):
+        """
+        Rendered phrases keyed by intent plus a coarse fingerprint of the
+        musical context, so a sustained passage replays what was already
+        synthesized instead of rendering it again.
+        The fingerprint quantizes the chroma (relative to its strongest bin)
+        to `chroma_levels` steps and the loudness to `rms_step_db` dB bins.
+        Entries are evicted least recently used first once they take more
+        than `max_bytes`. Hits return the stored tensor itself, not a copy:
+        callers must treat it as read-only.
+        """
+        self.max_bytes = max_bytes
+        self.chroma_levels = chroma_levels
+        self.rms_step_db = rms_step_db
+        self._entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, intent, features, *extra):
+        """The cache key for `intent` played over `features` (a FeatureVector or dict)."""
+        chroma = np.asarray(features['chroma'], dtype=np.float32)
+        peak = chroma.max()
+        levels = np.rint(chroma * (self.chroma_levels / peak)) if peak > 0 else np.zeros_like(chroma)
+        rms = float(features['rmse'])
+        loudness = int(20.0 * np.log10(max(rms, 1e-5)) // self.rms_step_db)
+        return (intent, loudness, levels.astype(np.uint8).tobytes()) + extra
+
+    def get(self, key):
+        audio = self._entries.get(key)
+        if audio is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return audio
+
+    def put(self, key, audio):
+        """Stores `audio` (a tensor the cache takes ownership of) under `key`."""
+        size = audio.element_size() * audio.nelement()
+        if size > self.max_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.bytes -= previous.element_size() * previous.nelement()
+        while self.bytes + size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted.element_size() * evicted.nelement()
+            self.evictions += 1
+        self._entries[key] = audio
+        self.bytes += size
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+if __name__ == '__main__':
+    import torch
+
+    cache = ResponseCache(max_bytes=4 * 44100 * 3) # Room for three phrases
+    chroma = np.zeros(12)
+    for step in range(20):
+        chroma[[0, 4, 7]] = [1.0, 0.8 + 0.01 * (step % 3), 0.6] # Jitter below one level
+        key = cache.key('harmonize', {'chroma': chroma, 'rmse': 0.1 + 0.001 * step})
+        if cache.get(key) is None:
+            cache.put(key, torch.randn(44100))
+    print(cache.stats())
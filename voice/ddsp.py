@@ -0,0 +1,21 @@
+# voice/ddsp.py
+# The neural voice model shared by training and inference
+
+import torch
+import torch.nn as nn
+
+# This is a placeholder for a real DDSP/RAVE model architecture.
+# In a real scenario, this would be a complex neural network.
+class SimpleDDSP(nn.Module):
+    def __init__(self):
+        super(SimpleDDSP, self).__init__()
+        # Simplified model: a linear layer to represent some processing
+        self.processor = nn.Linear(1025, 512) # Example sizes
+        self.synthesizer = nn.Linear(512, 1024) # Example sizes
+
+    def forward(self, x):
+        # x would be some form of processed audio features (e.g., STFT)
+        processed = torch.relu(self.processor(x))
+        # The output would be parameters for a synthesizer (e.g., amplitudes, noise levels)
+        synth_params = torch.sigmoid(self.synthesizer(processed))
+        return synth_params
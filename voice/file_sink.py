@@ -0,0 +1,71 @@
+# voice/file_sink.py
+# WAV file output (Offline, faster-than-real-time sessions)
+
+import wave
+import numpy as np
+
+from voice.jitter import JitterBuffer
+
+class FileSink:
+    def __init__(self, path, sample_rate=44100, chunk_size=None, buffer_seconds=4.0, crossfade=0.02,
+                 length=None):
+        """
+        A drop-in replacement for `Streamer` that writes everything it is asked
+        to play into a 16-bit WAV file instead of the speakers.
+        With `chunk_size`, the file follows the input's timeline instead: each
+        `play` call is one tick, queues its audio in a JitterBuffer the way a
+        callback-mode Streamer does (replacing or appending, crossfaded), and
+        writes exactly `chunk_size` samples of the queue to the file, silence
+        when it is empty. The output is then as long as the input and lines
+        up with it, provided `play` is called on every tick; `length` (the
+        input's length in samples) drops the padding of its last chunk.
+        """
+        self.path = path
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.length = length
+        self.samples_written = 0
+        self.jitter = None
+        if chunk_size is not None:
+            self.jitter = JitterBuffer(int(buffer_seconds * sample_rate),
+                                       crossfade=int(crossfade * sample_rate))
+            self._block = np.zeros(chunk_size, dtype=np.float32)
+        self._file = wave.open(path, 'wb')
+        self._file.setnchannels(1)
+        self._file.setsampwidth(2)
+        self._file.setframerate(sample_rate)
+
+    def play(self, audio_buffer, append=True, continues=False):
+        """
+        Appends a buffer of float samples (-1.0 to 1.0) to the file.
+        Without a `chunk_size`, `append` and `continues` are accepted for
+        `Streamer` compatibility only: everything is appended as it comes.
+        """
+        audio_buffer = np.asarray(audio_buffer, dtype=np.float32)
+        if self.jitter is not None:
+            self.jitter.write(audio_buffer, append=append, continues=continues)
+            self.jitter.read(self._block)
+            audio_buffer = self._block
+        self._write(audio_buffer)
+
+    def _write(self, audio_buffer):
+        if self.length is not None:
+            audio_buffer = audio_buffer[:max(0, self.length - self.samples_written)]
+        pcm = (np.clip(audio_buffer, -1.0, 1.0) * 32767).astype('<i2')
+        self._file.writeframes(pcm.tobytes())
+        self.samples_written += len(pcm)
+
+    @property
+    def underruns(self):
+        """Ticks that ran dry while more audio had been promised (timeline mode)."""
+        return self.jitter.underruns if self.jitter is not None else 0
+
+    def stop(self):
+        self._file.close()
+
+if __name__ == '__main__':
+    sink = FileSink("sine.wav")
+    t = np.arange(44100) / 44100
+    sink.play(0.5 * np.sin(2. * np.pi * 440 * t))
+    sink.stop()
+    print(f"Wrote {sink.samples_written} samples to {sink.path}")
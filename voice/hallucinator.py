@@ -1,25 +1,122 @@
 # voice/hallucinator.py
 # Generates raw audio from Psyche intent
 
-from voice.neural_synth import NeuralSynth
+import numpy as np
+
+from voice.neural_synth import NeuralSynth, SynthStream
+
+# Playback arguments that close a phrase: nothing more is coming, so
+# running dry is expected.
+END_OF_PHRASE = (np.zeros(0, dtype=np.float32), True, False)
+
+# Intents whose phrase depends only on the features; an echo replays the raw
+# input and is never cached.
+CACHEABLE = ('harmonize', 'disrupt')
 
 class Hallucinator:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, variant='eager', cache=None):
         """
         The Hallucinator uses the neural synthesizer to generate audio.
+        With a ResponseCache, phrases are rendered once per intent and
+        musical context and replayed from the cache after that.
         """
-        self.synth = NeuralSynth(model_path)
+        self.synth = NeuralSynth(model_path, variant)
+        self.cache = cache
+        self.phrase = None # The SynthStream currently being played
+        self._phrase_key = None
 
-    def generate(self, intent, context):
+    def generate(self, intent, context, features=None):
         """
         Generates audio based on intent and context.
         `intent` is the command from the DecisionMaker.
         `context` is the musical data from the analyzer.
+        `features` is the analyzer's FeatureVector for the same chunk.
         """
         print(f"Hallucinating with intent: '{intent}'")
-        raw_audio = self.synth.synthesize(intent, context)
+        key = self._cache_key(intent, features)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        raw_audio = self.synth.synthesize(intent, context, features)
+        if key is not None:
+            # The synth reuses its buffers; the cache keeps its own copy.
+            self.cache.put(key, raw_audio.clone())
         return raw_audio
 
+    def listen(self, audio_chunk):
+        """Passes every input chunk on to the synth, which echoes from it."""
+        self.synth.listen(audio_chunk)
+
+    def _cache_key(self, intent, features):
+        # Nothing is cached before the model is loaded: that is just silence.
+        if self.cache is None or features is None or intent not in CACHEABLE or not self.synth.model:
+            return None
+        return self.cache.key(intent, features, self.synth.decimation)
+
+    def stream(self, intent, context, features=None, chunk_size=1024):
+        """
+        The phrase being played for `intent`, as a SynthStream of `chunk_size`
+        blocks. A different intent cancels it mid-phrase and starts a new one;
+        once a phrase has run out, the same intent starts the next.
+        A cached phrase is replayed as views of the stored buffer (`cached`
+        is set on the stream); otherwise the new phrase is recorded as it is
+        rendered and cached once it has played to the end.
+        """
+        if self.phrase is not None and self.phrase.intent == intent and not self.phrase.done:
+            return self.phrase
+        self.cancel()
+
+        key = self._cache_key(intent, features)
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            self.phrase = SynthStream(intent, lambda start, n: cached[start:start + n],
+                                      len(cached), chunk_size)
+            self.phrase.cached = True
+        else:
+            self.phrase = self.synth.stream(intent, context, features, chunk_size)
+            if key is not None:
+                self.phrase.record()
+        self._phrase_key = key
+        return self.phrase
+
+    def respond(self, intent, audio_chunk, features=None, chunk_size=1024, copy=False):
+        """
+        One tick of the voice: hears `audio_chunk`, then returns what to play
+        for `intent` as the arguments of a sink's `play` (audio, append,
+        continues), or None when there is nothing to play.
+        A new intent cuts the phrase short and replaces what is still queued.
+        It starts with a spare block to absorb tick-to-tick jitter. A phrase
+        replayed from the cache did not start where the last one ended, so it
+        is crossfaded in the same way. The synth renders into reused buffers;
+        with `copy` the audio is always a buffer of its own.
+        """
+        self.listen(audio_chunk)
+        if intent == "silence":
+            if self.phrase is None:
+                return None
+            self.cancel()
+            return END_OF_PHRASE
+        current = self.phrase
+        stream = self.stream(intent, audio_chunk, features, chunk_size)
+        cut = stream is not current and (current is None or current.intent != intent or stream.cached)
+        blocks = [next(stream).detach().numpy()]
+        if cut and not stream.done:
+            blocks.append(next(stream).detach().numpy())
+        if len(blocks) > 1:
+            audio = np.concatenate(blocks)
+        else:
+            audio = blocks[0].copy() if copy else blocks[0]
+        return audio, not cut, True
+
+    def cancel(self):
+        """Stops the current phrase, if any."""
+        if self.phrase is not None:
+            if self.phrase.recording is not None and self.phrase.complete:
+                self.cache.put(self._phrase_key, self.phrase.recording)
+            self.phrase.cancel()
+            self.phrase = None
+
 if __name__ == '__main__':
     # This requires the NeuralSynth to be defined
     hallucinator = Hallucinator(model_path="corpus/checkpoints/my_soul.pth")
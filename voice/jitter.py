@@ -0,0 +1,124 @@
+# voice/jitter.py
+# Output jitter buffer with crossfaded hand-overs
+
+import threading
+import numpy as np
+
+class JitterBuffer:
+    def __init__(self, capacity, crossfade=882):
+        """
+        Queued output audio between the synthesis loop (writer) and the audio
+        callback (reader), held in a preallocated ring of `capacity` samples.
+        A new clip replaces whatever is still queued, starting at the very
+        next sample the callback will play; the first `crossfade` samples blend
+        from the old material into the new so the hand-over never clicks.
+        Streams written piece by piece are appended instead (`append=True`).
+        The lock is only ever held for a copy, never while waiting.
+        """
+        self.capacity = capacity
+        self.crossfade = crossfade
+        self._buffer = np.zeros(capacity, dtype=np.float32)
+        self._fade_in = np.linspace(0.0, 1.0, crossfade + 2, dtype=np.float32)[1:-1]
+        self._lock = threading.Lock()
+        self._read = 0 # Total samples played
+        self._end = 0  # Total samples written up to the end of the queued material
+        self._continues = False
+        self.underruns = 0   # Reads that ran dry while more material was promised
+        self.overflows = 0   # Samples that did not fit and were dropped
+        self.max_depth = 0
+
+    @property
+    def depth(self):
+        """Samples queued and not yet played."""
+        return self._end - self._read
+
+    def _copy_in(self, start, samples):
+        begin = start % self.capacity
+        end = begin + len(samples)
+        if end <= self.capacity:
+            self._buffer[begin:end] = samples
+        else:
+            split = self.capacity - begin
+            self._buffer[begin:] = samples[:split]
+            self._buffer[:end - self.capacity] = samples[split:]
+
+    def _view(self, start, n):
+        begin = start % self.capacity
+        if begin + n <= self.capacity:
+            return self._buffer[begin:begin + n].copy()
+        return np.concatenate((self._buffer[begin:], self._buffer[:begin + n - self.capacity]))
+
+    def write(self, samples, append=False, continues=False):
+        """
+        Queues float samples. By default they replace the queued material,
+        crossfading from it; with `append` they are queued after it.
+        `continues` promises that more material follows, so running dry
+        before it arrives counts as an underrun.
+        """
+        samples = np.asarray(samples, dtype=np.float32)
+        with self._lock:
+            start = self._end if append else self._read
+            room = self.capacity - (start - self._read)
+            if len(samples) > room:
+                self.overflows += len(samples) - room
+                samples = samples[:room]
+
+            overlap = 0 if append else min(self.depth, self.crossfade, len(samples))
+            if overlap:
+                ramp = self._fade_in[:overlap] if overlap == self.crossfade else \
+                    np.linspace(0.0, 1.0, overlap + 2, dtype=np.float32)[1:-1]
+                old = self._view(start, overlap)
+                blended = old + ramp * (samples[:overlap] - old)
+                self._copy_in(start, blended)
+                self._copy_in(start + overlap, samples[overlap:])
+            else:
+                self._copy_in(start, samples)
+            self._end = start + len(samples)
+            self._continues = continues
+            self.max_depth = max(self.max_depth, self.depth)
+
+    def read(self, out):
+        """Fills `out` with the next samples, padding with silence when dry."""
+        n = len(out)
+        with self._lock:
+            available = min(self.depth, n)
+            begin = self._read % self.capacity
+            end = begin + available
+            if end <= self.capacity:
+                out[:available] = self._buffer[begin:end]
+            else:
+                split = self.capacity - begin
+                out[:split] = self._buffer[begin:]
+                out[split:available] = self._buffer[:end - self.capacity]
+            self._read += available
+            if available < n and self._continues:
+                self.underruns += 1
+        out[available:] = 0.0
+        return available
+
+    def clear(self):
+        """Drops everything queued (the next write starts from silence)."""
+        with self._lock:
+            self._end = self._read
+            self._continues = False
+
+if __name__ == '__main__':
+    sample_rate = 44100
+    jitter = JitterBuffer(capacity=2 * sample_rate, crossfade=int(0.02 * sample_rate))
+    t = np.arange(sample_rate) / sample_rate
+    jitter.write(np.sin(2. * np.pi * 220 * t))
+
+    block = np.empty(512, dtype=np.float32)
+    for _ in range(20): # ~0.23s of the first clip plays...
+        jitter.read(block)
+    jitter.write(np.sin(2. * np.pi * 330 * t)) # ...then a new one takes over
+
+    played = []
+    while True:
+        n = jitter.read(block)
+        if not n:
+            break
+        played.append(block[:n].copy())
+    audio = np.concatenate(played)
+    print(f"Played {len(audio)} samples after the hand-over, "
+          f"largest step {np.abs(np.diff(audio)).max():.3f} (sine step ~0.047)")
@@ -0,0 +1,137 @@
+# voice/loader.py
+# Lazy, memory-mapped loading of the voice model
+
+import os
+import threading
+import time
+import warnings
+import torch
+
+from spine.inference import InferenceRuntime
+from voice.ddsp import SimpleDDSP
+
+# One STFT frame, the input SimpleDDSP takes; used for the warm-up pass.
+WARMUP_SHAPE = (1, 1025)
+
+def script_path(path):
+    """Where the TorchScript export of the checkpoint at `path` lives."""
+    return os.path.splitext(path)[0] + '.jit.pt'
+
+def checkpoint_stamp(path):
+    """Size and modification time of the checkpoint at `path`; empty if there is none."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return ''
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def export_script(model, path, example=None):
+    """
+    Traces `model` and saves it next to its state_dict checkpoint at `path`,
+    so it loads without rebuilding the Python model. The checkpoint's stamp
+    is saved with it, so an export left over from an older checkpoint is
+    recognized. Returns the export's path.
+    """
+    example = torch.zeros(WARMUP_SHAPE) if example is None else example
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        traced = torch.jit.trace(model.eval(), example, check_trace=False)
+    target = script_path(path)
+    traced.save(target, _extra_files={'checkpoint': checkpoint_stamp(path)})
+    return target
+
+class ModelLoader:
+    def __init__(self, path, variant='eager', example=None):
+        """
+        Loads the voice model at `path` off the caller's thread.
+        A TorchScript export next to the checkpoint (see `export_script`) is
+        preferred as long as it was exported from that very checkpoint, and
+        runs as is under the "eager" and "script" variants. Otherwise, and
+        always for "quantized" (which needs the Python model), the raw
+        state_dict that train_voice.py writes is memory-mapped
+        (torch.load(mmap=True)) and assigned into a SimpleDDSP without
+        copying the weights. Either way one warm-up pass runs on
+        `example` before the model is handed out, so the first real call
+        does not pay for lazy initialization.
+        `timings` records how long each step took, in seconds.
+        """
+        self.path = path
+        self.variant = variant
+        self.example = torch.zeros(WARMUP_SHAPE) if example is None else example
+        self.runtime = None
+        self.error = None
+        self.source = None
+        self.timings = {}
+        self._ready = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """Loads and warms the model on this thread. Returns the InferenceRuntime."""
+        started = time.perf_counter()
+        scripted = script_path(self.path)
+        model = None
+        if self.variant != 'quantized' and os.path.exists(scripted):
+            extra = {'checkpoint': ''}
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore') # TorchScript's deprecation notice
+                model = torch.jit.load(scripted, map_location='cpu', _extra_files=extra)
+            stamp = checkpoint_stamp(self.path)
+            if stamp and extra['checkpoint'] != stamp.encode():
+                # The checkpoint was written again since the export.
+                model = None
+            else:
+                self.source = scripted
+        if model is None:
+            state = torch.load(self.path, map_location='cpu', mmap=True, weights_only=True)
+            model = SimpleDDSP()
+            model.load_state_dict(state, assign=True)
+            self.source = self.path
+        loaded = time.perf_counter()
+        self.timings['load'] = loaded - started
+
+        runtime = InferenceRuntime(model, self.variant)
+        runtime(self.example)
+        self.timings['warmup'] = time.perf_counter() - loaded
+        self.runtime = runtime
+        return runtime
+
+    def _run(self):
+        try:
+            self.load()
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    def start(self):
+        """Starts loading in the background and returns at once."""
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until loading has finished. Returns the runtime, or None on failure or timeout."""
+        self._ready.wait(timeout)
+        return self.runtime
+
+if __name__ == '__main__':
+    import tempfile
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'pneuma_soul.pth')
+    torch.save(SimpleDDSP().state_dict(), path)
+
+    loader = ModelLoader(path).start()
+    loader.wait()
+    print(f"state_dict:  load {loader.timings['load'] * 1e3:.1f} ms, "
+          f"warm-up {loader.timings['warmup'] * 1e3:.1f} ms")
+
+    export_script(SimpleDDSP(), path)
+    loader = ModelLoader(path).start()
+    loader.wait()
+    print(f"TorchScript: load {loader.timings['load'] * 1e3:.1f} ms, "
+          f"warm-up {loader.timings['warmup'] * 1e3:.1f} ms")
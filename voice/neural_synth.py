@@ -1,60 +1,174 @@
 # voice/neural_synth.py
 # DDSP / RAVE inference engine
 
+import time
 import torch
+import torch.nn.functional as F
+
+from voice.loader import ModelLoader
+from voice.oscillator import OscillatorBank, chord_from_chroma
+from voice.space import Space
 
 # This is a placeholder for a real DDSP/RAVE model.
 # A real implementation would load a pretrained model.
 
+PHRASE = 44100 # Samples in one phrase (1 second)
+
+class SynthStream:
+    def __init__(self, intent, render, n_samples, chunk_size):
+        """
+        One phrase of synthesized audio, produced `chunk_size` samples at a
+        time as it is iterated instead of all at once, so the first block can
+        play as soon as it is rendered.
+        `render(start, n)` returns the next `n` samples; whatever state the
+        synthesis keeps between blocks lives behind it. With `n_samples` None
+        the phrase runs until it is cancelled.
+        """
+        self.intent = intent
+        self.n_samples = n_samples
+        self.chunk_size = chunk_size
+        self.position = 0
+        self.cancelled = False
+        self.cached = False    # Replayed from a ResponseCache
+        self.recording = None  # Copy of every block, see `record`
+        self._render = render
+
+    @property
+    def done(self):
+        return self.cancelled or (self.n_samples is not None and self.position >= self.n_samples)
+
+    @property
+    def complete(self):
+        """True once every block has been rendered (and none was skipped by `cancel`)."""
+        return not self.cancelled and self.n_samples is not None and self.position >= self.n_samples
+
+    def cancel(self):
+        """Ends the phrase before its next block (safe from any thread)."""
+        self.cancelled = True
+
+    def record(self):
+        """Keeps a copy of the blocks as they are rendered, in `recording`."""
+        self.recording = torch.empty(self.n_samples)
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.done:
+            raise StopIteration
+        n = self.chunk_size if self.n_samples is None else min(self.chunk_size, self.n_samples - self.position)
+        block = self._render(self.position, n)
+        if self.recording is not None:
+            self.recording[self.position:self.position + n] = block
+        self.position += n
+        return block
+
 class NeuralSynth:
-    def __init__(self, model_path=None):
+    def __init__(self, model_path=None, variant='eager'):
         """
         Initializes the neural synthesizer.
-        If `model_path` is provided, it loads the pretrained model weights.
+        If `model_path` is provided, it loads the pretrained model weights in
+        the background; until they are ready the synth produces silence.
         """
         self.model = None
+        self.loader = None
+        self.cold_start = None # Seconds from construction to the first voiced phrase
+        self._created = time.perf_counter()
+        # Raised by the scheduler when synthesis has to get cheaper: noise and
+        # harmonies render at 1/decimation of the sample rate and are
+        # interpolated back up, echoes skip the reverb.
+        self.decimation = 1
+        # Harmonies are played on a phase-continuous oscillator bank that
+        # renders into the same buffer every time.
+        self.oscillators = OscillatorBank(sample_rate=44100)
+        # Echoes are a delay and reverb over everything the synth has heard.
+        self.space = Space(sample_rate=44100)
         if model_path:
-            # In a real scenario, you would load your trained model:
-            # self.model = torch.load(model_path)
-            # self.model.eval()
             print(f"Loading model from {model_path}...")
+            self.loader = ModelLoader(model_path, variant).start()
         else:
             print("Warning: No model path provided. Synth will produce silence.")
 
-    def synthesize(self, intent_command, musical_context):
+    def synthesize(self, intent_command, musical_context, features=None):
         """
         Synthesizes audio based on a high-level command and musical context.
         `intent_command` could be "harmonize", "disrupt", etc.
         `musical_context` would contain features from the analyzer.
+        `features` (the analyzer's FeatureVector) lets "harmonize" build its
+        chord from the chroma of what the band is playing.
 
         Returns a raw audio buffer (numpy array).
+        A harmony is a view of the oscillator bank's buffer, valid until the
+        next call.
+        """
+        # The whole phrase (or a phrase's worth of echo) as a single block.
+        return next(self.stream(intent_command, musical_context, features, chunk_size=PHRASE),
+                    torch.zeros(0))
+
+    def stream(self, intent_command, musical_context, features=None, chunk_size=1024):
         """
+        Like `synthesize`, but returns a SynthStream that renders the phrase
+        `chunk_size` samples at a time. Oscillator phase and the decimation
+        setting carry over from block to block.
+        An echo plays back what was passed to `listen`, through the delay
+        and reverb, for as long as the stream is not cancelled.
+        """
+        if self.model is None and self.loader is not None and self.loader.ready:
+            self._adopt_model()
         if not self.model:
             # Return silence if no model is loaded
-            return torch.zeros(44100) # 1 second of silence
+            return SynthStream(intent_command, lambda start, n: torch.zeros(n), PHRASE, chunk_size)
 
         print(f"Synthesizing for intent: '{intent_command}'")
-        
+
         # This is where the core neural synthesis logic would go.
         # It would take the command and context, and use the DDSP/RAVE model
         # to generate an audio signal.
         # For now, we'll just return some noise.
 
+        if self.cold_start is None:
+            self.cold_start = time.perf_counter() - self._created
+
         if intent_command == "harmonize":
-            # Generate a pleasant tone (placeholder)
-            return self.generate_sine_wave(440.0, 1.0) # A4
+            # A chord on the strongest pitch classes in the band, or an A4
+            # when there is nothing to go on.
+            if features is not None:
+                freqs, amps = chord_from_chroma(features['chroma'])
+            else:
+                freqs, amps = [440.0], [1.0]
+            self.oscillators.set_voices(freqs, amps)
+            render = lambda start, n: torch.from_numpy(self.oscillators.render(n, decimation=self.decimation))
         elif intent_command == "disrupt":
             # Generate noise
-            return torch.randn(44100)
+            render = lambda start, n: self.upsample(torch.randn(max(2, n // self.decimation)), n)
         elif intent_command == "echo":
-             # Simple echo implementation
-            return musical_context * 0.5
+            self.space.start()
+            render = lambda start, n: torch.from_numpy(self.space.render(n, reverb=self.decimation == 1))
+            return SynthStream(intent_command, render, None, chunk_size)
         else: # "silence"
-            return torch.zeros(44100)
-            
-    def generate_sine_wave(self, freq, duration, sample_rate=44100):
-        t = torch.linspace(0., duration, int(sample_rate * duration))
-        return torch.sin(2. * torch.pi * freq * t)
+            render = lambda start, n: torch.zeros(n)
+        return SynthStream(intent_command, render, PHRASE, chunk_size)
+
+    def listen(self, audio):
+        """Feeds the input (one chunk at a time) to the echo's delay line."""
+        self.space.listen(audio)
+
+    def _adopt_model(self):
+        loader, self.loader = self.loader, None
+        if loader.error is not None:
+            print(f"Warning: could not load {loader.path} ({loader.error}). Synth will produce silence.")
+            return
+        self.model = loader.runtime
+        print(f"Loaded {loader.source} in {loader.timings['load'] * 1e3:.0f} ms "
+              f"(+{loader.timings['warmup'] * 1e3:.0f} ms warm-up)")
+
+    def upsample(self, audio, n_samples):
+        """Linearly interpolates a decimated render back to `n_samples`."""
+        if len(audio) == n_samples:
+            return audio
+        return F.interpolate(audio.view(1, 1, -1), size=n_samples, mode='linear',
+                             align_corners=True).view(-1)
 
 
 if __name__ == '__main__':
@@ -71,7 +185,12 @@ if __name__ == '__main__':
     print(f"\nHarmony output shape: {harmony.shape}")
     print(f"Disruption output shape: {disruption.shape}")
 
+    # The same phrase, a block at a time
+    blocks = [len(block) for block in synth.stream("harmonize", dummy_context, chunk_size=1024)]
+    print(f"Streamed harmony: {len(blocks)} blocks of up to {max(blocks)} samples")
+
     # Example with a dummy model file
     synth_with_model = NeuralSynth(model_path="corpus/checkpoints/my_soul.pth")
+    synth_with_model.loader.wait() # Loads in the background; silence until then
     output = synth_with_model.synthesize("harmonize", dummy_context)
     print(f"\nOutput with model shape: {output.shape}")
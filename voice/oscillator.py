@@ -0,0 +1,197 @@
+# voice/oscillator.py
+# Phase-continuous multi-voice oscillator bank
+
+import numpy as np
+
+# Relative amplitudes of the partials of every voice: a soft, organ-like tone.
+WARM = (1.0, 0.35, 0.2, 0.08)
+SINE = (1.0,)
+
+PITCH_CLASSES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+def midi_to_hz(midi):
+    return 440.0 * 2.0 ** ((np.asarray(midi, dtype=np.float64) - 69) / 12.0)
+
+def chord_from_chroma(chroma, voices=3, octave=4):
+    """
+    Picks the `voices` strongest pitch classes of a chroma vector and voices
+    them in one octave (C4 upwards by default).
+    Returns (frequencies, amplitudes), amplitudes summing to 1.
+    """
+    chroma = np.asarray(chroma, dtype=np.float64)
+    voices = min(voices, len(chroma))
+    strongest = np.sort(np.argpartition(chroma, -voices)[-voices:])
+    weights = np.maximum(chroma[strongest], 0.0)
+    total = weights.sum()
+    weights = weights / total if total > 0 else np.full(voices, 1.0 / voices)
+    return midi_to_hz(12 * (octave + 1) + strongest), weights
+
+class OscillatorBank:
+    def __init__(self, sample_rate=44100, voices=8, harmonics=WARM, block_size=256, max_samples=44100):
+        """
+        Up to `voices` oscillators, each a stack of `harmonics` partials,
+        rendered together.
+        Every partial has a precomputed wavetable one block long: its cosine
+        and sine over `block_size` samples, rebuilt only when the voice is
+        retuned. Any block of output is then a mix of those tables weighted by
+        the sine and cosine of the phase the block starts at, so a whole render
+        is one matrix product (blocks x partials) @ (partials x block_size),
+        with trigonometry only once per block per partial.
+        Voices keep their phase across renders, so consecutive buffers join
+        without a click, and amplitude changes are ramped block by block.
+        """
+        self.sample_rate = sample_rate
+        self.voices = voices
+        self.block_size = block_size
+        self.harmonics = np.arange(1, len(harmonics) + 1, dtype=np.float64)
+        self.weights = np.asarray(harmonics, dtype=np.float64) / np.sum(harmonics)
+
+        self.phases = np.zeros(voices)     # In cycles, [0, 1)
+        self.freqs = np.zeros(voices)
+        self.amps = np.zeros(voices)       # Target amplitudes
+        self._amps_now = np.zeros(voices)  # Amplitudes reached so far
+
+        # [cos; sin] tables of every partial, voice by voice, so the voices in
+        # use are always the leading rows of (voices * 2 * partials, block_size).
+        self._tables = np.zeros((voices, 2, len(self.harmonics), block_size), dtype=np.float32)
+        self._table_matrix = self._tables.reshape(-1, block_size)
+        self._offsets = np.arange(block_size, dtype=np.float64)
+        self._decimation = 1
+        self._allocate(max_samples)
+
+    def _allocate(self, n):
+        blocks = -(-n // self.block_size)
+        shape = (blocks, self.voices, len(self.harmonics))
+        self._block_starts = np.arange(blocks, dtype=np.float64) * self.block_size
+        self._block_phases = np.empty(shape)
+        self._gains = np.empty((blocks, self.voices))
+        self._coefficients = np.empty((blocks, self.voices, 2, len(self.harmonics)), dtype=np.float32)
+        self._coefficient_matrix = self._coefficients.reshape(blocks, -1)
+        self._blocks = np.empty((blocks, self.block_size), dtype=np.float32)
+        self._output = self._blocks.reshape(-1)
+        self._upsampled = np.empty(blocks * self.block_size, dtype=np.float32)
+        self._steps = np.empty(blocks * self.block_size, dtype=np.float32)
+
+    def set_voices(self, freqs, amps):
+        """
+        Retunes the bank. Voice i keeps its phase, so a held note glides into
+        its new pitch; voices beyond len(freqs) fade out.
+        """
+        k = len(freqs)
+        freqs = np.asarray(freqs, dtype=np.float64)
+        changed = np.flatnonzero(self.freqs[:k] != freqs)
+        self.freqs[:k] = freqs
+        self.amps[:k] = amps
+        self.amps[k:] = 0.0
+        if len(changed):
+            self._tune(changed)
+
+    def _tune(self, voices):
+        # cos/sin(2 pi f h k / rate) over one block, at the (decimated) rate
+        # the tables are read at. Partials at or above its Nyquist would only
+        # alias, so they are left silent.
+        rate = self.sample_rate / self._decimation
+        partials = self.freqs[voices, None] * self.harmonics
+        steps = np.multiply.outer(partials, self._offsets)
+        steps *= 2. * np.pi / rate
+        audible = (partials < rate / 2)[:, :, None]
+        self._tables[voices, 0] = np.cos(steps) * audible
+        self._tables[voices, 1] = np.sin(steps) * audible
+
+    def render(self, n, out=None, decimation=1):
+        """
+        Renders the next `n` samples.
+        With `decimation` above 1 only every `decimation`-th sample is
+        synthesized and the ones between are interpolated linearly: cheaper,
+        at the cost of the partials above the lowered Nyquist frequency.
+        Returns `out`, or a reused internal buffer valid until the next call.
+        """
+        if decimation != self._decimation:
+            self._decimation = decimation
+            self._tune(np.arange(self.voices))
+        needed = n if decimation == 1 else n + decimation
+        if -(-needed // self.block_size) > len(self._blocks):
+            self._allocate(needed)
+        if decimation == 1:
+            rendered = self._render(n, n)
+        else:
+            # Samples 0, d, 2d, ... up to and including the first one at or
+            # past n, so every output sample lies between two of them.
+            m = -(-n // decimation)
+            low = self._render(m + 1, n)
+            steps = np.subtract(low[1:], low[:-1], out=self._steps[:m])
+            # One pass per offset within a run of d samples: far cheaper than
+            # broadcasting over a (m, d) array with d as the inner axis.
+            runs = self._upsampled[:m * decimation].reshape(m, decimation)
+            for offset in range(decimation):
+                np.multiply(steps, offset / decimation, out=runs[:, offset])
+                runs[:, offset] += low[:-1]
+            rendered = self._upsampled[:n]
+
+        if out is None:
+            return rendered
+        out[:n] = rendered
+        return out
+
+    def _render(self, n, advance):
+        # Synthesizes n samples at the decimated rate into the block buffer,
+        # then advances the voices by `advance` samples at the full rate.
+        rate = self.sample_rate / self._decimation
+        blocks = -(-n // self.block_size)
+        # Only voices that are sounding, or still fading out, are rendered.
+        sounding = np.flatnonzero(self.amps + self._amps_now)
+        v = sounding[-1] + 1 if len(sounding) else 1
+        freqs, amps, amps_now = self.freqs[:v], self.amps[:v], self._amps_now[:v]
+
+        # Phase (in radians) of every partial at the start of every block:
+        # sin(p + w k) = sin(p) cos(w k) + cos(p) sin(w k).
+        phases = self._block_phases[:blocks, :v]
+        np.multiply.outer(self._block_starts[:blocks], freqs / rate, out=phases[:, :, 0])
+        phases[:, :, 0] += self.phases[:v]
+        np.multiply(phases[:, :, :1], self.harmonics, out=phases)
+        phases *= 2. * np.pi
+
+        # Per-block gain of every voice, ramping to the target amplitude.
+        gains = self._gains[:blocks, :v]
+        np.multiply.outer(np.arange(1, blocks + 1) / blocks, amps - amps_now, out=gains)
+        gains += amps_now
+
+        coefficients = self._coefficients[:blocks, :v]
+        np.sin(phases, out=coefficients[:, :, 0])
+        np.cos(phases, out=coefficients[:, :, 1])
+        coefficients *= (gains[:, :, None] * self.weights)[:, :, None]
+        rows = v * 2 * len(self.harmonics)
+        np.matmul(self._coefficient_matrix[:blocks, :rows], self._table_matrix[:rows],
+                  out=self._blocks[:blocks])
+
+        self.phases += self.freqs * (advance / self.sample_rate)
+        np.mod(self.phases, 1.0, out=self.phases)
+        self._amps_now[:] = self.amps
+        return self._output[:n]
+
+    def reset(self):
+        self.phases[:] = 0.0
+        self._amps_now[:] = 0.0
+
+if __name__ == '__main__':
+    import time
+
+    chroma = np.zeros(12)
+    chroma[[0, 4, 7]] = [1.0, 0.8, 0.6] # C major
+    freqs, amps = chord_from_chroma(chroma)
+    print("Chord:", ", ".join(f"{PITCH_CLASSES[round(12 * np.log2(f / 440.0) + 69) % 12]} {f:.1f} Hz"
+                              for f in freqs))
+
+    bank = OscillatorBank()
+    bank.set_voices(freqs, amps)
+    bank.render(1024)
+    first = bank.render(1000).copy()
+    second = bank.render(1000)
+    print(f"Seam between two renders: {abs(second[0] - first[-1]):.4f} "
+          f"(largest step inside a block: {np.abs(np.diff(first)).max():.4f})")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        bank.render(44100)
+    print(f"1 s of {bank.voices} voices x {len(bank.harmonics)} partials renders in "
+          f"{(time.perf_counter() - start) * 10:.2f} ms")
@@ -0,0 +1,211 @@
+# voice/space.py
+# Echo and space: multi-tap delay line and partitioned convolution reverb
+
+import numpy as np
+
+def synthetic_ir(seconds=2.0, sample_rate=44100, decay=0.5, seed=0):
+    """
+    A plain reverb impulse response: exponentially decaying noise, falling
+    60 dB every `decay` seconds, normalized to unit energy.
+    """
+    n = int(seconds * sample_rate)
+    rng = np.random.default_rng(seed)
+    envelope = 10.0 ** (-3.0 * np.arange(n) / (decay * sample_rate))
+    ir = (rng.standard_normal(n) * envelope).astype(np.float32)
+    return ir / np.sqrt(np.sum(ir ** 2))
+
+class DelayLine:
+    def __init__(self, max_delay, max_block=44100, taps=()):
+        """
+        A multi-tap delay over the input written to it, held in a
+        preallocated ring of `max_delay + max_block` samples.
+        `taps` are (delay in samples, gain) pairs. Output is read on its own
+        clock: each output sample t is the sum of gain * input[t - delay]
+        over the taps, and input that has not been written yet reads as
+        silence.
+        """
+        self.capacity = max_delay + max_block
+        self.max_delay = max_delay
+        self._ring = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0 # Total samples written
+        self._read = 0    # Output clock, in samples
+        self.set_taps(taps)
+
+    def set_taps(self, taps):
+        taps = [(int(delay), float(gain)) for delay, gain in taps]
+        if any(delay < 0 or delay > self.max_delay for delay, _ in taps):
+            raise ValueError(f"Tap delays must lie within 0..{self.max_delay} samples")
+        self.taps = taps
+
+    def write(self, samples):
+        begin = self._written % self.capacity
+        end = begin + len(samples)
+        if end <= self.capacity:
+            self._ring[begin:end] = samples
+        else:
+            split = self.capacity - begin
+            self._ring[begin:] = samples[:split]
+            self._ring[:end - self.capacity] = samples[split:]
+        self._written += len(samples)
+
+    def sync(self):
+        """Starts the output clock at the newest input sample."""
+        self._read = self._written
+
+    def _add(self, out, start, gain):
+        # out += gain * input[start:start + len(out)], silence where unwritten
+        # (or already overwritten).
+        skip = max(0, -start, self._written - self.capacity - start)
+        out, start = out[skip:], start + skip
+        n = min(len(out), self._written - start)
+        if n <= 0:
+            return
+        begin = start % self.capacity
+        if begin + n <= self.capacity:
+            out[:n] += gain * self._ring[begin:begin + n]
+        else:
+            split = self.capacity - begin
+            out[:split] += gain * self._ring[begin:]
+            out[split:n] += gain * self._ring[:n - split]
+
+    def read(self, out):
+        """Fills `out` with the next samples of the delayed mix."""
+        out[:] = 0.0
+        for delay, gain in self.taps:
+            self._add(out, self._read - delay, gain)
+        self._read += len(out)
+        return out
+
+class Convolver:
+    def __init__(self, ir, block_size=1024):
+        """
+        Convolves a stream with the impulse response `ir` by uniformly
+        partitioned overlap-add: the IR is cut into `block_size` partitions
+        whose spectra are computed once, and every input block is
+        transformed once and kept in a frequency-domain delay line. An
+        output block is then one spectral multiply-accumulate over the
+        partitions and one inverse FFT, the same cost for every block
+        however long the stream runs. Output lags the input by `block_size`
+        samples; input of any length is framed internally.
+        """
+        self.block_size = block_size
+        n_fft = 2 * block_size
+        self.partitions = max(1, -(-len(ir) // block_size))
+        padded = np.zeros(self.partitions * block_size, dtype=np.float32)
+        padded[:len(ir)] = ir
+        spectra = np.fft.rfft(padded.reshape(self.partitions, block_size), n=n_fft, axis=1)
+        # Newest input spectrum meets the first partition: stored oldest first.
+        self._ir = np.ascontiguousarray(spectra[::-1]).astype(np.complex64)
+
+        bins = n_fft // 2 + 1
+        # Every input spectrum is written twice, P apart, so the last P are
+        # always one contiguous window, oldest first.
+        self._history = np.zeros((2 * self.partitions, bins), dtype=np.complex64)
+        self._head = 0
+        self._products = np.empty((self.partitions, bins), dtype=np.complex64)
+        self._spectrum = np.empty(bins, dtype=np.complex64)
+        self._frame = np.zeros(block_size, dtype=np.float32)
+        self._fill = 0
+        self._ready = np.zeros(block_size, dtype=np.float32)
+        self._tail = np.zeros(block_size, dtype=np.float32)
+
+    def _convolve_frame(self):
+        P = self.partitions
+        spectrum = np.fft.rfft(self._frame, n=2 * self.block_size)
+        self._history[self._head] = spectrum
+        self._history[self._head + P] = spectrum
+        self._head = (self._head + 1) % P
+        window = self._history[self._head:self._head + P]
+        np.multiply(window, self._ir, out=self._products)
+        np.sum(self._products, axis=0, out=self._spectrum)
+        y = np.fft.irfft(self._spectrum, n=2 * self.block_size)
+        np.add(y[:self.block_size], self._tail, out=self._ready)
+        self._tail[:] = y[self.block_size:]
+
+    def process(self, x, out):
+        """Convolves the next samples `x` into `out` (same length)."""
+        done = 0
+        while done < len(x):
+            take = min(len(x) - done, self.block_size - self._fill)
+            self._frame[self._fill:self._fill + take] = x[done:done + take]
+            out[done:done + take] = self._ready[self._fill:self._fill + take]
+            self._fill += take
+            done += take
+            if self._fill == self.block_size:
+                self._convolve_frame()
+                self._fill = 0
+        return out
+
+    def reset(self):
+        self._history[:] = 0.0
+        self._tail[:] = 0.0
+        self._ready[:] = 0.0
+        self._fill = 0
+
+class Space:
+    def __init__(self, sample_rate=44100, taps=((0.25, 0.5), (0.5, 0.3), (0.75, 0.15)),
+                 ir=None, reverb_mix=0.3, block_size=1024, max_delay=2.0, max_block=44100):
+        """
+        The echo voice: what Pneuma hears goes through a multi-tap delay
+        (`taps` in seconds and gains) and then a convolution reverb with `ir`
+        (a synthetic room by default), mixed in at `reverb_mix`.
+        Renders go into one reused buffer.
+        """
+        self.sample_rate = sample_rate
+        self.reverb_mix = reverb_mix
+        self.delay = DelayLine(int(max_delay * sample_rate), max_block,
+                               [(seconds * sample_rate, gain) for seconds, gain in taps])
+        self.reverb = Convolver(synthetic_ir(sample_rate=sample_rate) if ir is None else ir, block_size)
+        self._dry = np.zeros(max_block, dtype=np.float32)
+        self._wet = np.zeros(max_block, dtype=np.float32)
+        self._reverb_skipped = False
+
+    def listen(self, audio):
+        self.delay.write(np.asarray(audio, dtype=np.float32))
+
+    def start(self):
+        """Begins a new echo: output follows the newest input, with no reverb left over."""
+        self.delay.sync()
+        self.reverb.reset()
+
+    def render(self, n, reverb=True):
+        """
+        The next `n` samples, as a view of a buffer reused by the next call.
+        Without `reverb` only the delay is played, for a fraction of the cost;
+        the reverb starts again from silence once it is back.
+        """
+        dry, wet = self._dry[:n], self._wet[:n]
+        self.delay.read(dry)
+        if not reverb:
+            self._reverb_skipped = True
+            return dry
+        if self._reverb_skipped:
+            self.reverb.reset()
+            self._reverb_skipped = False
+        self.reverb.process(dry, wet)
+        wet *= self.reverb_mix
+        dry += wet
+        return dry
+
+if __name__ == '__main__':
+    import time
+
+    sample_rate, block = 44100, 1024
+    for seconds in (0.5, 2.0, 6.0):
+        convolver = Convolver(synthetic_ir(seconds, sample_rate), block)
+        x, out = np.random.randn(block).astype(np.float32), np.empty(block, dtype=np.float32)
+        start = time.perf_counter()
+        for _ in range(200):
+            convolver.process(x, out)
+        cost = (time.perf_counter() - start) / 200
+        print(f"{seconds:.1f}s IR ({convolver.partitions:>3} partitions): "
+              f"{cost * 1e6:7.1f} us per {block}-sample block "
+              f"({cost / (block / sample_rate):.1%} of real time)")
+
+    # Check against direct convolution.
+    ir = synthetic_ir(0.1, sample_rate)
+    signal = np.random.randn(10 * block).astype(np.float32)
+    convolver, out = Convolver(ir, block), np.empty(len(signal), dtype=np.float32)
+    convolver.process(signal, out)
+    expected = np.convolve(signal, ir)[:len(signal) - block]
+    print(f"Largest error against np.convolve: {np.abs(out[block:] - expected).max():.2e}")
@@ -4,25 +4,72 @@
 import pyaudio
 import numpy as np
 
+from voice.jitter import JitterBuffer
+
 class Streamer:
-    def __init__(self, sample_rate=44100):
+    def __init__(self, sample_rate=44100, mode="blocking", buffer_seconds=4.0, crossfade=0.02,
+                 block_size=512):
+        """
+        Plays generated audio.
+        In "blocking" mode `play` writes the whole buffer to the PortAudio
+        stream and returns once it has been handed over, which for a long
+        buffer is as long as it plays.
+        In "callback" mode `play` only queues the buffer in a JitterBuffer and
+        returns at once; the audio thread pulls `block_size` samples at a time
+        from it, and a new buffer crossfades over `crossfade` seconds with
+        whatever is still playing.
+        """
         self.sample_rate = sample_rate
+        self.mode = mode
+        self.jitter = None
+        if mode == "callback":
+            self.jitter = JitterBuffer(int(buffer_seconds * sample_rate),
+                                       crossfade=int(crossfade * sample_rate))
+            self._block = np.zeros(block_size, dtype=np.float32)
+        elif mode != "blocking":
+            raise ValueError(f"Unknown streamer mode '{mode}'")
+
         self.p = pyaudio.PyAudio()
         self.stream = self.p.open(format=pyaudio.paFloat32,
                                   channels=1,
                                   rate=self.sample_rate,
-                                  output=True)
+                                  output=True,
+                                  frames_per_buffer=block_size if self.jitter else pyaudio.paFramesPerBufferUnspecified,
+                                  stream_callback=self._render if self.jitter else None)
+
+    def _render(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread: copy out of the jitter buffer, nothing else.
+        if frame_count != len(self._block):
+            self._block = np.zeros(frame_count, dtype=np.float32)
+        self.jitter.read(self._block)
+        return (self._block.tobytes(), pyaudio.paContinue)
 
-    def play(self, audio_buffer):
+    def play(self, audio_buffer, append=False, continues=False):
         """
         Plays a chunk of audio data.
         `audio_buffer` should be a NumPy array of float32 samples.
+        In callback mode it replaces (crossfading) whatever is still queued;
+        `append` queues it after it instead, and `continues` marks that more
+        of the same phrase is on its way.
         """
         # Ensure data is in the correct format
         if not isinstance(audio_buffer, np.ndarray):
             audio_buffer = np.array(audio_buffer, dtype=np.float32)
 
-        self.stream.write(audio_buffer.tobytes())
+        if self.jitter is not None:
+            self.jitter.write(audio_buffer, append=append, continues=continues)
+        else:
+            self.stream.write(audio_buffer.astype(np.float32).tobytes())
+
+    @property
+    def underruns(self):
+        """Callbacks that ran dry while more audio had been promised."""
+        return self.jitter.underruns if self.jitter is not None else 0
+
+    @property
+    def queue_depth(self):
+        """Seconds of audio queued and not yet played."""
+        return self.jitter.depth / self.sample_rate if self.jitter is not None else 0.0
 
     def stop(self):
         self.stream.stop_stream()
@@ -30,21 +77,25 @@ class Streamer:
         self.p.terminate()
 
 if __name__ == '__main__':
-    streamer = Streamer()
-    print("Playing a 1-second sine wave at 440 Hz.")
+    import time
+
+    streamer = Streamer(mode="callback")
+    print("Playing a 1-second sine wave at 440 Hz, then crossfading to 660 Hz.")
 
     # Generate a sine wave to test
     sample_rate = 44100
     duration = 1
-    frequency = 440
     t = np.linspace(0., duration, sample_rate * duration)
     amplitude = 0.5
-    sine_wave = amplitude * np.sin(2. * np.pi * frequency * t)
-    
+
     try:
-        streamer.play(sine_wave)
+        streamer.play(amplitude * np.sin(2. * np.pi * 440 * t))
+        time.sleep(0.5)
+        streamer.play(amplitude * np.sin(2. * np.pi * 660 * t))
+        while streamer.queue_depth > 0:
+            time.sleep(0.05)
     except Exception as e:
         print(f"Error playing audio: {e}")
     finally:
-        print("Stopping stream.")
+        print(f"Stopping stream (underruns: {streamer.underruns}).")
         streamer.stop()